@@ -1,3 +1,5 @@
+from functools import lru_cache
+from typing import Any
 from typing import Dict
 
 from pydantic_settings import BaseSettings
@@ -22,4 +24,22 @@ class Settings(BaseSettings):
     }
 
 
-settings = Settings()
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    function that builds the settings from the environment on first use,
+    so importing the package does not pay for it
+
+    Returns
+    -------
+    Settings
+        settings of the package
+    """
+    return Settings()
+
+
+def __getattr__(name: str) -> Any:
+    # keeps `from hip_data_ml_utils.core.config import settings` working
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,11 +1,16 @@
 import datetime
 import importlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
 from typing import Dict
 from typing import List
+from typing import TYPE_CHECKING
 
 import yaml
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 def load_yaml(path: str) -> Dict:
     """
@@ -115,3 +120,82 @@ def get_date_intervals_model_drift(
         return_list.append(f"{date_int}_hour_pair_{i}")
 
     return return_list
+
+
+def write_parquet_chunks(
+    df: "pd.DataFrame",
+    staging_location: str,
+    chunk_rows: int = 1_000_000,
+    max_workers: int = 8,
+) -> List[str]:
+    """
+    function that writes a dataframe as parquet files of chunk_rows rows in parallel
+    the chunks are zero-copy slices of one arrow table
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        dataframe to write
+    staging_location: str
+        directory the parquet files are written to, a local path or s3 location
+    chunk_rows: int
+        maximum number of rows in each parquet file
+    max_workers: int
+        number of parquet files written at the same time
+
+    Returns
+    -------
+    List
+        paths of the parquet files
+    """
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows must be a positive integer")
+
+    import pyarrow as pa
+    import pyarrow.fs
+    import pyarrow.parquet as pq
+
+    filesystem, staging_path = pyarrow.fs.FileSystem.from_uri(staging_location)
+    filesystem.create_dir(staging_path, recursive=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    file_paths = [
+        f"{staging_path.rstrip('/')}/part-{index:05d}.parquet"
+        for index in range(max(-(-table.num_rows // chunk_rows), 1))
+    ]
+
+    def write_chunk(index: int):
+        pq.write_table(
+            table.slice(index * chunk_rows, chunk_rows),
+            file_paths[index],
+            filesystem=filesystem,
+            compression="snappy",
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(write_chunk, range(len(file_paths))))
+
+    return file_paths
+
+
+def format_sql_copy_into(table_name: str, staging_location: str) -> str:
+    """
+    function that formats the sql to load staged parquet files into a table
+
+    Parameters
+    ----------
+    table_name: str
+        name of table
+    staging_location: str
+        directory of the staged parquet files
+
+    Returns
+    -------
+    str
+        COPY INTO sql
+    """
+    return (
+        f"COPY INTO {table_name}\n"
+        f"FROM '{staging_location}'\n"
+        "FILEFORMAT = PARQUET"
+    )
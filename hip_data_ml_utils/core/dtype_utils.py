@@ -0,0 +1,262 @@
+from typing import Dict
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+INT_DTYPES = (
+    pd.Int8Dtype,
+    pd.Int16Dtype,
+    pd.Int32Dtype,
+    pd.Int64Dtype,
+    pd.UInt8Dtype,
+    pd.UInt16Dtype,
+    pd.UInt32Dtype,
+    pd.UInt64Dtype,
+)
+FLOAT_DTYPES = (pd.Float32Dtype, pd.Float64Dtype)
+DTYPE_BACKENDS = ("numpy", "pyarrow")
+NULLABLE_PANDAS_DTYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.uint8(): pd.UInt8Dtype(),
+    pa.uint16(): pd.UInt16Dtype(),
+    pa.uint32(): pd.UInt32Dtype(),
+    pa.uint64(): pd.UInt64Dtype(),
+    pa.float32(): pd.Float32Dtype(),
+    pa.float64(): pd.Float64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+}
+
+
+def _get_smallest_int_dtype(min_value: int, max_value: int) -> np.dtype:
+    """
+    get the smallest numpy int dtype that holds the range of values
+
+    Parameters
+    ----------
+    min_value : int
+        minimum value of the column
+    max_value : int
+        maximum value of the column
+
+    Returns
+    -------
+    np.dtype
+        smallest numpy int dtype
+    """
+
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if np.iinfo(dtype).min <= min_value and max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+def normalise_dtypes(
+    df: pd.DataFrame, downcast: bool = False
+) -> Tuple[pd.DataFrame, Dict]:
+    """
+    change all pandas Int and Float columns to numpy int and float in one pass
+    Int columns with nulls are changed to float
+    null masks and min/max of the columns are computed in bulk,
+    and all columns are converted with a single astype
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        dataframe returned by the pandas cursor
+    downcast : bool
+        if True, int columns are downcast to the smallest int width that holds
+        their values, and float columns to float32 when it is lossless
+
+    Returns
+    -------
+    pd.DataFrame
+        dataframe with numpy int and float columns
+    Dict
+        report of the conversion; bytes_before, bytes_after, bytes_saved
+        and the converted columns with their new dtype
+    """
+
+    original_dtypes = df.dtypes
+    int_cols = [
+        col for col, dtype in original_dtypes.items() if isinstance(dtype, INT_DTYPES)
+    ]
+    float_cols = [
+        col for col, dtype in original_dtypes.items() if isinstance(dtype, FLOAT_DTYPES)
+    ]
+    report = {"bytes_before": 0, "bytes_after": 0, "bytes_saved": 0, "columns": {}}
+
+    if not int_cols and not float_cols:
+        return df, report
+
+    # one pass over all nullable int columns for their null masks
+    has_nulls = df[int_cols].isna().any(axis=0) if int_cols else pd.Series(dtype=bool)
+    int_cols_no_null = [col for col in int_cols if not has_nulls[col]]
+    float_target_cols = [col for col in int_cols if has_nulls[col]] + float_cols
+
+    dtype_mapping = {col: np.dtype(np.int64) for col in int_cols_no_null}
+    dtype_mapping.update({col: np.dtype(np.float64) for col in float_target_cols})
+
+    if downcast and int_cols_no_null:
+        min_values = df[int_cols_no_null].min(axis=0)
+        max_values = df[int_cols_no_null].max(axis=0)
+        for col in int_cols_no_null:
+            # columns without values, e.g. of an empty result, are kept as int64
+            if pd.isna(min_values[col]) or pd.isna(max_values[col]):
+                continue
+            dtype_mapping[col] = _get_smallest_int_dtype(
+                min_value=int(min_values[col]), max_value=int(max_values[col])
+            )
+
+    if downcast:
+        for col in float_target_cols:
+            values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            if np.array_equal(values.astype(np.float32), values, equal_nan=True):
+                dtype_mapping[col] = np.dtype(np.float32)
+
+    converted_cols = list(dtype_mapping)
+    # memory usage of the whole frame avoids copying the converted columns out
+    report["bytes_before"] = int(
+        df.memory_usage(index=False, deep=False)[converted_cols].sum()
+    )
+
+    return_df = df.astype(dtype_mapping, copy=False)
+
+    report["bytes_after"] = int(
+        return_df.memory_usage(index=False, deep=False)[converted_cols].sum()
+    )
+    report["bytes_saved"] = report["bytes_before"] - report["bytes_after"]
+    report["columns"] = {
+        col: f"{original_dtypes[col]} -> {dtype}"
+        for col, dtype in dtype_mapping.items()
+    }
+
+    return return_df, report
+
+
+def arrow_to_pandas(table: pa.Table, dtype_backend: str = "numpy") -> pd.DataFrame:
+    """
+    convert a pyarrow table into pandas
+    "numpy" backend converts without copying where the arrow types allow it
+    and does not consolidate the columns into 2D blocks
+    "pyarrow" backend keeps the data in arrow with pyarrow-backed pandas dtypes,
+    so nullable int and string columns are not turned into float and object
+
+    Parameters
+    ----------
+    table : pa.Table
+        pyarrow table to convert
+    dtype_backend : str
+        "numpy" or "pyarrow"
+
+    Returns
+    -------
+    pd.DataFrame
+        pandas dataframe of the arrow table
+    """
+
+    if dtype_backend not in DTYPE_BACKENDS:
+        raise ValueError(f"dtype_backend can only be one of {DTYPE_BACKENDS}")
+
+    if dtype_backend == "pyarrow":
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    return table.to_pandas(split_blocks=True)
+
+
+def arrow_to_nullable_pandas(table: pa.Table) -> pd.DataFrame:
+    """
+    convert a pyarrow table into pandas with the types of the pandas cursor,
+    so normalise_dtypes converts it like a result of the pandas cursor
+    int and float columns get nullable pandas dtypes, dates and timestamps
+    are datetime64[ns], decimals stay python Decimal objects, and boolean
+    columns are bool, or object if they have nulls
+
+    Parameters
+    ----------
+    table : pa.Table
+        pyarrow table to convert
+
+    Returns
+    -------
+    pd.DataFrame
+        pandas dataframe of the arrow table
+    """
+
+    return table.to_pandas(
+        split_blocks=True,
+        types_mapper=lambda arrow_type: (
+            None
+            if pa.types.is_boolean(arrow_type)
+            else NULLABLE_PANDAS_DTYPES.get(arrow_type)
+        ),
+        date_as_object=False,
+        coerce_temporal_nanoseconds=True,
+    )
+
+
+def normalise_arrow_table(
+    table: pa.Table, downcast: bool = False
+) -> Tuple[pd.DataFrame, Dict]:
+    """
+    convert a pyarrow table into pandas with numpy types, in bulk per column
+    decimal columns are cast to float in arrow instead of python Decimal objects,
+    int and float columns are changed to numpy types like normalise_dtypes,
+    and boolean columns without nulls to numpy bool
+    timestamp columns are converted by arrow, nested columns stay python objects
+
+    Parameters
+    ----------
+    table : pa.Table
+        pyarrow table to convert
+    downcast : bool
+        if True, int columns are downcast to the smallest int width that holds
+        their values, and float columns to float32 when it is lossless
+
+    Returns
+    -------
+    pd.DataFrame
+        dataframe with numpy types
+    Dict
+        report of the conversion; bytes_before, bytes_after, bytes_saved
+        and the converted columns with their new dtype
+    """
+
+    decimal_types = {
+        field.name: field.type
+        for field in table.schema
+        if pa.types.is_decimal(field.type)
+    }
+    for name in decimal_types:
+        index = table.schema.get_field_index(name)
+        table = table.set_column(
+            index,
+            name,
+            pc.cast(table.column(index), pa.float64(), safe=False),
+        )
+
+    # nullable pandas dtypes keep the null masks, so normalise_dtypes decides
+    # between int and float from the nulls of every column
+    return_df, report = normalise_dtypes(
+        df=table.to_pandas(split_blocks=True, types_mapper=NULLABLE_PANDAS_DTYPES.get),
+        downcast=downcast,
+    )
+
+    bool_cols = [
+        col
+        for col, dtype in return_df.dtypes.items()
+        if isinstance(dtype, pd.BooleanDtype) and not return_df[col].hasnans
+    ]
+    if bool_cols:
+        return_df = return_df.astype(dict.fromkeys(bool_cols, np.dtype(bool)))
+        report["columns"].update(dict.fromkeys(bool_cols, "boolean -> bool"))
+
+    for name, decimal_type in decimal_types.items():
+        report["columns"][name] = f"{decimal_type} -> {return_df[name].dtype}"
+
+    return return_df, report
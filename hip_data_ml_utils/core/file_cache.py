@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import abc
+import contextlib
+import os
+import pathlib
+import tempfile
+from typing import IO
+from typing import Iterable
+from typing import Iterator
+
+
+@contextlib.contextmanager
+def open_atomic(path: pathlib.Path, mode: str = "wb") -> Iterator[IO]:
+    """
+    function that opens a temporary file next to path, renamed to path once
+    written, so readers in other processes never see a partially written file
+    the temporary file is removed if writing it fails
+
+    Parameters
+    ----------
+    path: pathlib.Path
+        path of the file to write
+    mode: str
+        mode the temporary file is opened with, "wb" or "w"
+
+    Returns
+    -------
+    IO
+        temporary file to write to
+    """
+    with tempfile.NamedTemporaryFile(
+        mode=mode, dir=path.parent, suffix=".tmp", delete=False
+    ) as tmp_file:
+        try:
+            yield tmp_file
+        except BaseException:
+            tmp_file.close()
+            os.unlink(tmp_file.name)
+            raise
+    os.replace(tmp_file.name, path)
+
+
+class FileCache(abc.ABC):
+    """
+    Base class of the caches that keep files in a local directory
+    The modified time of a file tracks its last use, and the least recently
+    used files are evicted once their total size goes over max_size_bytes
+    Subclasses list the files that count towards the size cap with
+    _entry_paths, and remove an evicted file with _remove
+    """
+
+    def __init__(self, cache_dir: str, max_size_bytes: int):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @abc.abstractmethod
+    def _entry_paths(self) -> Iterable[pathlib.Path]:
+        """
+        list the files of the cache that count towards the size cap
+
+        Returns
+        -------
+        Iterable[pathlib.Path]
+            path of every cached file
+        """
+
+    def _remove(self, path: pathlib.Path):
+        path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _touch(path: pathlib.Path):
+        """mark a file as the most recently used"""
+        os.utime(path)
+
+    def _entries(self) -> list[tuple[float, int, pathlib.Path]]:
+        """
+        list the files of the cache from least to most recently used
+
+        Returns
+        -------
+        List[Tuple[float, int, pathlib.Path]]
+            last used time, size in bytes and path of every file
+        """
+
+        entries = []
+        for path in self._entry_paths():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # removed by another process since the listing
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        return sorted(entries)
+
+    def _evict(self, keep: pathlib.Path | None = None):
+        """
+        evict the least recently used files until the cache is under its size cap
+
+        Parameters
+        ----------
+        keep : Optional[pathlib.Path]
+            path of a file that is never evicted, e.g. the one just written
+        """
+
+        entries = self._entries()
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total_size -= size
+
+    def stats(self) -> dict:
+        """
+        get the hit/miss counters and current size of the cache
+
+        Returns
+        -------
+        Dict
+            hits, misses, entries and size_bytes of the cache
+        """
+
+        sizes = [size for _, size, _ in self._entries()]
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(sizes),
+            "size_bytes": sum(sizes),
+        }
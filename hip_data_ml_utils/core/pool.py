@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any
+from typing import Callable
+from typing import Iterator
+
+
+class ConnectionPool:
+    """
+    Class that lends connections to one thread at a time
+    Connections are only created on first use, up to pool_size of them,
+    and a thread waits for a connection to be released or discarded once they
+    are all in use
+    Idle connections failing the optional health check are replaced on acquire
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        pool_size: int = 4,
+        health_check: Callable[[Any], bool] | None = None,
+    ):
+        if pool_size <= 0:
+            raise ValueError("pool_size must be a positive integer")
+
+        self.pool_size = pool_size
+        self.connections: list[Any] = []
+        self._connect = connect
+        self._health_check = health_check
+        self._idle = collections.deque()
+        self._connecting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float | None = None) -> Any:
+        """
+        get an idle connection, create one if the pool is not full yet,
+        otherwise wait for a connection to be released
+
+        Parameters
+        ----------
+        timeout : Optional[float]
+            seconds to wait for a connection, waits forever if None
+
+        Returns
+        -------
+        Any
+            connection
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            connection = self._wait_for_connection(deadline=deadline)
+            if connection is None:
+                break
+            if self._is_healthy(connection):
+                return connection
+            self.discard(connection)
+
+        # the connection is created outside the lock, in the place reserved for it
+        try:
+            connection = self._connect()
+        except Exception:
+            with self._condition:
+                self._connecting -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._connecting -= 1
+            self.connections.append(connection)
+
+        return connection
+
+    def _wait_for_connection(self, deadline: float | None) -> Any | None:
+        """
+        wait until a connection is idle or the pool has room for a new one,
+        the most recently released connection is used first
+
+        Parameters
+        ----------
+        deadline : Optional[float]
+            monotonic time to stop waiting at, waits forever if None
+
+        Returns
+        -------
+        Optional[Any]
+            idle connection, None if a place is reserved for a new connection
+        """
+
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if len(self.connections) + self._connecting < self.pool_size:
+                    self._connecting += 1
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No connection released in time")
+                self._condition.wait(timeout=remaining)
+
+    def _is_healthy(self, connection: Any) -> bool:
+        """
+        run the health check on a connection, a failing check is unhealthy
+
+        Parameters
+        ----------
+        connection : Any
+            connection to check
+
+        Returns
+        -------
+        bool
+            True if the connection can be used
+        """
+
+        if self._health_check is None:
+            return True
+        try:
+            return bool(self._health_check(connection))
+        except Exception:
+            return False
+
+    def release(self, connection: Any):
+        """
+        give a connection back to the pool
+
+        Parameters
+        ----------
+        connection : Any
+            connection from acquire
+        """
+
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def discard(self, connection: Any):
+        """
+        close a broken connection and remove it from the pool,
+        so a new connection is created in its place
+
+        Parameters
+        ----------
+        connection : Any
+            connection from acquire
+        """
+
+        with self._condition:
+            if connection in self.connections:
+                self.connections.remove(connection)
+            # a waiting thread creates a new connection in the freed place
+            self._condition.notify()
+        try:
+            connection.close()
+        except Exception:
+            # the connection is already broken
+            pass
+
+    @contextmanager
+    def connection(self, timeout: float | None = None) -> Iterator[Any]:
+        """
+        lend a connection for the duration of the with block
+
+        Parameters
+        ----------
+        timeout : Optional[float]
+            seconds to wait for a connection, waits forever if None
+
+        Yields
+        ------
+        Any
+            connection
+        """
+
+        connection = self.acquire(timeout=timeout)
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        """
+        close every connection created by the pool
+        """
+
+        with self._condition:
+            for connection in self.connections:
+                connection.close()
+            self.connections = []
+            self._idle.clear()
+            self._condition.notify_all()
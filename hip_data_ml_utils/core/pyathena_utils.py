@@ -1,8 +1,58 @@
+import datetime
+import itertools
 import pathlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
 from typing import Tuple
+from typing import TYPE_CHECKING
+from typing import Union
 
 import yaml
 
+from hip_data_ml_utils.core.config import get_settings
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+PARTITION_PROJECTION_KEYS = {
+    "date": ("range", "format"),
+    "integer": ("range",),
+    "enum": ("values",),
+}
+
+
+@lru_cache(maxsize=None)
+def get_athena_arrow_type_map() -> Dict[str, "pa.DataType"]:
+    """
+    get the pyarrow type of every athena type with a pyarrow equivalent,
+    built on first use so pyarrow is not imported with this module
+
+    Returns
+    -------
+    Dict[str, pa.DataType]
+        pyarrow type of every athena type name
+    """
+
+    import pyarrow as pa
+
+    return {
+        "boolean": pa.bool_(),
+        "tinyint": pa.int8(),
+        "smallint": pa.int16(),
+        "integer": pa.int32(),
+        "bigint": pa.int64(),
+        "float": pa.float32(),
+        "real": pa.float32(),
+        "double": pa.float64(),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("ms"),
+    }
+
 
 # function to read sql file
 def read_sql(file_path: str) -> str:
@@ -82,10 +132,121 @@ def get_config_yaml(file_path: str) -> Tuple[str, str, str, str, str, str]:
     )
 
 
+def get_partition_projection(file_path: str) -> Dict:
+    """
+    get the partition projection spec in yaml config, if the table declares one
+    e.g.
+        partition_projection:
+            type: date
+            range: 20200101,NOW
+            format: yyyyMMdd
+
+    Parameters
+    ----------
+    file_path : str
+        file path of yaml schema
+
+    Returns
+    -------
+    Dict
+        partition projection spec, empty if not declared
+    """
+    with open(file_path) as file:
+        config_yaml = yaml.safe_load(file)
+
+    return config_yaml["tables"][0].get("partition_projection") or {}
+
+
+def is_partition_projected(sql: str, yaml_file_path: str) -> bool:
+    """
+    check if a table is created with partition projection, i.e. the yaml config
+    declares a projection and the create table sql has a {partition_projection}
+    placeholder to format it into
+
+    Parameters
+    ----------
+    sql : str
+        raw create table sql
+    yaml_file_path : str
+        yaml file path
+
+    Returns
+    -------
+    bool
+        True if athena computes the partitions of the table
+    """
+
+    return "{partition_projection}" in sql and bool(
+        get_partition_projection(yaml_file_path)
+    )
+
+
+def format_partition_projection(
+    partition_column: str, s3_bucket: str, partition_projection: Dict
+) -> str:
+    """
+    format the table properties of a partition projection spec
+    supported projection types are date, integer and enum
+
+    Parameters
+    ----------
+    partition_column : str
+        name of partition column
+    s3_bucket : str
+        s3 location of the table
+    partition_projection : Dict
+        partition projection spec from the yaml config
+
+    Returns
+    -------
+    str
+        table properties to append to tblproperties, empty if there is no spec
+    """
+
+    if not partition_projection:
+        return ""
+
+    projection_type = partition_projection.get("type")
+    if projection_type not in PARTITION_PROJECTION_KEYS:
+        raise ValueError(
+            f"partition projection type can only be one of "
+            f"{tuple(PARTITION_PROJECTION_KEYS)}"
+        )
+    missing_keys = [
+        key
+        for key in PARTITION_PROJECTION_KEYS[projection_type]
+        if key not in partition_projection
+    ]
+    if missing_keys:
+        raise ValueError(
+            f"{projection_type} partition projection requires {missing_keys}"
+        )
+
+    properties = {
+        "projection.enabled": "true",
+        f"projection.{partition_column}.type": projection_type,
+    }
+    for key, value in partition_projection.items():
+        if key == "type":
+            continue
+        if isinstance(value, list):
+            value = ",".join(str(i) for i in value)
+        properties[f"projection.{partition_column}.{key.replace('_', '.')}"] = value
+
+    bucket, prefix = split_s3_location(s3_bucket)
+    properties[
+        "storage.location.template"
+    ] = f"s3://{bucket}/{prefix}{partition_column}=${{{partition_column}}}/"
+
+    return "".join(f',\n    "{key}"="{value}"' for key, value in properties.items())
+
+
 # function to format create schema or repair table
 def format_sql_create_schema(sql: str, yaml_file_path: str) -> Tuple[str, str]:
     """
     format sql create table to input parameters
+    if the sql has a {partition_projection} placeholder, the table properties of
+    the partition projection declared in the yaml config are formatted into it
 
     Parameters
     ----------
@@ -109,6 +270,14 @@ def format_sql_create_schema(sql: str, yaml_file_path: str) -> Tuple[str, str]:
         s3_bucket,
     ) = get_config_yaml(yaml_file_path)
 
+    partition_projection = ""
+    if "{partition_projection}" in sql:
+        partition_projection = format_partition_projection(
+            partition_column=partition_column,
+            s3_bucket=s3_bucket,
+            partition_projection=get_partition_projection(yaml_file_path),
+        )
+
     return_sql = sql.format(
         table_name=table_name,
         table_column_name=table_column_name,
@@ -116,6 +285,7 @@ def format_sql_create_schema(sql: str, yaml_file_path: str) -> Tuple[str, str]:
         partitioned_column=partition_column,
         partitioned_column_comment=partition_column_comment,
         s3_bucket=s3_bucket,
+        partition_projection=partition_projection,
     )
 
     return return_sql, table_name
@@ -139,3 +309,541 @@ def format_sql_repair_table(sql: str, table_name: str) -> str:
     """
 
     return sql.format(table_name=table_name)
+
+
+def split_s3_location(s3_location: str) -> Tuple[str, str]:
+    """
+    split s3 location into bucket and key prefix
+    repeated slashes in the prefix are collapsed
+
+    Parameters
+    ----------
+    s3_location : str
+        s3 location, with or without s3://
+
+    Returns
+    -------
+    str
+        s3 bucket name
+    str
+        key prefix, ending with / unless empty
+    """
+
+    bucket, _, prefix = re.sub(r"^s3a?://", "", s3_location).partition("/")
+    prefix = re.sub(r"/+", "/", prefix).strip("/")
+
+    return bucket, f"{prefix}/" if prefix else ""
+
+
+def list_s3_partition_values(s3_location: str, partition_column: str) -> List[str]:
+    """
+    list the values of the hive partition prefixes under an s3 location
+    only the partition prefixes are listed, not the files inside them
+
+    Parameters
+    ----------
+    s3_location : str
+        s3 location of the table
+    partition_column : str
+        name of partition column
+
+    Returns
+    -------
+    List[str]
+        sorted partition values
+    """
+
+    import boto3
+
+    bucket, prefix = split_s3_location(s3_location)
+    partition_prefix = f"{prefix}{partition_column}="
+
+    paginator = boto3.client(
+        "s3", region_name=get_settings().AWS_DEFAULT_REGION
+    ).get_paginator("list_objects_v2")
+
+    partition_values = []
+    for page in paginator.paginate(
+        Bucket=bucket, Prefix=partition_prefix, Delimiter="/"
+    ):
+        for common_prefix in page.get("CommonPrefixes", []):
+            partition_values.append(
+                common_prefix["Prefix"].removeprefix(partition_prefix).rstrip("/")
+            )
+
+    return sorted(partition_values)
+
+
+def list_s3_keys(s3_location: str) -> List[str]:
+    """
+    list the keys of the files under an s3 location
+
+    Parameters
+    ----------
+    s3_location : str
+        s3 location
+
+    Returns
+    -------
+    List[str]
+        sorted keys of the files, without folder markers
+    """
+
+    import boto3
+
+    bucket, prefix = split_s3_location(s3_location)
+
+    paginator = boto3.client(
+        "s3", region_name=get_settings().AWS_DEFAULT_REGION
+    ).get_paginator("list_objects_v2")
+
+    keys = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for s3_object in page.get("Contents", []):
+            if not s3_object["Key"].endswith("/"):
+                keys.append(s3_object["Key"])
+
+    return sorted(keys)
+
+
+def read_s3_parquet(
+    bucket: str, key: str, s3_client: Optional[Any] = None
+) -> "pa.Table":
+    """
+    read a parquet file of s3 into pyarrow
+
+    Parameters
+    ----------
+    bucket : str
+        s3 bucket name
+    key : str
+        key of the parquet file
+    s3_client : Optional[Any]
+        boto3 s3 client, shared by the threads reading in parallel
+        as creating clients from the default session is not thread-safe
+
+    Returns
+    -------
+    pa.Table
+        return of pyarrow table
+    """
+
+    import boto3
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if s3_client is None:
+        s3_client = boto3.client("s3", region_name=get_settings().AWS_DEFAULT_REGION)
+    body = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+
+    return pq.read_table(pa.BufferReader(body))
+
+
+def write_s3_parquet(
+    table: "pa.Table",
+    bucket: str,
+    key: str,
+    row_group_size: int = 1_000_000,
+    s3_client: Optional[Any] = None,
+):
+    """
+    write pyarrow table as a snappy parquet file of s3
+
+    Parameters
+    ----------
+    table : pa.Table
+        pyarrow table to write
+    bucket : str
+        s3 bucket name
+    key : str
+        key of the parquet file
+    row_group_size : int
+        maximum number of rows in each row group of the parquet file
+    s3_client : Optional[Any]
+        boto3 s3 client, shared by the threads writing in parallel
+    """
+
+    import boto3
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    buffer = pa.BufferOutputStream()
+    pq.write_table(table, buffer, row_group_size=row_group_size, compression="snappy")
+
+    if s3_client is None:
+        s3_client = boto3.client("s3", region_name=get_settings().AWS_DEFAULT_REGION)
+    s3_client.put_object(Bucket=bucket, Key=key, Body=buffer.getvalue().to_pybytes())
+
+
+def split_table_by_partition(
+    table: "pa.Table", partition_column: str, sort_by: Optional[List[str]] = None
+) -> List[Tuple[str, "pa.Table"]]:
+    """
+    split pyarrow table into one table per value of the partition column
+    the table is sorted once, and every partition is a zero-copy slice of it
+    without the partition column
+
+    Parameters
+    ----------
+    table : pa.Table
+        pyarrow table to split
+    partition_column : str
+        name of partition column
+    sort_by : Optional[List[str]]
+        columns the rows of every partition are sorted by
+
+    Returns
+    -------
+    List[Tuple[str, pa.Table]]
+        partition value and table of every partition, in partition order
+    """
+
+    import pyarrow.compute as pc
+
+    if table.column(partition_column).null_count:
+        raise ValueError(f"{partition_column} has null partition values")
+
+    sort_keys = [
+        (column, "ascending") for column in [partition_column, *(sort_by or [])]
+    ]
+    table = table.take(pc.sort_indices(table, sort_keys=sort_keys))
+
+    partitions = []
+    offset = 0
+    for value_count in pc.value_counts(table.column(partition_column)):
+        count = value_count["counts"].as_py()
+        partitions.append(
+            (
+                str(value_count["values"].as_py()),
+                table.slice(offset, count).drop([partition_column]),
+            )
+        )
+        offset += count
+
+    return partitions
+
+
+def delete_s3_prefix(s3_location: str) -> int:
+    """
+    delete every file under an s3 location
+
+    Parameters
+    ----------
+    s3_location : str
+        s3 location
+
+    Returns
+    -------
+    int
+        number of deleted files
+    """
+
+    import boto3
+
+    bucket, _ = split_s3_location(s3_location)
+    keys = list_s3_keys(s3_location)
+    s3_client = boto3.client("s3", region_name=get_settings().AWS_DEFAULT_REGION)
+
+    # delete_objects takes at most 1000 keys
+    for start in range(0, len(keys), 1000):
+        s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={
+                "Objects": [
+                    {"Key": key} for key in itertools.islice(keys, start, start + 1000)
+                ],
+                "Quiet": True,
+            },
+        )
+
+    return len(keys)
+
+
+def download_s3_object(
+    s3_location: str,
+    part_size: int = 8 * 1024**2,
+    max_workers: int = 16,
+    s3_client: Optional[Any] = None,
+) -> bytearray:
+    """
+    download an s3 object with parallel ranged GETs into one buffer
+
+    Parameters
+    ----------
+    s3_location : str
+        s3 location of the object
+    part_size : int
+        number of bytes of each ranged GET
+    max_workers : int
+        number of ranged GETs at the same time
+    s3_client : Optional[Any]
+        boto3 s3 client, shared by the threads downloading in parallel
+
+    Returns
+    -------
+    bytearray
+        content of the object
+    """
+
+    import boto3
+
+    if part_size <= 0:
+        raise ValueError("part_size must be a positive integer")
+
+    bucket, key = split_s3_location(s3_location)
+    key = key.rstrip("/")
+    if s3_client is None:
+        s3_client = boto3.client("s3", region_name=get_settings().AWS_DEFAULT_REGION)
+
+    content_length = s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    buffer = bytearray(content_length)
+    view = memoryview(buffer)
+
+    def download_part(start: int):
+        stop = min(start + part_size, content_length)
+        body = s3_client.get_object(
+            Bucket=bucket, Key=key, Range=f"bytes={start}-{stop - 1}"
+        )["Body"]
+        # each part is read straight into its slice of the buffer
+        part_view = view[start:stop]
+        while part_view:
+            amount_read = body.readinto(part_view)
+            if not amount_read:
+                raise OSError(f"Incomplete download of {s3_location}")
+            part_view = part_view[amount_read:]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(download_part, range(0, content_length, part_size)))
+
+    return buffer
+
+
+def get_athena_arrow_types(description: List[Tuple]) -> Dict[str, "pa.DataType"]:
+    """
+    get the pyarrow types of the columns of an athena result,
+    so the csv result file is parsed without type inference
+    types without a pyarrow equivalent, e.g. array, map or row, are kept as strings
+
+    Parameters
+    ----------
+    description : List[Tuple]
+        description of a pyathena cursor, name, type, precision and scale of columns
+
+    Returns
+    -------
+    Dict[str, pa.DataType]
+        pyarrow type of every column
+    """
+
+    import pyarrow as pa
+
+    athena_arrow_types = get_athena_arrow_type_map()
+    column_types = {}
+    for name, athena_type, _, _, precision, scale, _ in description:
+        if athena_type == "decimal":
+            column_types[name] = pa.decimal128(precision, scale)
+        else:
+            column_types[name] = athena_arrow_types.get(athena_type, pa.string())
+
+    return column_types
+
+
+def get_yaml_arrow_types(file_path: str) -> Dict[str, "pa.DataType"]:
+    """
+    get the pyarrow types of the columns declared in yaml config, so files
+    written to the table location have the types of the table
+    the partition column and types without a pyarrow equivalent,
+    e.g. array, map or struct, are left out
+
+    Parameters
+    ----------
+    file_path : str
+        file path of yaml schema
+
+    Returns
+    -------
+    Dict[str, pa.DataType]
+        pyarrow type of every column
+    """
+
+    import pyarrow as pa
+
+    with open(file_path) as file:
+        config_yaml = yaml.safe_load(file)
+
+    athena_arrow_types = get_athena_arrow_type_map()
+    column_types = {}
+    for column in config_yaml["tables"][0]["columns"]:
+        if "partition" in column["description"]:
+            continue
+
+        data_type = column["data_type"].lower().replace(" ", "")
+        decimal_type = re.fullmatch(r"decimal\((\d+),(\d+)\)", data_type)
+        if decimal_type:
+            column_types[column["name"]] = pa.decimal128(
+                int(decimal_type.group(1)), int(decimal_type.group(2))
+            )
+        elif re.fullmatch(r"(string|varchar|char)(\(\d+\))?", data_type):
+            column_types[column["name"]] = pa.string()
+        elif data_type in ("int", *athena_arrow_types):
+            # ddl int is named integer in the query results
+            column_types[column["name"]] = athena_arrow_types[
+                "integer" if data_type == "int" else data_type
+            ]
+
+    return column_types
+
+
+def read_athena_csv(
+    data: Union[bytes, bytearray], column_types: Dict[str, "pa.DataType"]
+) -> "pa.Table":
+    """
+    parse the csv result file of athena with the multithreaded pyarrow reader
+    athena quotes every value and leaves nulls unquoted and empty
+
+    Parameters
+    ----------
+    data : Union[bytes, bytearray]
+        content of the csv result file
+    column_types : Dict[str, pa.DataType]
+        pyarrow type of every column
+
+    Returns
+    -------
+    pa.Table
+        return of pyarrow table
+    """
+
+    import pyarrow as pa
+    import pyarrow.csv as pv
+
+    return pv.read_csv(
+        pa.BufferReader(pa.py_buffer(data)),
+        read_options=pv.ReadOptions(use_threads=True),
+        convert_options=pv.ConvertOptions(
+            column_types=column_types,
+            null_values=[""],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+
+
+def format_sql_unload(sql: str, s3_location: str) -> str:
+    """
+    wrap a query in an UNLOAD to snappy parquet files
+
+    Parameters
+    ----------
+    sql : str
+        query to unload
+    s3_location : str
+        s3 location the parquet files are written to
+
+    Returns
+    -------
+    str
+        UNLOAD sql
+    """
+
+    sql = sql.strip().rstrip(";").strip()
+
+    return (
+        f"UNLOAD ({sql})\nTO '{s3_location}'\n"
+        "WITH (format = 'PARQUET', compression = 'SNAPPY')"
+    )
+
+
+def format_sql_add_partitions(
+    table_name: str,
+    partition_column: str,
+    s3_location: str,
+    partition_values: List[str],
+    batch_size: int = 100,
+) -> List[str]:
+    """
+    format batched sql to add partitions to a table
+
+    Parameters
+    ----------
+    table_name : str
+        name of table
+    partition_column : str
+        name of partition column
+    s3_location : str
+        s3 location of the table
+    partition_values : List[str]
+        partition values to add
+    batch_size : int
+        maximum number of partitions added by each sql
+
+    Returns
+    -------
+    List[str]
+        ALTER TABLE ADD IF NOT EXISTS PARTITION sqls
+    """
+
+    if batch_size <= 0:
+        raise ValueError("batch_size must be a positive integer")
+
+    bucket, prefix = split_s3_location(s3_location)
+
+    partition_specs = []
+    for value in partition_values:
+        escaped_value = value.replace("'", "''")
+        partition_specs.append(
+            f"PARTITION ({partition_column}='{escaped_value}') "
+            f"LOCATION 's3://{bucket}/{prefix}{partition_column}={value}/'"
+        )
+
+    add_partitions_sqls = []
+    for start in range(0, len(partition_specs), batch_size):
+        batch_specs = itertools.islice(partition_specs, start, start + batch_size)
+        add_partitions_sqls.append(
+            f"ALTER TABLE {table_name} ADD IF NOT EXISTS\n" + "\n".join(batch_specs)
+        )
+
+    return add_partitions_sqls
+
+
+def split_date_key_range(
+    start_date_key: int, end_date_key: int, slice_days: int = 1
+) -> List[Tuple[int, int]]:
+    """
+    split an inclusive range of date dim keys into slices of whole days,
+    so every slice reads whole daily partitions
+
+    Parameters
+    ----------
+    start_date_key : int
+        first date dim key of the range, yyyyMMdd
+    end_date_key : int
+        last date dim key of the range, yyyyMMdd
+    slice_days : int
+        number of days in each slice
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        first and last date dim key of every slice, in date order
+    """
+
+    if slice_days <= 0:
+        raise ValueError("slice_days must be a positive integer")
+
+    start_date = datetime.datetime.strptime(str(start_date_key), "%Y%m%d")
+    end_date = datetime.datetime.strptime(str(end_date_key), "%Y%m%d")
+    if start_date > end_date:
+        raise ValueError("start_date_key must not be after end_date_key")
+
+    date_key_slices = []
+    while start_date <= end_date:
+        slice_end_date = min(
+            start_date + datetime.timedelta(days=slice_days - 1), end_date
+        )
+        date_key_slices.append(
+            (int(start_date.strftime("%Y%m%d")), int(slice_end_date.strftime("%Y%m%d")))
+        )
+        start_date = slice_end_date + datetime.timedelta(days=1)
+
+    return date_key_slices
@@ -1,20 +1,91 @@
 from __future__ import annotations
 
+import logging
 import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable
+from typing import Iterator
 
 import databricks
 import pandas as pd
+import pyarrow as pa
+import pyarrow.fs
 from databricks.sql import connect
+from databricks.sql.exc import RequestError
+
+from hip_data_ml_utils.core.databricks_utils import format_sql_copy_into
+from hip_data_ml_utils.core.databricks_utils import write_parquet_chunks
+from hip_data_ml_utils.core.dtype_utils import arrow_to_pandas
+from hip_data_ml_utils.core.dtype_utils import DTYPE_BACKENDS
+from hip_data_ml_utils.core.dtype_utils import normalise_arrow_table
+from hip_data_ml_utils.core.pool import ConnectionPool
+
+log = logging.getLogger(__name__)
 
 
 class DatabricksSQLClient:
     """
     Class that handles queries from databricks sql connector
     Main purpose is to create a connection we can query from databricks sql warehouse
+    Results are fetched as arrow instead of python rows
+    Connections are created lazily in a thread-safe pool of pool_size connections,
+    closed connections are replaced, and a query failing on a dropped connection
+    is retried once on a new connection
+    Timings of every query of query_many are passed to on_query_stats
     """
 
-    def __init__(self):
-        self.engine = self._connect()
+    def __init__(
+        self,
+        pool_size: int = 4,
+        warm_up: bool = False,
+        on_query_stats: Callable[[dict], None] | None = None,
+    ):
+        self.pool_size = pool_size
+        self.dtype_report = {}
+        self.on_query_stats = on_query_stats
+        self._pool = ConnectionPool(
+            connect=self._connect, pool_size=pool_size, health_check=_is_open
+        )
+        if warm_up:
+            self.warm_up()
+
+    def __enter__(self) -> DatabricksSQLClient:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def engine(self) -> databricks.sql.client.Connection:
+        """
+        first databricks sql connection of the pool, created on first use
+
+        Returns
+        -------
+        databricks.sql.client.Connection
+            databricks sql warehouse connection engine
+        """
+
+        with self._pool.connection():
+            return self._pool.connections[0]
+
+    @engine.setter
+    def engine(self, engine: databricks.sql.client.Connection):
+        """
+        replace the pool with a pool of a single connection
+
+        Parameters
+        ----------
+        engine : databricks.sql.client.Connection
+            databricks sql warehouse connection engine
+        """
+
+        self._pool = ConnectionPool(
+            connect=lambda: engine, pool_size=1, health_check=_is_open
+        )
 
     def _connect(self) -> databricks.sql.client.Connection:
         """
@@ -32,14 +103,175 @@ class DatabricksSQLClient:
             access_token=os.environ["DATABRICKS_TOKEN"],
         )
 
-    def query_as_pandas(self, final_query: str) -> pd.DataFrame:
+    @contextmanager
+    def _execute(self, final_query: str) -> Iterator[databricks.sql.client.Cursor]:
+        """
+        run a query on a connection of the pool, and lend its cursor for the
+        duration of the with block
+        if the connection was dropped, e.g. by an idle timeout, it is replaced
+        and the query is retried once on a new connection
+
+        Parameters
+        ----------
+        final_query : str
+            query to run
+
+        Yields
+        ------
+        databricks.sql.client.Cursor
+            databricks sql cursor of the query
+        """
+
+        connection = self._pool.acquire()
+        try:
+            _cursor = self._open_cursor(connection, final_query)
+        except Exception as error:
+            if not _is_connection_error(error):
+                self._pool.release(connection)
+                raise
+            log.warning("Databricks SQL connection dropped, reconnecting: %s", error)
+            self._pool.discard(connection)
+            connection = self._pool.acquire()
+            try:
+                _cursor = self._open_cursor(connection, final_query)
+            except Exception:
+                self._pool.discard(connection)
+                raise
+
+        try:
+            yield _cursor
+        finally:
+            _cursor.close()
+            self._pool.release(connection)
+
+    @staticmethod
+    def _open_cursor(
+        connection: databricks.sql.client.Connection, final_query: str
+    ) -> databricks.sql.client.Cursor:
+        """
+        open a cursor and run a query on it, the cursor is closed if the query fails
+
+        Parameters
+        ----------
+        connection : databricks.sql.client.Connection
+            databricks sql connection
+        final_query : str
+            query to run
+
+        Returns
+        -------
+        databricks.sql.client.Cursor
+            databricks sql cursor of the query
+        """
+
+        _cursor = connection.cursor()
+        try:
+            _cursor.execute(final_query)
+        except Exception:
+            try:
+                _cursor.close()
+            except Exception:
+                # e.g. the connection of the cursor was dropped
+                pass
+            raise
+
+        return _cursor
+
+    def warm_up(self) -> float:
+        """
+        run a ping query, so the cold start of the sql warehouse is absorbed
+        before the first real query
+
+        Returns
+        -------
+        float
+            seconds taken by the ping
+        """
+
+        start = time.perf_counter()
+        with self._execute("SELECT 1") as _cursor:
+            _cursor.fetchall()
+        warm_up_seconds = time.perf_counter() - start
+        log.info("Databricks SQL warehouse warmed up in %.1f seconds", warm_up_seconds)
+
+        return warm_up_seconds
+
+    def close(self):
+        """
+        close every connection of the pool
+        """
+
+        self._pool.close()
+
+    def query_as_arrow(self, final_query: str) -> pa.Table:
+        """
+        query databricks sqls with databricks connection and store them into pyarrow
+
+        Parameters
+        ----------
+        final_query : str
+            query to run
+
+        Returns
+        -------
+        pa.Table
+            return of pyarrow table
+        """
+
+        with self._execute(final_query) as _cursor:
+            return _cursor.fetchall_arrow()
+
+    def _to_pandas(
+        self, table: pa.Table, dtype_backend: str, downcast: bool
+    ) -> tuple[pd.DataFrame, dict]:
+        """
+        convert an arrow result into pandas
+        with the "numpy" backend, decimal, int, float and boolean columns are
+        changed to numpy types in bulk
+
+        Parameters
+        ----------
+        table : pa.Table
+            arrow result of a query
+        dtype_backend : str
+            "numpy" or "pyarrow"
+        downcast : bool
+            if True, downcast numeric columns to the smallest safe width
+
+        Returns
+        -------
+        pd.DataFrame
+            return of pandas dataframe
+        Dict
+            report of the conversion, empty with the "pyarrow" backend
+        """
+
+        if dtype_backend == "pyarrow":
+            return arrow_to_pandas(table=table, dtype_backend=dtype_backend), {}
+
+        return normalise_arrow_table(table=table, downcast=downcast)
+
+    def query_as_pandas(
+        self, final_query: str, dtype_backend: str = "numpy", downcast: bool = False
+    ) -> pd.DataFrame:
         """
         query databricks sqls with databricks connection and store them into pandas
+        the dataframe is built straight from the arrow result,
+        without a python row object per row
+        with the "numpy" backend, decimals are changed to float, and int, float
+        and boolean columns to numpy types like PyAthenaClient.query_as_pandas
+        the report of the conversion is kept in `self.dtype_report`
 
         Parameters
         ----------
         final_query : str
             query to run
+        dtype_backend : str
+            "numpy" for numpy dtypes,
+            "pyarrow" for pyarrow-backed pandas dtypes
+        downcast : bool
+            if True, downcast numeric columns to the smallest safe width,
+            only with the "numpy" backend
 
         Returns
         -------
@@ -47,9 +279,243 @@ class DatabricksSQLClient:
             return of pandas dataframe
         """
 
-        _cursor = self.engine.cursor()
-        return_values = _cursor.execute(final_query).fetchall()
+        if dtype_backend not in DTYPE_BACKENDS:
+            raise ValueError(f"dtype_backend can only be one of {DTYPE_BACKENDS}")
 
-        return pd.DataFrame(
-            return_values, columns=[col[0] for col in _cursor.description]
+        return_df, self.dtype_report = self._to_pandas(
+            table=self.query_as_arrow(final_query),
+            dtype_backend=dtype_backend,
+            downcast=downcast,
         )
+
+        return return_df
+
+    def query_many(
+        self,
+        queries: list[str],
+        max_concurrency: int | None = None,
+        dtype_backend: str = "numpy",
+        downcast: bool = False,
+    ) -> list[pd.DataFrame]:
+        """
+        query many independent databricks sqls concurrently over the connections
+        of the pool, instead of one after another
+        if a query fails, the queries not started yet are cancelled
+        the timings of every query are passed to on_query_stats, from the thread
+        that ran the query
+
+        Parameters
+        ----------
+        queries : List[str]
+            queries to run
+        max_concurrency : Optional[int]
+            maximum number of queries running at the same time,
+            defaults to the pool size
+        dtype_backend : str
+            "numpy" for numpy dtypes,
+            "pyarrow" for pyarrow-backed pandas dtypes
+        downcast : bool
+            if True, downcast numeric columns to the smallest safe width,
+            only with the "numpy" backend
+
+        Returns
+        -------
+        List[pd.DataFrame]
+            return of pandas dataframes in the same order as the queries
+        """
+
+        max_concurrency = max_concurrency or self.pool_size
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be a positive integer")
+        if dtype_backend not in DTYPE_BACKENDS:
+            raise ValueError(f"dtype_backend can only be one of {DTYPE_BACKENDS}")
+
+        def run_query(final_query: str) -> pd.DataFrame:
+            start = time.perf_counter()
+            table = self.query_as_arrow(final_query)
+            query_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            return_df, _ = self._to_pandas(
+                table=table, dtype_backend=dtype_backend, downcast=downcast
+            )
+
+            if self.on_query_stats is not None:
+                self.on_query_stats(
+                    {
+                        "query": final_query,
+                        "query_seconds": query_seconds,
+                        "conversion_seconds": time.perf_counter() - start,
+                        "rows": table.num_rows,
+                    }
+                )
+
+            return return_df
+
+        executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        try:
+            futures = [executor.submit(run_query, query) for query in queries]
+            return_dfs = [future.result() for future in futures]
+        except Exception:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+        return return_dfs
+
+    def bulk_load(
+        self,
+        df: pd.DataFrame,
+        table_name: str,
+        staging_location: str,
+        chunk_rows: int = 1_000_000,
+        max_workers: int = 8,
+        cleanup: bool = True,
+    ) -> int:
+        """
+        load a dataframe into a table by staging it as parquet files written in
+        parallel, and loading them with a single COPY INTO
+        instead of inserting the rows one by one through the cursor
+        the files are staged under a new directory of staging_location,
+        which is deleted once they are loaded
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            dataframe to load, with the columns of the table
+        table_name : str
+            name of table
+        staging_location : str
+            directory the sql warehouse can read, e.g. an s3 location
+        chunk_rows : int
+            maximum number of rows in each parquet file
+        max_workers : int
+            number of parquet files written at the same time
+        cleanup : bool
+            if False, keep the staged parquet files
+
+        Returns
+        -------
+        int
+            number of loaded rows
+        """
+
+        staging_location = f"{staging_location.rstrip('/')}/{uuid.uuid4().hex}"
+
+        try:
+            write_parquet_chunks(
+                df=df,
+                staging_location=staging_location,
+                chunk_rows=chunk_rows,
+                max_workers=max_workers,
+            )
+            # COPY INTO returns once the staged files are loaded
+            with self._execute(
+                format_sql_copy_into(
+                    table_name=table_name, staging_location=staging_location
+                )
+            ):
+                pass
+        finally:
+            if cleanup:
+                filesystem, staging_path = pyarrow.fs.FileSystem.from_uri(
+                    staging_location
+                )
+                file_type = filesystem.get_file_info(staging_path).type
+                if file_type != pyarrow.fs.FileType.NotFound:
+                    filesystem.delete_dir(staging_path)
+
+        return len(df)
+
+    def iter_query(
+        self,
+        final_query: str,
+        batch_rows: int = 1_000_000,
+        as_arrow: bool = False,
+        dtype_backend: str = "numpy",
+        downcast: bool = False,
+    ) -> Iterator[pd.DataFrame | pa.Table]:
+        """
+        query databricks sqls with databricks connection and yield the result
+        in batches fetched as arrow
+        peak memory depends on batch_rows instead of the size of the result
+
+        an int column is converted per batch, so it may come back as int in
+        one batch and as float in another batch that contains nulls
+        the report of the conversion of the last batch is kept in `self.dtype_report`
+
+        Parameters
+        ----------
+        final_query : str
+            query to run
+        batch_rows : int
+            number of rows in each yielded batch
+        as_arrow : bool
+            if True, yield pyarrow tables instead of pandas dataframes
+        dtype_backend : str
+            "numpy" for numpy dtypes,
+            "pyarrow" for pyarrow-backed pandas dtypes
+        downcast : bool
+            if True, downcast numeric columns of every batch to the smallest
+            safe width, only with the "numpy" backend
+
+        Yields
+        ------
+        Union[pd.DataFrame, pa.Table]
+            batch of the query result as a pandas dataframe, or pyarrow table
+        """
+
+        if batch_rows <= 0:
+            raise ValueError("batch_rows must be a positive integer")
+        if dtype_backend not in DTYPE_BACKENDS:
+            raise ValueError(f"dtype_backend can only be one of {DTYPE_BACKENDS}")
+
+        with self._execute(final_query) as _cursor:
+            while True:
+                batch_table = _cursor.fetchmany_arrow(batch_rows)
+                if batch_table.num_rows == 0:
+                    break
+                if as_arrow:
+                    yield batch_table
+                    continue
+                batch_df, self.dtype_report = self._to_pandas(
+                    table=batch_table, dtype_backend=dtype_backend, downcast=downcast
+                )
+                yield batch_df
+
+
+def _is_open(connection: databricks.sql.client.Connection) -> bool:
+    """
+    health check of the connections of the pool
+
+    Parameters
+    ----------
+    connection : databricks.sql.client.Connection
+        databricks sql warehouse connection engine
+
+    Returns
+    -------
+    bool
+        True if the connection is still open
+    """
+
+    return connection.open
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """
+    check if a query failed because its connection was dropped,
+    rather than because of the query itself
+
+    Parameters
+    ----------
+    error : Exception
+        error of the query
+
+    Returns
+    -------
+    bool
+        True if the query can be retried on a new connection
+    """
+
+    return isinstance(error, RequestError) or "Invalid SessionHandle" in str(error)
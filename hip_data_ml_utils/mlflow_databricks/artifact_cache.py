@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import pathlib
+import shutil
+import tempfile
+from typing import Iterable
+from typing import TYPE_CHECKING
+
+from hip_data_ml_utils.core.file_cache import FileCache
+from hip_data_ml_utils.core.file_cache import open_atomic
+from hip_data_ml_utils.mlflow_databricks.model_cache import get_registered_model_name
+from hip_data_ml_utils.mlflow_databricks.model_cache import LazyMlflowClient
+from hip_data_ml_utils.mlflow_databricks.model_cache import resolve_model_uri
+
+if TYPE_CHECKING:
+    import mlflow
+
+
+class ArtifactCache(FileCache, LazyMlflowClient):
+    """
+    Class that caches downloaded mlflow artifacts in a local directory
+    Files are stored once per sha256 of their content, and referenced by the
+    run id (or model version) and path of the artifact, so a warm hit of a
+    runs:/ uri is read from local disk without calling the tracking server
+    The least recently used files are evicted once the total size of the cache
+    goes over max_size_bytes, and references to an evicted file become misses
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_size_bytes: int = 5 * 1024**3,
+        mlflow_client: mlflow.tracking.client.MlflowClient | None = None,
+    ):
+        super().__init__(cache_dir=cache_dir, max_size_bytes=max_size_bytes)
+        self.objects_dir = self.cache_dir / "objects"
+        self.refs_dir = self.cache_dir / "refs"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.refs_dir.mkdir(parents=True, exist_ok=True)
+        self._mlflow_client = mlflow_client
+
+    def make_key(self, artifact_uri: str, artifact_name: str) -> str | None:
+        """
+        create the cache key of an artifact from its run id and path,
+        model uris are resolved to their model version first
+        other uris, e.g. s3:// locations, can change and are not cached
+
+        Parameters
+        ----------
+        artifact_uri: str
+            URI pointing to the artifacts, e.g. ``runs:/<run_id>/path``
+        artifact_name: str
+            name of the artifact
+
+        Returns
+        -------
+        Optional[str]
+            sha256 hash of the resolved artifact, None if it cannot be cached
+        """
+
+        if artifact_uri.startswith("runs:/"):
+            resolved_uri = artifact_uri.rstrip("/")
+        elif get_registered_model_name(artifact_uri) is not None:
+            resolved_uri = resolve_model_uri(artifact_uri, self.mlflow_client)
+        else:
+            return None
+
+        return hashlib.sha256(f"{resolved_uri}/{artifact_name}".encode()).hexdigest()
+
+    def _ref_path(self, key: str) -> pathlib.Path:
+        return self.refs_dir / f"{key}.json"
+
+    def get(self, key: str) -> pathlib.Path | None:
+        """
+        get the local path of a cached artifact, None if it is missing
+
+        Parameters
+        ----------
+        key : str
+            cache key
+
+        Returns
+        -------
+        Optional[pathlib.Path]
+            path of the cached file
+        """
+
+        try:
+            object_path = (
+                self.objects_dir / json.loads(self._ref_path(key).read_text())["object"]
+            )
+            self._touch(object_path)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        return object_path
+
+    def put(self, key: str, local_path: str) -> pathlib.Path:
+        """
+        copy a downloaded file into the cache, then evict files over the size cap
+        a file with the same content as a cached file is not copied again
+
+        Parameters
+        ----------
+        key : str
+            cache key
+        local_path : str
+            path of the downloaded file
+
+        Returns
+        -------
+        pathlib.Path
+            path of the cached file
+        """
+
+        content_hash = hashlib.sha256()
+        with open(local_path, "rb") as source:
+            for block in iter(lambda: source.read(1024**2), b""):
+                content_hash.update(block)
+
+        # keep the suffixes, pandas infers the compression of a pickle from them
+        object_name = content_hash.hexdigest() + "".join(
+            pathlib.Path(local_path).suffixes
+        )
+        object_path = self.objects_dir / object_name
+        if object_path.exists():
+            self._touch(object_path)
+        else:
+            with open(local_path, "rb") as source, open_atomic(object_path) as tmp_file:
+                shutil.copyfileobj(source, tmp_file, 1024**2)
+
+        with open_atomic(self._ref_path(key), mode="w") as tmp_file:
+            json.dump({"object": object_name}, tmp_file)
+
+        self._evict(keep=object_path)
+
+        return object_path
+
+    def download(self, artifact_uri: str, artifact_name: str) -> str:
+        """
+        get the local path of an artifact, downloading it on a miss
+
+        Parameters
+        ----------
+        artifact_uri: str
+            URI pointing to the artifacts, e.g. ``runs:/<run_id>/path``
+        artifact_name: str
+            name of the artifact, a single file
+
+        Returns
+        -------
+        str
+            local path of the artifact
+        """
+
+        import mlflow
+
+        key = self.make_key(artifact_uri, artifact_name)
+        if key is None:
+            return mlflow.artifacts.download_artifacts(
+                artifact_uri=f"{artifact_uri}/{artifact_name}"
+            )
+
+        object_path = self.get(key)
+        if object_path is not None:
+            return str(object_path)
+
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            downloaded_path = mlflow.artifacts.download_artifacts(
+                artifact_uri=f"{artifact_uri}/{artifact_name}", dst_path=tmp_dir
+            )
+            return str(self.put(key, downloaded_path))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def invalidate(self, key: str | None = None):
+        """
+        remove the reference of an artifact, or every file if key is None
+        files only referenced by the removed key are left to the eviction
+
+        Parameters
+        ----------
+        key : Optional[str]
+            cache key
+        """
+
+        if key is not None:
+            self._ref_path(key).unlink(missing_ok=True)
+            return
+
+        for path in self.refs_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+        for _, _, path in self._entries():
+            self._remove(path)
+
+    def _entry_paths(self) -> Iterable[pathlib.Path]:
+        return (path for path in self.objects_dir.iterdir() if path.suffix != ".tmp")
@@ -1,24 +1,36 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 from typing import Dict
+from typing import List
 from typing import Optional
 from typing import Tuple
+from typing import TYPE_CHECKING
 from typing import Union
 
-import mlflow
-import pandas as pd
-import torch
-
 from hip_data_ml_utils.core.databricks_utils import get_target_stage_for_env
 from hip_data_ml_utils.core.databricks_utils import load_yaml
+from hip_data_ml_utils.mlflow_databricks.registry_snapshot import RegistrySnapshot
+
+if TYPE_CHECKING:
+    import mlflow
+    import torch
+
+    from hip_data_ml_utils.mlflow_databricks.artifact_cache import ArtifactCache
+    from hip_data_ml_utils.mlflow_databricks.model_cache import ModelCache
 
 # from joblib import load
 
 
+ARTIFACT_TYPES = ("joblib", "pkl", "dict", "yaml")
+
+
 def mlflow_load_model(
     model_uri: str,
     type_of_model: str,
     model_func_dict: dict,
-    device: Optional[torch.device] = None,
+    device: Optional["torch.device"] = None,
+    cache: Optional["ModelCache"] = None,
 ) -> Any:
     """
     function to load model from mlflow
@@ -33,6 +45,8 @@ def mlflow_load_model(
         dictionary of model function to call
     device: Optional[torch.device]
         device to load the model onto; cpu, cuda
+    cache: Optional[ModelCache]
+        if provided, loaded models are kept in and reused from this cache
 
     Returns
     -------
@@ -40,6 +54,17 @@ def mlflow_load_model(
         model
     """
 
+    if cache is not None:
+        return cache.load(
+            model_uri,
+            lambda resolved_uri: mlflow_load_model(
+                resolved_uri, type_of_model, model_func_dict, device
+            ),
+            variant=f"{type_of_model}:{device}",
+        )
+
+    import mlflow
+
     if type_of_model == "pytorch_model":
         model_func = getattr(mlflow, model_func_dict[type_of_model][0])
         return model_func.load_model(model_uri=model_uri, map_location=device)
@@ -54,6 +79,7 @@ def mlflow_load_artifact(
     artifact_uri: str,
     artifact_name: str,
     type_of_artifact: str = "joblib",
+    cache: Optional["ArtifactCache"] = None,
 ) -> Any:
     """
     function to load artifact from mlflow
@@ -66,6 +92,10 @@ def mlflow_load_artifact(
         ``"models:/my_model/Production"``, or ``"s3://my_bucket/my/file.txt"``
     artifact_name: str
         Name of the artifact to load
+    type_of_artifact: str
+        file type of the artifact; joblib, pkl, dict or yaml
+    cache: Optional[ArtifactCache]
+        if provided, downloads are kept in and reused from this local cache
 
     Returns
     -------
@@ -73,22 +103,136 @@ def mlflow_load_artifact(
         artifact
     """
 
-    if type_of_artifact not in ("joblib", "pkl", "dict", "yaml"):
+    if type_of_artifact not in ARTIFACT_TYPES:
         raise ValueError("Artifact type not supported")
 
-    if type_of_artifact in ("joblib", "pkl", "dict"):
-        return pd.read_pickle(  # noqa: S301
-            mlflow.artifacts.download_artifacts(
-                artifact_uri=f"{artifact_uri}/{artifact_name}"
+    return _read_artifact(
+        _download_artifact(artifact_uri, artifact_name, cache), type_of_artifact
+    )
+
+
+def mlflow_load_artifacts(
+    artifact_uri: str,
+    artifacts: List[Tuple[str, str]],
+    max_workers: int = 8,
+    cache: Optional["ArtifactCache"] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Dict]]:
+    """
+    function to load several artifacts of an mlflow uri concurrently,
+    so loading them takes roughly as long as the largest artifact
+
+    Parameters
+    ----------
+    artifact_uri: str
+        URI pointing to the artifacts, such as
+        ``"runs:/500cf58bee2b40a4a82861cc31a617b1"`` or
+        ``"models:/my_model/Production"``
+    artifacts: List[Tuple[str, str]]
+        artifact_name and type_of_artifact of every artifact to load
+    max_workers: int
+        number of artifacts downloaded and deserialized at the same time
+    cache: Optional[ArtifactCache]
+        if provided, downloads are kept in and reused from this local cache
+
+    Returns
+    -------
+    Dict[str, Any]
+        artifacts by artifact_name
+    Dict[str, Dict]
+        download_seconds and load_seconds of every artifact by artifact_name
+    """
+
+    for _, type_of_artifact in artifacts:
+        if type_of_artifact not in ARTIFACT_TYPES:
+            raise ValueError("Artifact type not supported")
+    # results are keyed by artifact_name, a repeated name would be dropped
+    artifact_names = [artifact_name for artifact_name, _ in artifacts]
+    if len(set(artifact_names)) != len(artifact_names):
+        raise ValueError("Artifact names must be unique")
+
+    def load_artifact(artifact_name: str, type_of_artifact: str) -> Tuple[Any, Dict]:
+        start = time.perf_counter()
+        local_path = _download_artifact(artifact_uri, artifact_name, cache)
+        downloaded = time.perf_counter()
+        artifact = _read_artifact(local_path, type_of_artifact)
+
+        return artifact, {
+            "download_seconds": downloaded - start,
+            "load_seconds": time.perf_counter() - downloaded,
+        }
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            artifact_name: executor.submit(
+                load_artifact, artifact_name, type_of_artifact
             )
-        )
-    return load_yaml(
-        mlflow.artifacts.download_artifacts(
-            artifact_uri=f"{artifact_uri}/{artifact_name}"
-        )
+            for artifact_name, type_of_artifact in artifacts
+        }
+        results = {
+            artifact_name: future.result() for artifact_name, future in futures.items()
+        }
+
+    return (
+        {artifact_name: result[0] for artifact_name, result in results.items()},
+        {artifact_name: result[1] for artifact_name, result in results.items()},
+    )
+
+
+def _download_artifact(
+    artifact_uri: str, artifact_name: str, cache: Optional["ArtifactCache"]
+) -> str:
+    """
+    function to download an artifact, through the cache if one is given
+
+    Parameters
+    ----------
+    artifact_uri: str
+        URI pointing to the artifacts
+    artifact_name: str
+        name of the artifact
+    cache: Optional[ArtifactCache]
+        local artifact cache
+
+    Returns
+    -------
+    str
+        local path of the artifact
+    """
+
+    import mlflow
+
+    if cache is not None:
+        return cache.download(artifact_uri, artifact_name)
+
+    return mlflow.artifacts.download_artifacts(
+        artifact_uri=f"{artifact_uri}/{artifact_name}"
     )
 
 
+def _read_artifact(local_path: str, type_of_artifact: str) -> Any:
+    """
+    function to read a downloaded artifact
+
+    Parameters
+    ----------
+    local_path: str
+        local path of the artifact
+    type_of_artifact: str
+        type of artifact, joblib, pkl and dict are unpickled, yaml is parsed
+
+    Returns
+    -------
+    Any
+        artifact
+    """
+
+    import pandas as pd
+
+    if type_of_artifact in ("joblib", "pkl", "dict"):
+        return pd.read_pickle(local_path)  # noqa: S301
+    return load_yaml(local_path)
+
+
 def mlflow_get_model_metrics(
     run_id: str, key_value_metrics: str = None
 ) -> Union[float, int, Dict]:
@@ -108,6 +252,8 @@ def mlflow_get_model_metrics(
         return evaluation metric in int or float, or all metrics with Dict
     """
 
+    import mlflow
+
     model_metrics_informtion = mlflow.get_run(
         run_id=run_id,
     ).data.metrics
@@ -119,9 +265,10 @@ def mlflow_get_model_metrics(
 
 
 def mlflow_get_model_version(
-    mlflow_client: mlflow.tracking.client.MlflowClient,
+    mlflow_client: "mlflow.tracking.client.MlflowClient",
     name: str,
     stage: str = "Production",
+    registry_snapshot: Optional[RegistrySnapshot] = None,
 ) -> int:
     """
     function to get model version of "Staging" or "Production"
@@ -134,6 +281,8 @@ def mlflow_get_model_version(
         name of registered model
     stage: str
         stage of registered model; Staging or Production
+    registry_snapshot: Optional[RegistrySnapshot]
+        if provided, versions are looked up in this snapshot instead of listed
 
     Returns
     -------
@@ -144,17 +293,19 @@ def mlflow_get_model_version(
     if stage not in ["Staging", "Production"]:
         raise ValueError("stage can only be Staging or Production")
 
-    for _, rm in enumerate(mlflow_client.search_model_versions(f"name='{name}'")):
-        if rm.current_stage == stage:
-            return int(rm.version)
+    registry_snapshot = _get_registry_snapshot(mlflow_client, name, registry_snapshot)
+    stage_versions = registry_snapshot.get_stage_versions(stage)
+    if stage_versions:
+        return int(stage_versions[0].version)
 
     raise ValueError(f"There is no model version with the tag of '{stage}")
 
 
 def mlflow_get_model_stage_description(
     name: str,
-    mlflow_client: mlflow.tracking.client.MlflowClient,
+    mlflow_client: "mlflow.tracking.client.MlflowClient",
     stage: str = "Production",
+    registry_snapshot: Optional[RegistrySnapshot] = None,
 ) -> str:
     """
     function to get model information of "Staging" or "Production"
@@ -167,6 +318,8 @@ def mlflow_get_model_stage_description(
         name of registered model
     stage: str
         stage of registered model; Staging or Production
+    registry_snapshot: Optional[RegistrySnapshot]
+        if provided, versions are looked up in this snapshot instead of listed
 
     Returns
     -------
@@ -177,18 +330,20 @@ def mlflow_get_model_stage_description(
     if stage not in ["Staging", "Production"]:
         raise ValueError("stage can only be Staging or Production")
 
-    for _, rm in enumerate(mlflow_client.search_model_versions(f"name='{name}'")):
-        if rm.current_stage == stage:
-            return str(rm.description)
+    registry_snapshot = _get_registry_snapshot(mlflow_client, name, registry_snapshot)
+    stage_versions = registry_snapshot.get_stage_versions(stage)
+    if stage_versions:
+        return str(stage_versions[0].description)
 
     raise ValueError(f"There is no model with the tag of '{stage}")
 
 
 def mlflow_get_both_registered_model_info_run_id(
     name: str,
-    mlflow_client: mlflow.tracking.client.MlflowClient,
+    mlflow_client: "mlflow.tracking.client.MlflowClient",
     run_id: str = None,
     stage: str = "Production",
+    registry_snapshot: Optional[RegistrySnapshot] = None,
 ) -> Tuple[str, Dict]:
     """
     function to get run_id of registered model given its stage
@@ -204,6 +359,8 @@ def mlflow_get_both_registered_model_info_run_id(
         initialised mlflow client
     stage: str
         stage of registered model; Staging or Production
+    registry_snapshot: Optional[RegistrySnapshot]
+        if provided, versions are looked up in this snapshot instead of listed
 
     Returns
     -------
@@ -216,17 +373,49 @@ def mlflow_get_both_registered_model_info_run_id(
     if stage not in ["Staging", "Production"]:
         raise ValueError("stage can only be Staging or Production")
 
-    current_model_run_id = None
-    registered_model_information = None
+    registry_snapshot = _get_registry_snapshot(mlflow_client, name, registry_snapshot)
+    stage_versions = registry_snapshot.get_stage_versions(stage)
+
+    current_model_run_id = stage_versions[-1].run_id if stage_versions else None
+    registered_model_information = registry_snapshot.get_by_run_id(run_id)
 
-    for _, rm in enumerate(mlflow_client.search_model_versions(f"name='{name}'")):
-        if rm.current_stage == stage:
-            current_model_run_id = rm.run_id
-        if rm.run_id == run_id:
-            registered_model_information = rm
     return current_model_run_id, registered_model_information
 
 
+def _get_registry_snapshot(
+    mlflow_client: "mlflow.tracking.client.MlflowClient",
+    name: str,
+    registry_snapshot: Optional[RegistrySnapshot],
+) -> RegistrySnapshot:
+    """
+    function to get the registry snapshot of a registered model,
+    a new snapshot is listed if none is given
+
+    Parameters
+    ----------
+    mlflow_client: mlflow.tracking.client.MlflowClient
+        initialised mlflow client
+    name: str
+        name of registered model
+    registry_snapshot: Optional[RegistrySnapshot]
+        snapshot of the registered model shared between lookups
+
+    Returns
+    -------
+    RegistrySnapshot
+        snapshot of the registered model
+    """
+
+    if registry_snapshot is None:
+        return RegistrySnapshot(mlflow_client=mlflow_client, name=name)
+    if registry_snapshot.name != name:
+        raise ValueError(
+            f"registry_snapshot is of '{registry_snapshot.name}', not of '{name}'"
+        )
+
+    return registry_snapshot
+
+
 def mlflow_promote_model(
     name: str,
     retrained_run_id: str,
@@ -234,10 +423,11 @@ def mlflow_promote_model(
     start_date: str,
     eval_date: str,
     env: str,
-    mlflow_client: mlflow.tracking.client.MlflowClient,
+    mlflow_client: "mlflow.tracking.client.MlflowClient",
     metrics_name: str,
     prev_run_id: str = None,
     prev_metric: float = 0.0,
+    registry_snapshot: Optional[RegistrySnapshot] = None,
 ) -> str:
     """
     function to promote registered model to corresponding stage based on running env
@@ -266,6 +456,9 @@ def mlflow_promote_model(
         default None, run_id of previous model
     prev_metric: float
         default 0.0, metric of previous model
+    registry_snapshot: Optional[RegistrySnapshot]
+        if provided, versions are looked up in this snapshot instead of listed,
+        and the snapshot is invalidated once the model is transitioned
 
     Returns
     -------
@@ -274,10 +467,12 @@ def mlflow_promote_model(
     """
 
     target_stage = get_target_stage_for_env(env=env)
+    registry_snapshot = _get_registry_snapshot(mlflow_client, name, registry_snapshot)
     _, rm_retrained = mlflow_get_both_registered_model_info_run_id(
         name=name,
         run_id=retrained_run_id,
         mlflow_client=mlflow_client,
+        registry_snapshot=registry_snapshot,
     )
 
     if rm_retrained.current_stage != target_stage:
@@ -294,8 +489,11 @@ def mlflow_promote_model(
                 name=name,
                 run_id=prev_run_id,
                 mlflow_client=mlflow_client,
+                registry_snapshot=registry_snapshot,
             )
             prev_version = prev_run.version
+        # the stages of the listed versions are out of date after the transition
+        registry_snapshot.invalidate()
 
         mlflow_client.update_model_version(
             name=name,
@@ -315,7 +513,7 @@ def mlflow_promote_model(
 def mlflow_decision_to_promote(
     mlflow_model_name: str,  # NOSONAR
     env: str,
-    mlflow_client: mlflow.tracking.client.MlflowClient,
+    mlflow_client: "mlflow.tracking.client.MlflowClient",
     challenger_run_id: str,
     champion_run_id: str,
     eval_date: str,
@@ -3,7 +3,7 @@ import logging
 import polling
 import requests
 
-from hip_data_ml_utils.core.config import settings
+from hip_data_ml_utils.core.config import get_settings
 
 log = logging.getLogger(__name__)
 
@@ -60,8 +60,8 @@ def enable_endpoint(
                     "model_name": model_name,
                     "model_version": model_version,
                     "workload_type": workload_type,
-                    "workload_size": settings.MODEL_SERVING_WORKLOAD_SIZE,
-                    "scale_to_zero_enabled": settings.MODEL_SERVING_SCALE_TO_ZERO,
+                    "workload_size": get_settings().MODEL_SERVING_WORKLOAD_SIZE,
+                    "scale_to_zero_enabled": get_settings().MODEL_SERVING_SCALE_TO_ZERO,
                 }
             ]
         },
@@ -1,11 +1,10 @@
 import tempfile
 from typing import Any
 from typing import Optional
+from typing import TYPE_CHECKING
 
-import mlflow
-from joblib import dump
-from mlflow.exceptions import MlflowException
-from mlflow.models.signature import ModelSignature
+if TYPE_CHECKING:
+    from mlflow.models.signature import ModelSignature
 
 
 def mlflow_log_artifact(
@@ -32,6 +31,10 @@ def mlflow_log_artifact(
         mlflow run_id if provided
     """
 
+    import mlflow
+    from joblib import dump
+    from mlflow.exceptions import MlflowException
+
     with tempfile.TemporaryDirectory() as tmp_dir:
         if local_path is None:
             local_path = f"{tmp_dir}/{artifact_name}.joblib"
@@ -56,7 +59,7 @@ def mlflow_log_register_model(
     model_func_dict: dict,
     artifact_path: str,
     input_example: Optional[list] = None,
-    signature: Optional[ModelSignature] = None,
+    signature: Optional["ModelSignature"] = None,
     name_of_registered_model: str = None,
     extra_pip_requirements: Optional[list] = None,
     code_path: Optional[list] = None,
@@ -101,6 +104,9 @@ def mlflow_log_register_model(
         the model is loaded.
     """
 
+    import mlflow
+    from mlflow.exceptions import MlflowException
+
     if type_of_model in model_func_dict:
         if mlflow.active_run():
             model_func = getattr(mlflow, model_func_dict[type_of_model][0])
@@ -134,6 +140,9 @@ def mlflow_log_params(params: dict) -> str:
         dictionary of params
     """
 
+    import mlflow
+    from mlflow.exceptions import MlflowException
+
     if mlflow.active_run():
         mlflow.log_params(params=params)
         return f"params {params} logged"
@@ -162,6 +171,9 @@ def mlflow_log_metric(
         mlflow run_id
     """
 
+    import mlflow
+    from mlflow.exceptions import MlflowException
+
     if mlflow.active_run():
         mlflow.log_metric(key=key, value=value, step=step)
         return f"model evaluation metric {key}, {value} logged"
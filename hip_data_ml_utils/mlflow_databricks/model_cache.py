@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import pickle  # noqa: S403
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import mlflow
+
+
+class _ByteCounter:
+    """file-like object that only counts the bytes written to it"""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        return len(data)
+
+
+def estimate_model_size(model: Any) -> int:
+    """
+    function that estimates the memory held by a loaded model
+    torch modules are measured from their parameters and buffers,
+    other models from the size of their pickle
+
+    Parameters
+    ----------
+    model: Any
+        loaded model
+
+    Returns
+    -------
+    int
+        estimated size in bytes, 0 if the model cannot be measured
+    """
+    if hasattr(model, "parameters") and hasattr(model, "buffers"):
+        return sum(
+            tensor.numel() * tensor.element_size()
+            for tensors in (model.parameters(), model.buffers())
+            for tensor in tensors
+        )
+
+    byte_counter = _ByteCounter()
+    try:
+        pickle.dump(model, byte_counter, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        # e.g. models holding locks or native handles
+        return 0
+
+    return byte_counter.size
+
+
+def get_registered_model_name(model_uri: str) -> str | None:
+    """
+    function that gets the registered model name of a models:/ uri
+
+    Parameters
+    ----------
+    model_uri: str
+        uri of the model, e.g. ``models:/my_model/Production``
+
+    Returns
+    -------
+    Optional[str]
+        name of the registered model, None for other uris
+    """
+    if not model_uri.startswith("models:/"):
+        return None
+
+    return model_uri.removeprefix("models:/").split("/")[0].split("@")[0]
+
+
+def resolve_model_uri(
+    model_uri: str, mlflow_client: mlflow.tracking.client.MlflowClient
+) -> str:
+    """
+    function that resolves a stage or alias uri to the uri of a model version,
+    other uris are already immutable and returned as they are
+
+    Parameters
+    ----------
+    model_uri: str
+        uri of the model, e.g. ``models:/my_model/Production``
+    mlflow_client: mlflow.tracking.client.MlflowClient
+        initialised mlflow client
+
+    Returns
+    -------
+    str
+        uri of the model version, e.g. ``models:/my_model/3``
+    """
+    name = get_registered_model_name(model_uri)
+    if name is None:
+        return model_uri
+
+    reference = model_uri.removeprefix(f"models:/{name}")
+    if reference.startswith("@"):
+        version = mlflow_client.get_model_version_by_alias(
+            name, reference.removeprefix("@")
+        ).version
+    else:
+        stage = reference.strip("/")
+        if stage.isdigit():
+            return model_uri
+        versions = mlflow_client.get_latest_versions(
+            name, stages=None if stage.lower() == "latest" else [stage]
+        )
+        if not versions:
+            raise ValueError(f"There is no model version with the tag of '{stage}'")
+        version = max(int(model_version.version) for model_version in versions)
+
+    return f"models:/{name}/{version}"
+
+
+class LazyMlflowClient:
+    """
+    Mixin class of the caches that resolve model uris with an mlflow client,
+    the client is created on first use unless one is given
+    """
+
+    _mlflow_client: mlflow.tracking.client.MlflowClient | None = None
+
+    @property
+    def mlflow_client(self) -> mlflow.tracking.client.MlflowClient:
+        if self._mlflow_client is None:
+            from mlflow.tracking import MlflowClient
+
+            self._mlflow_client = MlflowClient()
+        return self._mlflow_client
+
+
+class ModelCache(LazyMlflowClient):
+    """
+    Class that keeps loaded models in memory, keyed on their model version
+    Stage and alias uris are resolved to a version on every lookup, so a newly
+    promoted version is loaded on the next call, and the least recently used
+    models are evicted once there are more than max_models of them or their
+    estimated size goes over max_size_bytes
+    Models are only measured with size_of when max_size_bytes is set
+    """
+
+    def __init__(
+        self,
+        max_models: int = 4,
+        max_size_bytes: int | None = None,
+        mlflow_client: mlflow.tracking.client.MlflowClient | None = None,
+        size_of: Callable[[Any], int] = estimate_model_size,
+    ):
+        if max_models <= 0:
+            raise ValueError("max_models must be a positive integer")
+
+        self.max_models = max_models
+        self.max_size_bytes = max_size_bytes
+        self.size_of = size_of
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = 0.0
+        self._mlflow_client = mlflow_client
+        self._entries: OrderedDict[tuple[str, str], tuple[Any, int]] = OrderedDict()
+        self._loading_locks: dict[tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def resolve_model_uri(self, model_uri: str) -> str:
+        """
+        resolve a stage or alias uri to the uri of a model version
+
+        Parameters
+        ----------
+        model_uri: str
+            uri of the model, e.g. ``models:/my_model/Production``
+
+        Returns
+        -------
+        str
+            uri of the model version, e.g. ``models:/my_model/3``
+        """
+
+        if get_registered_model_name(model_uri) is None:
+            return model_uri
+
+        return resolve_model_uri(model_uri, self.mlflow_client)
+
+    def load(
+        self,
+        model_uri: str,
+        load_model: Callable[[str], Any],
+        variant: str = "",
+    ) -> Any:
+        """
+        get a model from the cache, loading it with load_model on a miss
+        concurrent calls for the same model wait for a single load
+
+        Parameters
+        ----------
+        model_uri: str
+            uri of the model
+        load_model: Callable[[str], Any]
+            function that loads the model from its resolved uri
+        variant: str
+            anything else that changes the loaded model, e.g. the device
+
+        Returns
+        -------
+        Any
+            model
+        """
+
+        key = (self.resolve_model_uri(model_uri), variant)
+
+        with self._lock:
+            model = self._get(key)
+            if model is not None:
+                return model[0]
+            loading_lock = self._loading_locks.setdefault(key, threading.Lock())
+
+        with loading_lock:
+            with self._lock:
+                # loaded by another thread while waiting for the loading lock
+                model = self._get(key)
+                if model is not None:
+                    return model[0]
+                self.misses += 1
+
+            start = time.perf_counter()
+            try:
+                model = load_model(key[0])
+                size = 0 if self.max_size_bytes is None else self.size_of(model)
+                with self._lock:
+                    self.load_seconds += time.perf_counter() - start
+                    self._entries[key] = (model, size)
+                    self._evict()
+            finally:
+                with self._lock:
+                    if self._loading_locks.get(key) is loading_lock:
+                        del self._loading_locks[key]
+
+        return model
+
+    def _get(self, key: tuple[str, str]) -> tuple[Any, int] | None:
+        """
+        get a cached model and mark it as the most recently used,
+        called with the cache lock held
+
+        Parameters
+        ----------
+        key: Tuple[str, str]
+            resolved uri and variant of the model
+
+        Returns
+        -------
+        Optional[Tuple[Any, int]]
+            model and its size, None on a miss
+        """
+
+        if key not in self._entries:
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        return self._entries[key]
+
+    def invalidate(self, model_uri: str | None = None):
+        """
+        remove every cached version of the registered model of a models:/ uri,
+        the cached model of any other uri, or every model if model_uri is None
+
+        Parameters
+        ----------
+        model_uri: Optional[str]
+            uri of the model
+        """
+
+        name = None if model_uri is None else get_registered_model_name(model_uri)
+
+        with self._lock:
+            for key in list(self._entries):
+                if (
+                    model_uri is None
+                    or key[0] == model_uri
+                    or (name is not None and get_registered_model_name(key[0]) == name)
+                ):
+                    del self._entries[key]
+
+    def _evict(self):
+        """
+        evict the least recently used models until the cache is under its caps,
+        the most recently loaded model is always kept
+        """
+
+        size_bytes = sum(size for _, size in self._entries.values())
+
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_models
+            or (self.max_size_bytes is not None and size_bytes > self.max_size_bytes)
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            size_bytes -= size
+
+    def stats(self) -> dict:
+        """
+        get the hit/miss counters, load time and current size of the cache
+
+        Returns
+        -------
+        Dict
+            hits, misses, load_seconds, entries and size_bytes of the cache
+        """
+
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "load_seconds": self.load_seconds,
+                "entries": len(self._entries),
+                "size_bytes": sum(size for _, size in self._entries.values()),
+            }
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import mlflow
+
+
+class RegistrySnapshot:
+    """
+    Class that lists the versions of a registered model once and indexes them
+    by stage, run_id and version number, so several registry lookups share a
+    single search_model_versions call
+    The versions are listed again on the first lookup after ttl_seconds, or
+    after invalidate, e.g. once a version has been transitioned
+    """
+
+    def __init__(
+        self,
+        mlflow_client: mlflow.tracking.client.MlflowClient,
+        name: str,
+        ttl_seconds: float = 60,
+    ):
+        self.mlflow_client = mlflow_client
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.fetches = 0
+        self._fetched_at: float | None = None
+        self._versions: list[Any] = []
+        self._by_stage: dict[str, list[Any]] = {}
+        self._by_run_id: dict[str, Any] = {}
+        self._by_version: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        list the versions of the registered model and rebuild the indexes
+        """
+
+        versions = list(self.mlflow_client.search_model_versions(f"name='{self.name}'"))
+
+        by_stage: dict[str, list[Any]] = {}
+        for model_version in versions:
+            by_stage.setdefault(model_version.current_stage, []).append(model_version)
+
+        with self._lock:
+            self._versions = versions
+            self._by_stage = by_stage
+            # a run registered more than once is indexed on its last listed version
+            self._by_run_id = {
+                model_version.run_id: model_version for model_version in versions
+            }
+            self._by_version = {
+                str(model_version.version): model_version for model_version in versions
+            }
+            self._fetched_at = time.monotonic()
+            self.fetches += 1
+
+    def invalidate(self):
+        """
+        list the versions again on the next lookup
+        """
+
+        with self._lock:
+            self._fetched_at = None
+
+    def _ensure_fresh(self):
+        with self._lock:
+            is_fresh = (
+                self._fetched_at is not None
+                and time.monotonic() - self._fetched_at < self.ttl_seconds
+            )
+        if not is_fresh:
+            self.refresh()
+
+    @property
+    def versions(self) -> list[Any]:
+        """every version of the registered model, in the order of the listing"""
+        self._ensure_fresh()
+        return self._versions
+
+    def get_stage_versions(self, stage: str) -> list[Any]:
+        """
+        get the versions of the registered model in a stage
+
+        Parameters
+        ----------
+        stage: str
+            stage of registered model; None, Staging, Production or Archived
+
+        Returns
+        -------
+        List
+            versions in the stage, in the order of the listing
+        """
+
+        self._ensure_fresh()
+        return self._by_stage.get(stage, [])
+
+    def get_by_run_id(self, run_id: str | None) -> Any | None:
+        """
+        get the version of the registered model created from a run
+
+        Parameters
+        ----------
+        run_id: Optional[str]
+            unique identifier of mlflow run of registered model
+
+        Returns
+        -------
+        Optional
+            model version, None if the run has no registered version
+        """
+
+        self._ensure_fresh()
+        return self._by_run_id.get(run_id)
+
+    def get_by_version(self, version: Any) -> Any | None:
+        """
+        get a version of the registered model by its version number
+
+        Parameters
+        ----------
+        version: Any
+            version number of registered model
+
+        Returns
+        -------
+        Optional
+            model version, None if the version does not exist
+        """
+
+        self._ensure_fresh()
+        return self._by_version.get(str(version))
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import pathlib
+import re
+import time
+from typing import Iterable
+from typing import TYPE_CHECKING
+
+from hip_data_ml_utils.core.file_cache import FileCache
+from hip_data_ml_utils.core.file_cache import open_atomic
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# quoted string literals and identifiers, with '' and "" escapes
+QUOTED_PATTERN = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+
+class QueryResultCache(FileCache):
+    """
+    Class that caches query results as parquet files in a local directory
+    Entries expire after their ttl, and the least recently used entries are
+    evicted once the total size of the cache goes over max_size_bytes
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        ttl_seconds: int = 86400,
+        max_size_bytes: int = 5 * 1024**3,
+    ):
+        super().__init__(cache_dir=cache_dir, max_size_bytes=max_size_bytes)
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def make_key(query: str, connection_identity: str) -> str:
+        """
+        create the cache key of a query
+        whitespace outside quoted literals and trailing semicolons of the query
+        are normalised
+
+        Parameters
+        ----------
+        query : str
+            query to run
+        connection_identity : str
+            identity of the connection the query runs on
+
+        Returns
+        -------
+        str
+            sha256 hash of the normalised query and connection identity
+        """
+
+        # the parts at odd positions are the quoted literals, kept as they are
+        normalised_query = "".join(
+            part if index % 2 else re.sub(r"\s+", " ", part)
+            for index, part in enumerate(QUOTED_PATTERN.split(query))
+        )
+        normalised_query = normalised_query.strip().rstrip(";").strip()
+
+        return hashlib.sha256(
+            f"{connection_identity}\n{normalised_query}".encode()
+        ).hexdigest()
+
+    def _data_path(self, key: str) -> pathlib.Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def _meta_path(self, key: str) -> pathlib.Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        """
+        get the cached result of a key, None if it is missing or expired
+
+        Parameters
+        ----------
+        key : str
+            cache key
+
+        Returns
+        -------
+        Optional[pd.DataFrame]
+            cached dataframe
+        """
+
+        import pandas as pd
+
+        data_path = self._data_path(key)
+        try:
+            meta = json.loads(self._meta_path(key).read_text())
+            if meta["expires_at"] < time.time():
+                self.invalidate(key)
+                self.misses += 1
+                return None
+            return_df = pd.read_parquet(data_path)
+            self._touch(data_path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        return return_df
+
+    def put(self, key: str, df: pd.DataFrame, ttl_seconds: int | None = None):
+        """
+        store a dataframe in the cache, then evict entries over the size cap
+
+        Parameters
+        ----------
+        key : str
+            cache key
+        df : pd.DataFrame
+            dataframe to cache
+        ttl_seconds : Optional[int]
+            ttl of this entry, defaults to the ttl of the cache
+        """
+
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+
+        with open_atomic(self._data_path(key)) as tmp_file:
+            df.to_parquet(tmp_file, index=False)
+
+        with open_atomic(self._meta_path(key), mode="w") as tmp_file:
+            json.dump({"expires_at": time.time() + ttl_seconds}, tmp_file)
+
+        self._evict()
+
+    def invalidate(self, key: str | None = None):
+        """
+        remove an entry from the cache, or every entry if key is None
+
+        Parameters
+        ----------
+        key : Optional[str]
+            cache key
+        """
+
+        keys = (
+            [path.stem for path in self.cache_dir.glob("*.parquet")]
+            if key is None
+            else [key]
+        )
+        for _key in keys:
+            self._data_path(_key).unlink(missing_ok=True)
+            self._meta_path(_key).unlink(missing_ok=True)
+
+    def _entry_paths(self) -> Iterable[pathlib.Path]:
+        return self.cache_dir.glob("*.parquet")
+
+    def _remove(self, path: pathlib.Path):
+        self.invalidate(path.stem)
@@ -1,27 +1,148 @@
 from __future__ import annotations
 
+import collections
 import datetime
+import itertools
+import logging
 import os
+import pathlib
+import time
+import uuid
+import weakref
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextlib import closing
+from contextlib import contextmanager
+from typing import Any
+from typing import Callable
+from typing import Iterator
 
+import boto3
 import pandas as pd
+import pyarrow as pa
 import pyathena
 from pyathena import connect
+from pyathena.arrow.cursor import ArrowCursor
+from pyathena.common import BaseCursor
+from pyathena.cursor import Cursor
+from pyathena.model import AthenaQueryExecution
+from pyathena.pandas.async_cursor import AsyncPandasCursor
 from pyathena.pandas.cursor import PandasCursor
 
-from hip_data_ml_utils.core.config import settings
+from hip_data_ml_utils.core.config import get_settings
+from hip_data_ml_utils.core.dtype_utils import arrow_to_nullable_pandas
+from hip_data_ml_utils.core.dtype_utils import arrow_to_pandas
+from hip_data_ml_utils.core.dtype_utils import DTYPE_BACKENDS
+from hip_data_ml_utils.core.dtype_utils import normalise_dtypes
+from hip_data_ml_utils.core.pool import ConnectionPool
+from hip_data_ml_utils.core.pyathena_utils import delete_s3_prefix
+from hip_data_ml_utils.core.pyathena_utils import download_s3_object
+from hip_data_ml_utils.core.pyathena_utils import format_sql_add_partitions
 from hip_data_ml_utils.core.pyathena_utils import format_sql_create_schema
 from hip_data_ml_utils.core.pyathena_utils import format_sql_repair_table
+from hip_data_ml_utils.core.pyathena_utils import format_sql_unload
+from hip_data_ml_utils.core.pyathena_utils import get_athena_arrow_types
+from hip_data_ml_utils.core.pyathena_utils import get_config_yaml
+from hip_data_ml_utils.core.pyathena_utils import get_yaml_arrow_types
+from hip_data_ml_utils.core.pyathena_utils import is_partition_projected
+from hip_data_ml_utils.core.pyathena_utils import list_s3_keys
+from hip_data_ml_utils.core.pyathena_utils import list_s3_partition_values
+from hip_data_ml_utils.core.pyathena_utils import read_athena_csv
+from hip_data_ml_utils.core.pyathena_utils import read_s3_parquet
 from hip_data_ml_utils.core.pyathena_utils import read_sql
+from hip_data_ml_utils.core.pyathena_utils import split_date_key_range
+from hip_data_ml_utils.core.pyathena_utils import split_s3_location
+from hip_data_ml_utils.core.pyathena_utils import split_table_by_partition
+from hip_data_ml_utils.core.pyathena_utils import write_s3_parquet
+from hip_data_ml_utils.pyathena_client.cache import QueryResultCache
+
+log = logging.getLogger(__name__)
+
+STAGING_DIR_ROTATIONS = ("daily", "fixed")
+REPAIR_MODES = ("msck", "incremental")
+FETCH_ENGINES = ("cursor", "parallel")
 
 
 class PyAthenaClient:
     """
     Class that handles queries from pyathena client
     Main purpose is to create a connection that we can query from
+    Results of query_as_pandas are cached locally if a cache is provided
+    Connections are created lazily in a thread-safe pool of pool_size connections,
+    so one client can be shared by the threads of a worker
+    With the "daily" staging_dir_rotation, query results are staged under the
+    date of the query instead of the date the connection was created
+    Stats of the last stats_history queries are kept in `self.query_stats`,
+    passed to on_query_stats, and queries slower than slow_query_seconds are logged
     """
 
-    def __init__(self):
-        self.engine = self._connect()
+    def __init__(
+        self,
+        cache: QueryResultCache | None = None,
+        pool_size: int = 4,
+        staging_dir_rotation: str = "daily",
+        on_query_stats: Callable[[dict], None] | None = None,
+        slow_query_seconds: float | None = None,
+        stats_history: int = 1000,
+    ):
+        if staging_dir_rotation not in STAGING_DIR_ROTATIONS:
+            raise ValueError(
+                f"staging_dir_rotation can only be one of {STAGING_DIR_ROTATIONS}"
+            )
+
+        self.pool_size = pool_size
+        self.staging_dir_rotation = staging_dir_rotation
+        self.dtype_report = {}
+        self.cache = cache
+        self.on_query_stats = on_query_stats
+        self.slow_query_seconds = slow_query_seconds
+        self.query_stats = collections.deque(maxlen=stats_history)
+        self._pool = ConnectionPool(connect=self._connect, pool_size=pool_size)
+
+    @property
+    def engine(self) -> pyathena.connection.Connection:
+        """
+        first pyathena connection of the pool, created on first use
+
+        Returns
+        -------
+        pyathena.connection.Connection
+            pyathena connection engine
+        """
+
+        if not self._pool.connections:
+            self._pool.release(self._pool.acquire())
+
+        return self._pool.connections[0]
+
+    @engine.setter
+    def engine(self, engine: pyathena.connection.Connection):
+        """
+        replace the pool with one that shares the given connection
+
+        Parameters
+        ----------
+        engine : pyathena.connection.Connection
+            pyathena connection engine
+        """
+
+        self._pool = ConnectionPool(connect=lambda: engine, pool_size=self.pool_size)
+
+    def _s3_staging_dir(self) -> str:
+        """
+        s3 staging dir of the query results for today
+
+        Returns
+        -------
+        str
+            s3 staging dir
+        """
+
+        today_date = (datetime.datetime.now()).strftime("%Y-%m-%d")
+
+        return f"{os.environ['S3_BUCKET']}query_{today_date}"
 
     def _connect(self) -> pyathena.connection.Connection:
         """
@@ -33,19 +154,128 @@ class PyAthenaClient:
         pyathena.connection.Connection
             pyathena connection engine
         """
-        today_date = (datetime.datetime.now()).strftime("%Y-%m-%d")
 
         connection = connect(
-            s3_staging_dir=f"{os.environ['S3_BUCKET']}query_{today_date}",
-            region_name=settings.AWS_DEFAULT_REGION,
+            s3_staging_dir=self._s3_staging_dir(),
+            region_name=get_settings().AWS_DEFAULT_REGION,
             aws_access_key_id=os.environ["AWS_ACCESS_KEY_ID"],
             aws_secret_access_key=os.environ["AWS_SECRET_ACCESS_KEY"],
             cursor_class=PandasCursor,
         )
         return connection
 
+    @contextmanager
+    def _cursor(
+        self, cursor_class: type | None = None, **kwargs
+    ) -> Iterator[BaseCursor]:
+        """
+        lend a cursor on a connection of the pool for the duration of the with block
+
+        Parameters
+        ----------
+        cursor_class : Optional[type]
+            pyathena cursor class, defaults to the pandas cursor of the connection
+        **kwargs
+            cursor arguments
+
+        Yields
+        ------
+        BaseCursor
+            pyathena cursor
+        """
+
+        if self.staging_dir_rotation == "daily":
+            kwargs.setdefault("s3_staging_dir", self._s3_staging_dir())
+
+        with self._pool.connection() as connection:
+            cursor = connection.cursor(cursor=cursor_class, **kwargs)
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def close(self):
+        """
+        close every connection of the pool
+        """
+
+        self._pool.close()
+
+    def _record_query_stats(
+        self,
+        final_query: str,
+        execution_stats: dict,
+        wall_seconds: float,
+        conversion_seconds: float,
+        rows: int,
+        frame_bytes: int,
+    ) -> dict:
+        """
+        record the stats of a finished query
+        the stats are kept in `self.query_stats` and passed to on_query_stats,
+        and the query is logged if it is slower than slow_query_seconds
+
+        Parameters
+        ----------
+        final_query : str
+            query that ran
+        execution_stats : Dict
+            athena stats of the query, read by _get_execution_stats
+        wall_seconds : float
+            seconds to execute the query and fetch its result
+        conversion_seconds : float
+            seconds to convert the result
+        rows : int
+            number of rows of the result
+        frame_bytes : int
+            memory of the result in bytes
+
+        Returns
+        -------
+        Dict
+            stats of the query
+        """
+
+        total_execution_seconds = execution_stats["total_execution_seconds"]
+        stats = {
+            "query_id": execution_stats["query_id"],
+            "queue_seconds": execution_stats["queue_seconds"],
+            "engine_execution_seconds": execution_stats["engine_execution_seconds"],
+            "data_scanned_bytes": execution_stats["data_scanned_bytes"],
+            "fetch_seconds": (
+                None
+                if total_execution_seconds is None
+                else max(wall_seconds - total_execution_seconds, 0.0)
+            ),
+            "conversion_seconds": conversion_seconds,
+            "total_seconds": wall_seconds + conversion_seconds,
+            "rows": rows,
+            "frame_bytes": frame_bytes,
+            "query": final_query,
+        }
+
+        self.query_stats.append(stats)
+        if self.on_query_stats is not None:
+            self.on_query_stats(stats)
+        if (
+            self.slow_query_seconds is not None
+            and stats["total_seconds"] >= self.slow_query_seconds
+        ):
+            log.warning(
+                "Slow athena query %s took %.1f seconds:\n%s",
+                stats["query_id"],
+                stats["total_seconds"],
+                final_query,
+            )
+
+        return stats
+
     def create_msck_repair_table(
-        self, create_raw_query: str, repair_raw_query: str, yaml_schema_file_path: str
+        self,
+        create_raw_query: str,
+        repair_raw_query: str,
+        yaml_schema_file_path: str,
+        repair_mode: str = "msck",
     ) -> int:
         """
         create table and msck repair table in athena with pyathena connection
@@ -58,6 +288,11 @@ class PyAthenaClient:
             raw query string to repair table in athena
         yaml_schema_file_path : str
             yaml file path for schema of table to be created and repaired
+        repair_mode : str
+            "msck" runs the repair query over the whole table location,
+            "incremental" only adds the partitions that are not registered yet
+            tables with partition projection are not repaired, athena computes
+            their partitions from the table properties
 
         Returns
         -------
@@ -65,24 +300,341 @@ class PyAthenaClient:
             non exit function value if successful
         """
 
+        if repair_mode not in REPAIR_MODES:
+            raise ValueError(f"repair_mode can only be one of {REPAIR_MODES}")
+
         create_schema_query_raw = read_sql(file_path=create_raw_query)
-        repair_table_query_raw = read_sql(file_path=repair_raw_query)
+        repair_table_query_raw = (
+            read_sql(file_path=repair_raw_query) if repair_mode == "msck" else None
+        )
 
         create_schema_query, table_name = format_sql_create_schema(
             sql=create_schema_query_raw, yaml_file_path=yaml_schema_file_path
         )
 
-        repair_table_query = format_sql_repair_table(
-            sql=repair_table_query_raw, table_name=table_name
-        )
-
         try:
-            self.engine.cursor().execute(create_schema_query)
-            self.engine.cursor().execute(repair_table_query)
+            self._create_repair_table(
+                create_schema_query=create_schema_query,
+                table_name=table_name,
+                repair_table_query_raw=repair_table_query_raw,
+                yaml_schema_file_path=yaml_schema_file_path,
+                repair_mode=repair_mode,
+                partition_projected=is_partition_projected(
+                    sql=create_schema_query_raw, yaml_file_path=yaml_schema_file_path
+                ),
+            )
             return 0
         except Exception:
             return 1
 
+    def _create_repair_table(
+        self,
+        create_schema_query: str,
+        table_name: str,
+        repair_table_query_raw: str | None,
+        yaml_schema_file_path: str,
+        repair_mode: str,
+        partition_projected: bool,
+    ):
+        """
+        run the create table query and repair the table
+        tables with partition projection are not repaired
+
+        Parameters
+        ----------
+        create_schema_query : str
+            formatted query to create table in athena
+        table_name : str
+            name of table
+        repair_table_query_raw : Optional[str]
+            raw query string to repair table in athena, only used by msck repair
+        yaml_schema_file_path : str
+            yaml file path for schema of table
+        repair_mode : str
+            "msck" or "incremental"
+        partition_projected : bool
+            if the table is created with partition projection
+        """
+
+        if partition_projected:
+            repair_mode = None
+
+        with self._cursor() as cursor:
+            cursor.execute(create_schema_query)
+            if repair_mode == "msck":
+                cursor.execute(
+                    format_sql_repair_table(
+                        sql=repair_table_query_raw, table_name=table_name
+                    )
+                )
+        if repair_mode == "incremental":
+            self.add_new_partitions(yaml_schema_file_path=yaml_schema_file_path)
+
+    def deploy_schemas(
+        self,
+        create_raw_query: str,
+        repair_raw_query: str,
+        yaml_schema_dir: str,
+        max_concurrency: int = 8,
+        repair_mode: str = "msck",
+    ) -> list[dict]:
+        """
+        create and repair every table of a directory of yaml schemas concurrently
+        the sql templates are read once for all tables, and a failing table does
+        not stop the others
+        queries run on the connections of the pool, so at most pool_size tables
+        are created at the same time
+
+        Parameters
+        ----------
+        create_raw_query : str
+            raw query string to create table in athena
+        repair_raw_query : str
+            raw query string to repair table in athena
+        yaml_schema_dir : str
+            directory of yaml schemas of the tables
+        max_concurrency : int
+            maximum number of tables deployed at the same time
+        repair_mode : str
+            "msck" or "incremental"
+
+        Returns
+        -------
+        List[Dict]
+            report of every yaml schema, sorted by file name;
+            yaml_schema_file_path, table_name, status, error and seconds
+        """
+
+        if repair_mode not in REPAIR_MODES:
+            raise ValueError(f"repair_mode can only be one of {REPAIR_MODES}")
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be a positive integer")
+
+        create_schema_query_raw = read_sql(file_path=create_raw_query)
+        repair_table_query_raw = (
+            read_sql(file_path=repair_raw_query) if repair_mode == "msck" else None
+        )
+        yaml_schema_file_paths = sorted(
+            str(path)
+            for path in pathlib.Path(yaml_schema_dir).iterdir()
+            if path.suffix in (".yaml", ".yml")
+        )
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            return list(
+                executor.map(
+                    lambda yaml_schema_file_path: self._deploy_schema(
+                        create_schema_query_raw=create_schema_query_raw,
+                        repair_table_query_raw=repair_table_query_raw,
+                        yaml_schema_file_path=yaml_schema_file_path,
+                        repair_mode=repair_mode,
+                    ),
+                    yaml_schema_file_paths,
+                )
+            )
+
+    def _deploy_schema(
+        self,
+        create_schema_query_raw: str,
+        repair_table_query_raw: str | None,
+        yaml_schema_file_path: str,
+        repair_mode: str,
+    ) -> dict:
+        """
+        create and repair one table of deploy_schemas, and report how it went
+
+        Parameters
+        ----------
+        create_schema_query_raw : str
+            raw query string to create table in athena
+        repair_table_query_raw : Optional[str]
+            raw query string to repair table in athena
+        yaml_schema_file_path : str
+            yaml file path for schema of table
+        repair_mode : str
+            "msck" or "incremental"
+
+        Returns
+        -------
+        Dict
+            yaml_schema_file_path, table_name, status, error and seconds
+        """
+
+        report = {
+            "yaml_schema_file_path": yaml_schema_file_path,
+            "table_name": None,
+            "status": "success",
+            "error": None,
+        }
+        start_time = time.perf_counter()
+
+        try:
+            create_schema_query, report["table_name"] = format_sql_create_schema(
+                sql=create_schema_query_raw, yaml_file_path=yaml_schema_file_path
+            )
+            self._create_repair_table(
+                create_schema_query=create_schema_query,
+                table_name=report["table_name"],
+                repair_table_query_raw=repair_table_query_raw,
+                yaml_schema_file_path=yaml_schema_file_path,
+                repair_mode=repair_mode,
+                partition_projected=is_partition_projected(
+                    sql=create_schema_query_raw, yaml_file_path=yaml_schema_file_path
+                ),
+            )
+        except Exception as error:
+            report["status"] = "failure"
+            report["error"] = repr(error)
+
+        report["seconds"] = time.perf_counter() - start_time
+
+        return report
+
+    def add_new_partitions(
+        self, yaml_schema_file_path: str, batch_size: int = 100
+    ) -> list[str]:
+        """
+        add the partitions under the table location in s3 that are not registered
+        in the table yet, instead of rescanning the whole location with msck repair
+        only the partition prefixes are listed in s3, and the new partitions are
+        added with batched ALTER TABLE ADD IF NOT EXISTS PARTITION queries
+
+        Parameters
+        ----------
+        yaml_schema_file_path : str
+            yaml file path for schema of table
+        batch_size : int
+            maximum number of partitions added by each query
+
+        Returns
+        -------
+        List[str]
+            values of the added partitions
+        """
+
+        table_name, _, _, partition_column, _, s3_bucket = get_config_yaml(
+            yaml_schema_file_path
+        )
+
+        with self._cursor() as cursor:
+            registered_partitions = {
+                row[0].split("=", 1)[1]
+                for row in cursor.execute(f"SHOW PARTITIONS {table_name}").fetchall()
+            }
+            new_partitions = [
+                value
+                for value in list_s3_partition_values(
+                    s3_location=s3_bucket, partition_column=partition_column
+                )
+                if value not in registered_partitions
+            ]
+
+            for add_partitions_query in format_sql_add_partitions(
+                table_name=table_name,
+                partition_column=partition_column,
+                s3_location=s3_bucket,
+                partition_values=new_partitions,
+                batch_size=batch_size,
+            ):
+                cursor.execute(add_partitions_query)
+
+        return new_partitions
+
+    def write_partitioned_parquet(
+        self,
+        df: pd.DataFrame,
+        yaml_schema_file_path: str,
+        row_group_size: int = 1_000_000,
+        sort_by: list[str] | None = None,
+        max_workers: int = 8,
+        create_raw_query: str | None = None,
+    ) -> list[str]:
+        """
+        write dataframe as hive partitioned parquet files to the table location
+        of the yaml schema, one file per partition written in parallel,
+        then add the written partitions to the table
+        the columns are cast to the data types declared in the yaml schema,
+        and tables created with partition projection are not altered
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            dataframe to write, with the partition column of the table
+        yaml_schema_file_path : str
+            yaml file path for schema of table
+        row_group_size : int
+            maximum number of rows in each row group of the parquet files
+        sort_by : Optional[List[str]]
+            columns the rows of every partition are sorted by,
+            so athena can skip row groups on filters of these columns
+        max_workers : int
+            number of parquet files written at the same time
+        create_raw_query : Optional[str]
+            raw query string the table was created with, the written partitions
+            are not added if it creates the table with partition projection
+
+        Returns
+        -------
+        List[str]
+            values of the written partitions
+        """
+
+        if max_workers <= 0:
+            raise ValueError("max_workers must be a positive integer")
+
+        table_name, _, _, partition_column, _, s3_bucket = get_config_yaml(
+            yaml_schema_file_path
+        )
+        bucket, prefix = split_s3_location(s3_bucket)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        column_types = get_yaml_arrow_types(yaml_schema_file_path)
+        table = table.cast(
+            pa.schema(
+                [
+                    field.with_type(column_types.get(field.name, field.type))
+                    for field in table.schema
+                ]
+            )
+        )
+        partitions = split_table_by_partition(
+            table=table,
+            partition_column=partition_column,
+            sort_by=sort_by,
+        )
+        # a new file name per call, so appending to a partition keeps its files
+        file_name = f"part-{uuid.uuid4().hex}.snappy.parquet"
+        s3_client = boto3.client("s3", region_name=get_settings().AWS_DEFAULT_REGION)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(
+                executor.map(
+                    lambda partition: write_s3_parquet(
+                        table=partition[1],
+                        bucket=bucket,
+                        key=f"{prefix}{partition_column}={partition[0]}/{file_name}",
+                        row_group_size=row_group_size,
+                        s3_client=s3_client,
+                    ),
+                    partitions,
+                )
+            )
+
+        partition_values = [value for value, _ in partitions]
+        if create_raw_query is None or not is_partition_projected(
+            sql=read_sql(file_path=create_raw_query),
+            yaml_file_path=yaml_schema_file_path,
+        ):
+            with self._cursor() as cursor:
+                for add_partitions_query in format_sql_add_partitions(
+                    table_name=table_name,
+                    partition_column=partition_column,
+                    s3_location=s3_bucket,
+                    partition_values=partition_values,
+                ):
+                    cursor.execute(add_partitions_query)
+
+        return partition_values
+
     def drop_table(self, table_name: str, database: str) -> int:
         """
         drop table in athena with pyathena connection
@@ -103,20 +655,57 @@ class PyAthenaClient:
         query = f"DROP TABLE IF EXISTS {database}.{table_name}"
 
         try:
-            self.engine.cursor().execute(query)
+            with self._cursor() as cursor:
+                cursor.execute(query)
             return 0
         except Exception:
             return 1
 
-    def query_as_pandas(self, final_query: str) -> pd.DataFrame:
+    def _connection_identity(self) -> str:
+        """
+        identity of the connection used in the cache key of the queries
+
+        Returns
+        -------
+        str
+            region, result bucket and access key of the connection
+        """
+
+        return "|".join(
+            [
+                get_settings().AWS_DEFAULT_REGION,
+                os.environ["S3_BUCKET"],
+                os.environ["AWS_ACCESS_KEY_ID"],
+            ]
+        )
+
+    def query_as_pandas(
+        self,
+        final_query: str,
+        downcast: bool = False,
+        use_cache: bool = True,
+        fetch_engine: str = "cursor",
+    ) -> pd.DataFrame:
         """
         query athena sqls with pyathena connection and store them into pandas
         changes all pandas int and float types to numpy types
+        the report of the conversion is kept in `self.dtype_report`
+
+        the "parallel" fetch_engine downloads the csv result file with parallel
+        ranged GETs, and parses it with the multithreaded pyarrow csv reader
+        using the column types of the query, instead of the pandas cursor
+        both engines return the same pandas types
 
         Parameters
         ----------
         final_query : str
             query to run
+        downcast : bool
+            if True, downcast numeric columns to the smallest safe width
+        use_cache : bool
+            if False, bypass the result cache for this query
+        fetch_engine : str
+            "cursor" for the pandas cursor, "parallel" for the parallel download
 
         Returns
         -------
@@ -124,18 +713,623 @@ class PyAthenaClient:
             return of pandas dataframe
         """
 
-        return_df = self.engine.cursor().execute(final_query).as_pandas()
+        if fetch_engine not in FETCH_ENGINES:
+            raise ValueError(f"fetch_engine can only be one of {FETCH_ENGINES}")
 
-        # change all pandas Int64 and Float64 to numpy int and float
-        for col in return_df.columns:
-            if (
-                ("Int" in str(return_df[col].dtype))
-                and (return_df[col].isna().sum(axis=0) > 0)
-            ) or ("Float" in str(return_df[col].dtype)):
-                return_df[col] = return_df[col].astype(float)
-            elif ("Int" in str(return_df[col].dtype)) and (
-                return_df[col].isna().sum(axis=0) == 0
-            ):
-                return_df[col] = return_df[col].astype(int)
+        cache_key = None
+        if self.cache is not None and use_cache:
+            cache_key = self.cache.make_key(
+                query=final_query,
+                connection_identity=(
+                    f"{self._connection_identity()}|{downcast}|{fetch_engine}"
+                ),
+            )
+            cached_df = self.cache.get(cache_key)
+            if cached_df is not None:
+                return cached_df
+
+        start = time.perf_counter()
+        if fetch_engine == "parallel":
+            execution_stats, return_table = self._fetch_parallel(final_query)
+        else:
+            with self._cursor() as cursor:
+                result = cursor.execute(final_query)
+                return_df = result.as_pandas()
+                execution_stats = _get_execution_stats(result)
+        wall_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if fetch_engine == "parallel":
+            return_df = arrow_to_nullable_pandas(table=return_table)
+        return_df, self.dtype_report = normalise_dtypes(df=return_df, downcast=downcast)
+        self._record_query_stats(
+            final_query=final_query,
+            execution_stats=execution_stats,
+            wall_seconds=wall_seconds,
+            conversion_seconds=time.perf_counter() - start,
+            rows=len(return_df),
+            frame_bytes=int(return_df.memory_usage(deep=False).sum()),
+        )
+
+        if cache_key is not None:
+            self.cache.put(cache_key, return_df)
 
         return return_df
+
+    def _fetch_parallel(self, final_query: str) -> tuple[dict, pa.Table]:
+        """
+        run a query and fetch its csv result file with parallel ranged GETs,
+        parsed with the column types of the query instead of type inference
+
+        Parameters
+        ----------
+        final_query : str
+            query to run
+
+        Returns
+        -------
+        Dict
+            athena stats of the query
+        pa.Table
+            return of pyarrow table
+        """
+
+        with self._cursor(cursor_class=Cursor) as cursor:
+            result = cursor.execute(final_query)
+            return_table = read_athena_csv(
+                data=download_s3_object(result.output_location),
+                column_types=get_athena_arrow_types(result.description),
+            )
+            execution_stats = _get_execution_stats(result)
+
+        return execution_stats, return_table
+
+    def iter_query_as_pandas(
+        self, final_query: str, chunksize: int = 1_000_000, downcast: bool = False
+    ) -> Iterator[pd.DataFrame]:
+        """
+        query athena sqls with pyathena connection and yield the result in chunks
+        changes all pandas int and float types to numpy types for every chunk
+        peak memory depends on the chunksize instead of the size of the result
+
+        an Int column is converted per chunk, so it may come back as int in
+        one chunk and as float in another chunk that contains nulls
+        the report of the conversion of the last chunk is kept in `self.dtype_report`
+
+        Parameters
+        ----------
+        final_query : str
+            query to run
+        chunksize : int
+            number of rows in each yielded dataframe
+        downcast : bool
+            if True, downcast numeric columns of every chunk to the smallest safe width
+
+        Yields
+        ------
+        pd.DataFrame
+            chunk of the query result as a pandas dataframe
+        """
+
+        if chunksize <= 0:
+            raise ValueError("chunksize must be a positive integer")
+
+        with self._cursor() as cursor:
+            for chunk_df in cursor.execute(
+                final_query, chunksize=chunksize
+            ).as_pandas():
+                chunk_df, self.dtype_report = normalise_dtypes(
+                    df=chunk_df, downcast=downcast
+                )
+                yield chunk_df
+
+    def query_as_arrow(
+        self,
+        final_query: str,
+        unload: bool = False,
+        to_pandas: bool = False,
+        dtype_backend: str = "pyarrow",
+    ) -> pa.Table | pd.DataFrame:
+        """
+        query athena sqls with pyathena arrow cursor and store them into pyarrow
+        the result is not re-cast to numpy types
+
+        Parameters
+        ----------
+        final_query : str
+            query to run
+        unload : bool
+            if True, athena unloads the result as parquet files which are read
+            directly into arrow instead of parsing the csv result file
+        to_pandas : bool
+            if True, convert the pyarrow table into pandas
+        dtype_backend : str
+            "pyarrow" for pyarrow-backed pandas dtypes,
+            "numpy" for numpy dtypes with zero-copy where the types allow it
+
+        Returns
+        -------
+        Union[pa.Table, pd.DataFrame]
+            return of pyarrow table, or pandas dataframe if to_pandas is True
+        """
+
+        if dtype_backend not in DTYPE_BACKENDS:
+            raise ValueError(f"dtype_backend can only be one of {DTYPE_BACKENDS}")
+
+        start = time.perf_counter()
+        with self._cursor(cursor_class=ArrowCursor, unload=unload) as cursor:
+            result = cursor.execute(final_query)
+            return_table = result.as_arrow()
+            execution_stats = _get_execution_stats(result)
+        wall_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        return_value = return_table
+        frame_bytes = return_table.nbytes
+        if to_pandas:
+            return_value = arrow_to_pandas(
+                table=return_table, dtype_backend=dtype_backend
+            )
+            frame_bytes = int(return_value.memory_usage(deep=False).sum())
+        self._record_query_stats(
+            final_query=final_query,
+            execution_stats=execution_stats,
+            wall_seconds=wall_seconds,
+            conversion_seconds=time.perf_counter() - start,
+            rows=return_table.num_rows,
+            frame_bytes=frame_bytes,
+        )
+
+        return return_value
+
+    def query_unload(
+        self,
+        final_query: str,
+        as_iterator: bool = False,
+        max_workers: int = 8,
+        cleanup: bool = True,
+    ) -> pa.Table | Iterator[pa.RecordBatch]:
+        """
+        unload the result of athena sqls as parquet files to a scratch prefix of
+        S3_BUCKET, and read the parquet files back in parallel
+        this skips the csv result file, which is the bottleneck of very large results
+        the scratch prefix is deleted once the files are read, or for the iterator
+        once it is exhausted, closed or garbage collected, even if never started
+
+        Parameters
+        ----------
+        final_query : str
+            query to run
+        as_iterator : bool
+            if True, return a lazy iterator of record batches instead of a table,
+            reading at most max_workers files ahead
+        max_workers : int
+            number of parquet files read at the same time
+        cleanup : bool
+            if False, keep the parquet files of the scratch prefix
+
+        Returns
+        -------
+        Union[pa.Table, Iterator[pa.RecordBatch]]
+            return of pyarrow table, or iterator of record batches if as_iterator
+        """
+
+        if max_workers <= 0:
+            raise ValueError("max_workers must be a positive integer")
+
+        unload_location = f"{os.environ['S3_BUCKET']}unload/{uuid.uuid4().hex}/"
+
+        start = time.perf_counter()
+        try:
+            with self._cursor(cursor_class=Cursor) as cursor:
+                execution_stats = _get_execution_stats(
+                    cursor.execute(
+                        format_sql_unload(sql=final_query, s3_location=unload_location)
+                    )
+                )
+            keys = list_s3_keys(unload_location)
+        except Exception:
+            if cleanup:
+                delete_s3_prefix(unload_location)
+            raise
+
+        if as_iterator:
+            return self._iter_unload(
+                final_query=final_query,
+                execution_stats=execution_stats,
+                start=start,
+                unload_location=unload_location,
+                keys=keys,
+                max_workers=max_workers,
+                cleanup=cleanup,
+            )
+
+        bucket, _ = split_s3_location(unload_location)
+        s3_client = boto3.client("s3", region_name=get_settings().AWS_DEFAULT_REGION)
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                tables = list(
+                    executor.map(
+                        lambda key: read_s3_parquet(bucket, key, s3_client), keys
+                    )
+                )
+        finally:
+            if cleanup:
+                delete_s3_prefix(unload_location)
+        wall_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        return_table = pa.concat_tables(tables) if tables else pa.table({})
+        self._record_query_stats(
+            final_query=final_query,
+            execution_stats=execution_stats,
+            wall_seconds=wall_seconds,
+            conversion_seconds=time.perf_counter() - start,
+            rows=return_table.num_rows,
+            frame_bytes=return_table.nbytes,
+        )
+
+        return return_table
+
+    def _iter_unload(
+        self,
+        final_query: str,
+        execution_stats: dict,
+        start: float,
+        unload_location: str,
+        keys: list[str],
+        max_workers: int,
+        cleanup: bool,
+    ) -> Iterator[pa.RecordBatch]:
+        """
+        read the unloaded parquet files in order, at most max_workers files ahead
+        the scratch prefix is deleted once the iterator is exhausted or closed,
+        and a finalizer deletes it if the iterator is garbage collected before
+        it is started
+        the stats of the query are recorded once the iterator is exhausted
+
+        Parameters
+        ----------
+        final_query : str
+            query that ran
+        execution_stats : Dict
+            athena stats of the unload query
+        start : float
+            perf_counter time the query was started
+        unload_location : str
+            s3 location of the unloaded parquet files
+        keys : List[str]
+            keys of the unloaded parquet files
+        max_workers : int
+            number of parquet files read at the same time
+        cleanup : bool
+            if False, keep the parquet files of the scratch prefix
+
+        Returns
+        -------
+        Iterator[pa.RecordBatch]
+            record batches of the query result
+        """
+
+        bucket, _ = split_s3_location(unload_location)
+        delete_unload = None
+
+        def read_batches() -> Iterator[pa.RecordBatch]:
+            s3_client = boto3.client(
+                "s3", region_name=get_settings().AWS_DEFAULT_REGION
+            )
+            keys_to_read = iter(keys)
+            reads = collections.deque()
+            rows = 0
+            frame_bytes = 0
+
+            try:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    try:
+                        for key in itertools.islice(keys_to_read, max_workers):
+                            reads.append(
+                                executor.submit(read_s3_parquet, bucket, key, s3_client)
+                            )
+                        while reads:
+                            table = reads.popleft().result()
+                            for key in itertools.islice(keys_to_read, 1):
+                                reads.append(
+                                    executor.submit(
+                                        read_s3_parquet, bucket, key, s3_client
+                                    )
+                                )
+                            rows += table.num_rows
+                            frame_bytes += table.nbytes
+                            yield from table.to_batches()
+                    finally:
+                        # reads not started yet are dropped if the iterator is closed
+                        for read in reads:
+                            read.cancel()
+            finally:
+                if delete_unload is not None:
+                    delete_unload()
+
+            self._record_query_stats(
+                final_query=final_query,
+                execution_stats=execution_stats,
+                wall_seconds=time.perf_counter() - start,
+                conversion_seconds=0.0,
+                rows=rows,
+                frame_bytes=frame_bytes,
+            )
+
+        batches = read_batches()
+        if cleanup:
+            # runs at most once, from the iterator or when it is garbage collected
+            delete_unload = weakref.finalize(batches, delete_s3_prefix, unload_location)
+
+        return batches
+
+    def query_many(
+        self, queries: list[str], max_concurrency: int = 10, downcast: bool = False
+    ) -> list[pd.DataFrame]:
+        """
+        query many independent athena sqls concurrently with the async pandas cursor
+        at most max_concurrency queries run at the same time, the next query is
+        submitted as soon as one finishes, and their states are polled concurrently
+        if a query fails, the queries still running are cancelled
+
+        Parameters
+        ----------
+        queries : List[str]
+            queries to run
+        max_concurrency : int
+            maximum number of queries running at the same time
+        downcast : bool
+            if True, downcast numeric columns to the smallest safe width
+
+        Returns
+        -------
+        List[pd.DataFrame]
+            return of pandas dataframes in the same order as the queries
+        """
+
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be a positive integer")
+
+        return_dfs = [None] * len(queries)
+
+        with self._cursor(
+            cursor_class=AsyncPandasCursor, max_workers=max_concurrency
+        ) as cursor, closing(
+            self._iter_completed(
+                cursor=cursor, queries=queries, max_concurrency=max_concurrency
+            )
+        ) as completed:
+            for index, future, wall_seconds in completed:
+                return_dfs[index] = self._query_many_result(
+                    query=queries[index],
+                    result=future.result(),
+                    wall_seconds=wall_seconds,
+                    downcast=downcast,
+                )
+
+        return return_dfs
+
+    def _iter_completed(
+        self, cursor: AsyncPandasCursor, queries: list[str], max_concurrency: int
+    ) -> Iterator[tuple[int, Future, float]]:
+        """
+        run queries on an async cursor with at most max_concurrency of them running,
+        the next query is submitted as soon as one finishes
+        queries still running are cancelled when the iterator is closed
+
+        Parameters
+        ----------
+        cursor : AsyncPandasCursor
+            pyathena async cursor
+        queries : List[str]
+            queries to run
+        max_concurrency : int
+            maximum number of queries running at the same time
+
+        Yields
+        ------
+        Tuple[int, Future, float]
+            index of the query, its future and the seconds from its submission
+            to its result, in the order the queries finish
+        """
+
+        queries_to_submit = iter(enumerate(queries))
+        running = {}
+
+        def submit(count: int):
+            for index, query in itertools.islice(queries_to_submit, count):
+                query_id, future = cursor.execute(query)
+                running[future] = (index, query_id, time.perf_counter())
+
+        try:
+            submit(max_concurrency)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, _, start = running.pop(future)
+                    submit(1)
+                    yield index, future, time.perf_counter() - start
+        finally:
+            for _, query_id, _ in running.values():
+                cursor.cancel(query_id)
+
+    def query_date_range(
+        self,
+        query_template: str,
+        start_date_key: int,
+        end_date_key: int,
+        slice_days: int = 1,
+        max_concurrency: int = 10,
+        max_retries: int = 2,
+        downcast: bool = False,
+    ) -> pd.DataFrame:
+        """
+        query a range of daily partitions as concurrent sub-queries of slice_days,
+        instead of one query over the whole range
+        `{start_date_key}` and `{end_date_key}` of the query template are formatted
+        with the inclusive yyyyMMdd bounds of every slice,
+        only the slices that failed are retried, up to max_retries times
+
+        Parameters
+        ----------
+        query_template : str
+            query to run, filtered on {start_date_key} and {end_date_key}
+        start_date_key : int
+            first date dim key of the range, yyyyMMdd
+        end_date_key : int
+            last date dim key of the range, yyyyMMdd
+        slice_days : int
+            number of days queried by each sub-query
+        max_concurrency : int
+            maximum number of sub-queries running at the same time
+        max_retries : int
+            number of times the failed sub-queries are retried
+        downcast : bool
+            if True, downcast numeric columns to the smallest safe width
+
+        Returns
+        -------
+        pd.DataFrame
+            return of pandas dataframe of the whole range, in date order
+        """
+
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be a positive integer")
+
+        queries = [
+            query_template.format(
+                start_date_key=slice_start_date_key, end_date_key=slice_end_date_key
+            )
+            for slice_start_date_key, slice_end_date_key in split_date_key_range(
+                start_date_key=start_date_key,
+                end_date_key=end_date_key,
+                slice_days=slice_days,
+            )
+        ]
+        return_dfs = [None] * len(queries)
+        indexes_to_run = list(range(len(queries)))
+
+        for attempt in range(max_retries + 1):
+            failed_indexes = []
+            with self._cursor(
+                cursor_class=AsyncPandasCursor, max_workers=max_concurrency
+            ) as cursor, closing(
+                self._iter_completed(
+                    cursor=cursor,
+                    queries=[queries[index] for index in indexes_to_run],
+                    max_concurrency=max_concurrency,
+                )
+            ) as completed:
+                for slice_index, future, wall_seconds in completed:
+                    index = indexes_to_run[slice_index]
+                    try:
+                        return_dfs[index] = self._query_many_result(
+                            query=queries[index],
+                            result=future.result(),
+                            wall_seconds=wall_seconds,
+                            downcast=downcast,
+                        )
+                    except Exception as error:
+                        log.warning("Date range slice failed: %s", error)
+                        failed_indexes.append(index)
+                        if attempt == max_retries:
+                            raise
+            indexes_to_run = sorted(failed_indexes)
+            if not indexes_to_run:
+                break
+
+        return pd.concat(return_dfs, ignore_index=True, copy=False)
+
+    def _query_many_result(
+        self, query: str, result: Any, wall_seconds: float, downcast: bool
+    ) -> pd.DataFrame:
+        """
+        convert the result set of one of the queries of query_many and record its stats
+
+        Parameters
+        ----------
+        query : str
+            query that ran
+        result : Any
+            pyathena result set of the query
+        wall_seconds : float
+            seconds from the submission of the query to its result
+        downcast : bool
+            if True, downcast numeric columns to the smallest safe width
+
+        Returns
+        -------
+        pd.DataFrame
+            return of pandas dataframe
+        """
+
+        # the async cursor returns an empty result set instead of raising
+        if result.state in (
+            AthenaQueryExecution.STATE_FAILED,
+            AthenaQueryExecution.STATE_CANCELLED,
+        ):
+            raise pyathena.error.OperationalError(result.state_change_reason)
+
+        start = time.perf_counter()
+        return_df, _ = normalise_dtypes(df=result.as_pandas(), downcast=downcast)
+        self._record_query_stats(
+            final_query=query,
+            execution_stats=_get_execution_stats(result),
+            wall_seconds=wall_seconds,
+            conversion_seconds=time.perf_counter() - start,
+            rows=len(return_df),
+            frame_bytes=int(return_df.memory_usage(deep=False).sum()),
+        )
+
+        return return_df
+
+
+def _get_execution_stats(result: Any) -> dict:
+    """
+    get the athena stats of a query from its cursor or result set
+    the stats are read before the cursor is closed, as closing the result set
+    drops its query execution
+
+    Parameters
+    ----------
+    result : Any
+        pyathena cursor or result set of the query
+
+    Returns
+    -------
+    Dict
+        query_id, queue_seconds, engine_execution_seconds, total_execution_seconds
+        and data_scanned_bytes of the query
+    """
+
+    return {
+        "query_id": result.query_id,
+        "queue_seconds": _millis_to_seconds(result.query_queue_time_in_millis),
+        "engine_execution_seconds": _millis_to_seconds(
+            result.engine_execution_time_in_millis
+        ),
+        "total_execution_seconds": _millis_to_seconds(
+            result.total_execution_time_in_millis
+        ),
+        "data_scanned_bytes": result.data_scanned_in_bytes,
+    }
+
+
+def _millis_to_seconds(millis: int | None) -> float | None:
+    """
+    convert the milliseconds of the athena query stats into seconds
+
+    Parameters
+    ----------
+    millis : Optional[int]
+        milliseconds, None if athena did not report them
+
+    Returns
+    -------
+    Optional[float]
+        seconds
+    """
+
+    return millis / 1000 if isinstance(millis, (int, float)) else None
@@ -5,6 +5,30 @@ import pandas as pd
 import pytest
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark-imports",
+        action="store_true",
+        help="run the import time and memory budgets of each submodule",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "benchmark: import time and memory budgets, see make benchmark-imports",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark-imports"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="needs --benchmark-imports")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
 @pytest.fixture(scope="module")
 def aws_credentials():
     """Mocked AWS Credentials for moto."""
@@ -16,13 +40,19 @@ def aws_credentials():
     os.environ["S3_BUCKET"] = "s3://au-com-dummy/athena_queries/"
 
 
+@pytest.fixture(scope="module")
+def databricks_credentials():
+    """Mocked Databricks SQL warehouse credentials."""
+    os.environ["DATABRICKS_HOST"] = "foo"
+    os.environ["DATABRICKS_SQL_PATH"] = "dummy_path"
+    os.environ["DATABRICKS_TOKEN"] = "tok"  # pragma: allowlist secret
+
+
 @pytest.fixture
 def mock_active_run():
     """mocked mlflow.active_run()"""
 
-    with patch(
-        "hip_data_ml_utils.mlflow_databricks.mlflow_tracker.mlflow.active_run"
-    ) as mock_active_run:
+    with patch("mlflow.active_run") as mock_active_run:
         mock_active_run.return_value = None
         yield mock_active_run
 
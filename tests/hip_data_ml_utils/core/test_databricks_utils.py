@@ -2,11 +2,15 @@ import datetime
 from typing import Callable
 from unittest.mock import patch
 
+import pandas as pd
+
+from hip_data_ml_utils.core.databricks_utils import format_sql_copy_into
 from hip_data_ml_utils.core.databricks_utils import get_date_intervals_model_drift
 from hip_data_ml_utils.core.databricks_utils import get_function_to_load
 from hip_data_ml_utils.core.databricks_utils import get_target_stage_for_env
 from hip_data_ml_utils.core.databricks_utils import get_test_date
 from hip_data_ml_utils.core.databricks_utils import load_yaml
+from hip_data_ml_utils.core.databricks_utils import write_parquet_chunks
 
 
 class TestDatabricksCommonUtils:
@@ -107,3 +111,52 @@ class TestDatabricksCommonUtils:
 
         assert expected_list[0] == "20230701_hour_pair_1"  # noqa: S101
         assert expected_list[-1] == "20230701_hour_pair_4"  # noqa: S101
+
+    def test_write_parquet_chunks(self, tmp_path) -> None:
+        """
+        test parquet chunks are written correctly
+
+        Parameters
+        ----------
+        tmp_path:
+            temporary staging directory
+
+        Returns
+        -------
+        assert
+            one parquet file per chunk, with every row once
+        """
+
+        dummy_df = pd.DataFrame({"a": range(5), "b": list("abcde")})
+
+        file_paths = write_parquet_chunks(
+            df=dummy_df, staging_location=str(tmp_path / "stage"), chunk_rows=2
+        )
+
+        assert len(file_paths) == 3  # noqa: S101
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(tmp_path / "stage"), dummy_df, check_dtype=False
+        )
+
+    def test_format_sql_copy_into(self, dummy_test_table) -> None:
+        """
+        test copy into sql is formatted correctly
+
+        Parameters
+        ----------
+        dummy_test_table:
+            dummy table name
+
+        Returns
+        -------
+        assert
+            staged parquet files are loaded into the table
+        """
+
+        return_sql = format_sql_copy_into(
+            table_name=dummy_test_table, staging_location="s3://dummy/stage/1"
+        )
+
+        assert return_sql == (  # noqa: S101
+            "COPY INTO dev.test_table\nFROM 's3://dummy/stage/1'\nFILEFORMAT = PARQUET"
+        )
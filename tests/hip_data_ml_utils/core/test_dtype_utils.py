@@ -0,0 +1,226 @@
+import datetime
+import decimal
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from hip_data_ml_utils.core.dtype_utils import arrow_to_nullable_pandas
+from hip_data_ml_utils.core.dtype_utils import arrow_to_pandas
+from hip_data_ml_utils.core.dtype_utils import normalise_arrow_table
+from hip_data_ml_utils.core.dtype_utils import normalise_dtypes
+
+
+class TestConvertDtypes:
+    """test class to convert pandas extension dtypes to numpy dtypes"""
+
+    def test_normalise_dtypes(self) -> None:
+        """
+        test function to convert pandas Int64 and Float64 to numpy
+
+        Returns
+        -------
+        assert
+            Int64 without nulls is int, Int64 with nulls and Float64 are float
+            other columns are untouched
+        """
+
+        dummy_df = pd.DataFrame(
+            {
+                "int_col": pd.Series([1, 2], dtype=pd.Int64Dtype()),
+                "int_null_col": pd.Series([1, None], dtype=pd.Int64Dtype()),
+                "float_col": pd.Series([1.0, 2.0], dtype=pd.Float64Dtype()),
+                "str_col": ["a", "b"],
+            }
+        )
+
+        return_df, _ = normalise_dtypes(dummy_df)
+
+        assert return_df["int_col"].dtype == int  # noqa: S101
+        assert return_df["int_null_col"].dtype == float  # noqa: S101
+        assert return_df["float_col"].dtype == float  # noqa: S101
+        assert return_df["str_col"].dtype == object  # noqa: S101
+
+    def test_normalise_dtypes_downcast(self) -> None:
+        """
+        test function to normalise and downcast pandas Int and Float columns
+
+        Returns
+        -------
+        assert
+            int columns are downcast to the smallest width
+            float columns are downcast to float32 only when lossless
+            report contains the bytes saved
+        """
+
+        dummy_df = pd.DataFrame(
+            {
+                "int8_col": pd.Series([1, -2], dtype=pd.Int64Dtype()),
+                "int32_col": pd.Series([1, 100_000], dtype=pd.Int64Dtype()),
+                "int_null_col": pd.Series([1, None], dtype=pd.Int64Dtype()),
+                "float_col": pd.Series([0.5, 2.0], dtype=pd.Float64Dtype()),
+                "float_lossy_col": pd.Series([0.1, 2.0], dtype=pd.Float64Dtype()),
+            }
+        )
+
+        return_df, report = normalise_dtypes(dummy_df, downcast=True)
+
+        assert return_df["int8_col"].dtype == np.int8  # noqa: S101
+        assert return_df["int32_col"].dtype == np.int32  # noqa: S101
+        assert return_df["int_null_col"].dtype == np.float32  # noqa: S101
+        assert return_df["float_col"].dtype == np.float32  # noqa: S101
+        assert return_df["float_lossy_col"].dtype == np.float64  # noqa: S101
+        assert report["bytes_saved"] > 0  # noqa: S101
+        assert (  # noqa: S101
+            report["bytes_saved"] == report["bytes_before"] - report["bytes_after"]
+        )
+        assert report["columns"]["int8_col"] == "Int64 -> int8"  # noqa: S101
+
+    def test_normalise_dtypes_downcast_empty(self) -> None:
+        """
+        test function to downcast a dataframe without rows
+
+        Returns
+        -------
+        assert
+            int columns without values are kept as int64
+        """
+
+        dummy_df = pd.DataFrame(
+            {
+                "int_col": pd.Series([], dtype=pd.Int64Dtype()),
+                "float_col": pd.Series([], dtype=pd.Float64Dtype()),
+            }
+        )
+
+        return_df, _ = normalise_dtypes(dummy_df, downcast=True)
+
+        assert return_df["int_col"].dtype == np.int64  # noqa: S101
+        assert return_df["float_col"].dtype == np.float32  # noqa: S101
+        assert return_df.empty  # noqa: S101
+
+    def test_normalise_dtypes_no_numeric_columns(self) -> None:
+        """
+        test function to normalise a dataframe without pandas Int and Float columns
+
+        Returns
+        -------
+        assert
+            dataframe is returned as is with an empty report
+        """
+
+        dummy_df = pd.DataFrame({"str_col": ["a", "b"]})
+
+        return_df, report = normalise_dtypes(dummy_df, downcast=True)
+
+        assert return_df is dummy_df  # noqa: S101
+        assert report["bytes_saved"] == 0  # noqa: S101
+        assert report["columns"] == {}  # noqa: S101
+
+    def test_arrow_to_pandas(self) -> None:
+        """
+        test function to convert pyarrow table into pandas
+
+        Returns
+        -------
+        assert
+            numpy backend gives numpy dtypes
+            pyarrow backend keeps nullable int and string as arrow dtypes
+        """
+
+        dummy_table = pa.table(
+            {
+                "int_col": pa.array([1, None], type=pa.int64()),
+                "str_col": pa.array(["a", "b"], type=pa.string()),
+            }
+        )
+
+        numpy_df = arrow_to_pandas(dummy_table, dtype_backend="numpy")
+        arrow_df = arrow_to_pandas(dummy_table, dtype_backend="pyarrow")
+
+        assert numpy_df["int_col"].dtype == float  # noqa: S101
+        assert arrow_df["int_col"].dtype == pd.ArrowDtype(pa.int64())  # noqa: S101
+        assert arrow_df["str_col"].dtype == pd.ArrowDtype(pa.string())  # noqa: S101
+        with pytest.raises(ValueError, match="dtype_backend can only be one of"):
+            arrow_to_pandas(dummy_table, dtype_backend="polars")
+
+    def test_normalise_arrow_table(self) -> None:
+        """
+        test function to convert pyarrow table into pandas with numpy types
+
+        Returns
+        -------
+        assert
+            decimals are float, ints with nulls are float, booleans without
+            nulls are bool, timestamps are datetime
+        assert
+            numeric columns are downcast and reported
+        """
+
+        dummy_table = pa.table(
+            {
+                "decimal_col": pa.array(
+                    [decimal.Decimal("1.25"), None], type=pa.decimal128(10, 2)
+                ),
+                "int_col": pa.array([1, 2], type=pa.int64()),
+                "int_null_col": pa.array([1, None], type=pa.int32()),
+                "bool_col": pa.array([True, False]),
+                "bool_null_col": pa.array([True, None]),
+                "timestamp_col": pa.array([datetime.datetime(2023, 1, 1), None]),
+            }
+        )
+
+        return_df, _ = normalise_arrow_table(dummy_table)
+        downcast_df, report = normalise_arrow_table(dummy_table, downcast=True)
+
+        assert return_df.dtypes.tolist() == [  # noqa: S101
+            np.dtype(np.float64),
+            np.dtype(np.int64),
+            np.dtype(np.float64),
+            np.dtype(bool),
+            pd.BooleanDtype(),
+            np.dtype("datetime64[us]"),
+        ]
+        assert return_df["decimal_col"].iloc[0] == 1.25  # noqa: S101
+        assert downcast_df["int_col"].dtype == np.int8  # noqa: S101
+        assert downcast_df["decimal_col"].dtype == np.float32  # noqa: S101
+        assert (  # noqa: S101
+            report["columns"]["decimal_col"] == "decimal128(10, 2) -> float32"
+        )
+        assert report["bytes_saved"] > 0  # noqa: S101
+
+    def test_arrow_to_nullable_pandas(self) -> None:
+        """
+        test function to convert pyarrow table into pandas with the types of
+        the pandas cursor
+
+        Returns
+        -------
+        assert
+            ints are nullable, dates and timestamps are datetime64[ns],
+            booleans with nulls are object and decimals stay Decimal
+        """
+
+        dummy_table = pa.table(
+            {
+                "int_col": pa.array([1, None], type=pa.int32()),
+                "date_col": pa.array([datetime.date(2023, 1, 1), None]),
+                "timestamp_col": pa.array([1, 2], type=pa.timestamp("ms")),
+                "bool_null_col": pa.array([True, None]),
+                "decimal_col": pa.array(
+                    [decimal.Decimal("1.25"), None], type=pa.decimal128(10, 2)
+                ),
+            }
+        )
+
+        return_df = arrow_to_nullable_pandas(dummy_table)
+
+        assert return_df.dtypes.tolist() == [  # noqa: S101
+            pd.Int32Dtype(),
+            np.dtype("datetime64[ns]"),
+            np.dtype("datetime64[ns]"),
+            np.dtype(object),
+            np.dtype(object),
+        ]
+        assert return_df["decimal_col"][0] == decimal.Decimal("1.25")  # noqa: S101
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from hip_data_ml_utils.core.file_cache import FileCache
+from hip_data_ml_utils.core.file_cache import open_atomic
+
+
+class TestFileCache:
+    """test class for the shared local file cache helpers"""
+
+    def test_open_atomic(self, tmp_path) -> None:
+        """
+        test function for writing a file through a temporary file
+
+        Parameters
+        ----------
+        tmp_path
+            temporary directory of the file
+
+        Returns
+        -------
+        assert
+            file is written once the block exits
+            temporary file is removed and the file is untouched on failure
+        """
+
+        path = tmp_path / "a.json"
+        with open_atomic(path, mode="w") as tmp_file:
+            tmp_file.write("first")
+            assert not path.exists()  # noqa: S101
+
+        with pytest.raises(RuntimeError):
+            with open_atomic(path, mode="w") as tmp_file:
+                tmp_file.write("second")
+                raise RuntimeError
+
+        assert path.read_text() == "first"  # noqa: S101
+        assert [path.name for path in tmp_path.iterdir()] == ["a.json"]  # noqa: S101
+
+    def test_evict(self, tmp_path) -> None:
+        """
+        test function for evicting the least recently used files
+
+        Parameters
+        ----------
+        tmp_path
+            temporary directory of the cache
+
+        Returns
+        -------
+        assert
+            least recently used files are evicted once over the size cap
+            kept file is never evicted
+            cache without _entry_paths cannot be created
+        """
+
+        with pytest.raises(TypeError, match="_entry_paths"):
+            type("IncompleteCache", (FileCache,), {})(
+                cache_dir=str(tmp_path), max_size_bytes=10
+            )
+
+        class TestCache(FileCache):
+            def _entry_paths(self):
+                return self.cache_dir.glob("*.txt")
+
+        test_cache = TestCache(cache_dir=str(tmp_path), max_size_bytes=10)
+        for used_at, name in enumerate(("a", "b", "c")):
+            (tmp_path / f"{name}.txt").write_text("12345")
+            os.utime(tmp_path / f"{name}.txt", (used_at, used_at))
+
+        test_cache._evict(keep=tmp_path / "a.txt")
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == [  # noqa: S101
+            "a.txt",
+            "c.txt",
+        ]
+        assert test_cache.stats()["size_bytes"] == 10  # noqa: S101
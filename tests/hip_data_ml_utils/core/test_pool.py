@@ -0,0 +1,158 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from hip_data_ml_utils.core.pool import ConnectionPool
+
+
+class TestConnectionPool:
+    """test class for the connection pool"""
+
+    def test_lazy_connect(self) -> None:
+        """
+        test function for creating connections on first use
+
+        Returns
+        -------
+        assert
+            no connection is created until acquired
+            released connection is reused
+        """
+
+        mocked_connect = MagicMock(side_effect=lambda: object())
+        test_pool = ConnectionPool(connect=mocked_connect, pool_size=2)
+
+        mocked_connect.assert_not_called()
+
+        with test_pool.connection() as first:
+            pass
+        with test_pool.connection() as second:
+            pass
+
+        assert first is second  # noqa: S101
+        assert mocked_connect.call_count == 1  # noqa: S101
+
+    def test_pool_size(self) -> None:
+        """
+        test function for the maximum number of connections
+
+        Returns
+        -------
+        assert
+            pool creates up to pool_size connections
+            acquire times out once every connection is in use
+        """
+
+        test_pool = ConnectionPool(connect=lambda: object(), pool_size=2)
+
+        first = test_pool.acquire()
+        second = test_pool.acquire()
+
+        assert first is not second  # noqa: S101
+        with pytest.raises(TimeoutError):
+            test_pool.acquire(timeout=0.01)
+
+        test_pool.release(first)
+        assert test_pool.acquire(timeout=0.01) is first  # noqa: S101
+
+    def test_wait_for_release(self) -> None:
+        """
+        test function for waiting on a connection used by another thread
+
+        Returns
+        -------
+        assert
+            waiting thread gets the released connection
+        """
+
+        test_pool = ConnectionPool(connect=lambda: object(), pool_size=1)
+        connection = test_pool.acquire()
+        threading.Timer(0.05, test_pool.release, args=[connection]).start()
+
+        assert test_pool.acquire(timeout=5) is connection  # noqa: S101
+
+    def test_wait_for_discard(self) -> None:
+        """
+        test function for waiting on a connection discarded by another thread
+
+        Returns
+        -------
+        assert
+            thread waiting without timeout creates a connection in the freed place
+        """
+
+        test_pool = ConnectionPool(connect=MagicMock, pool_size=1)
+        connection = test_pool.acquire()
+        acquired = []
+        waiting_thread = threading.Thread(
+            target=lambda: acquired.append(test_pool.acquire()), daemon=True
+        )
+        waiting_thread.start()
+
+        test_pool.discard(connection)
+        waiting_thread.join(timeout=5)
+
+        assert not waiting_thread.is_alive()  # noqa: S101
+        assert acquired[0] is not connection  # noqa: S101
+        assert test_pool.connections == acquired  # noqa: S101
+
+    def test_close(self) -> None:
+        """
+        test function for closing the pool
+
+        Returns
+        -------
+        assert
+            every connection is closed
+        """
+
+        test_pool = ConnectionPool(connect=MagicMock, pool_size=2)
+        first = test_pool.acquire()
+        second = test_pool.acquire()
+        test_pool.close()
+
+        first.close.assert_called_once()
+        second.close.assert_called_once()
+        assert test_pool.connections == []  # noqa: S101
+
+    def test_pool_size_error(self) -> None:
+        """
+        test function for invalid pool size
+
+        Returns
+        -------
+        assert
+            raises ValueError for non positive pool size
+        """
+
+        with pytest.raises(ValueError, match="pool_size must be a positive integer"):
+            ConnectionPool(connect=lambda: object(), pool_size=0)
+
+    def test_health_check(self) -> None:
+        """
+        test function for replacing unhealthy connections
+
+        Returns
+        -------
+        assert
+            idle connection failing the health check is closed and replaced
+            discarded connection frees its place in the pool
+        """
+
+        test_pool = ConnectionPool(
+            connect=MagicMock, pool_size=1, health_check=lambda conn: conn.open
+        )
+        first = test_pool.acquire()
+        first.open = False
+        test_pool.release(first)
+
+        second = test_pool.acquire()
+
+        assert second is not first  # noqa: S101
+        first.close.assert_called_once()
+        assert test_pool.connections == [second]  # noqa: S101
+
+        test_pool.discard(second)
+        assert test_pool.connections == []  # noqa: S101
+        assert test_pool.acquire(timeout=0.01) is not second  # noqa: S101
@@ -2,10 +2,36 @@ import pathlib
 from unittest.mock import mock_open
 from unittest.mock import patch
 
+import boto3
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_s3
+
+from hip_data_ml_utils.core.pyathena_utils import delete_s3_prefix
+from hip_data_ml_utils.core.pyathena_utils import download_s3_object
+from hip_data_ml_utils.core.pyathena_utils import format_partition_projection
+from hip_data_ml_utils.core.pyathena_utils import format_sql_add_partitions
 from hip_data_ml_utils.core.pyathena_utils import format_sql_create_schema
 from hip_data_ml_utils.core.pyathena_utils import format_sql_repair_table
+from hip_data_ml_utils.core.pyathena_utils import format_sql_unload
+from hip_data_ml_utils.core.pyathena_utils import get_athena_arrow_types
 from hip_data_ml_utils.core.pyathena_utils import get_config_yaml
+from hip_data_ml_utils.core.pyathena_utils import get_partition_projection
+from hip_data_ml_utils.core.pyathena_utils import get_yaml_arrow_types
+from hip_data_ml_utils.core.pyathena_utils import is_partition_projected
+from hip_data_ml_utils.core.pyathena_utils import list_s3_keys
+from hip_data_ml_utils.core.pyathena_utils import list_s3_partition_values
+from hip_data_ml_utils.core.pyathena_utils import read_athena_csv
+from hip_data_ml_utils.core.pyathena_utils import read_s3_parquet
 from hip_data_ml_utils.core.pyathena_utils import read_sql
+from hip_data_ml_utils.core.pyathena_utils import split_date_key_range
+from hip_data_ml_utils.core.pyathena_utils import split_s3_location
+from hip_data_ml_utils.core.pyathena_utils import split_table_by_partition
+
+TEST_YAML_FILE = "tests/hip_data_ml_utils/core/test_yaml.yaml"
+TEST_PROJECTION_YAML_FILE = "tests/hip_data_ml_utils/core/test_yaml_projection.yaml"
 
 
 class TestReadSQL:
@@ -127,3 +153,449 @@ class TestFormatSQL:
         return_sql = format_sql_repair_table(dummy_sql, dummy_table_name)
 
         assert return_sql == "REPAIR TABLE dev.test_table"  # noqa: S101
+
+
+class TestPartitions:
+    """test class to list and add partitions of athena tables"""
+
+    def test_split_s3_location(self) -> None:
+        """
+        test function to split s3 location into bucket and prefix
+
+        Returns
+        -------
+        assert
+            scheme is dropped and repeated slashes are collapsed
+        """
+
+        assert split_s3_location("s3://dummy/dev/table//") == (  # noqa: S101
+            "dummy",
+            "dev/table/",
+        )
+        assert split_s3_location("testing-bucket/testing/") == (  # noqa: S101
+            "testing-bucket",
+            "testing/",
+        )
+        assert split_s3_location("s3://dummy") == ("dummy", "")  # noqa: S101
+
+    @mock_s3
+    def test_list_s3_partition_values(self, aws_credentials) -> None:
+        """
+        test function to list partition values in s3
+
+        Parameters
+        ----------
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            only the partition prefixes under the location are listed
+        """
+
+        s3_client = boto3.client("s3", region_name="ap-southeast-2")
+        s3_client.create_bucket(
+            Bucket="dummy",
+            CreateBucketConfiguration={"LocationConstraint": "ap-southeast-2"},
+        )
+        for key in [
+            "dev/table/date_created=20230102/part-0.parquet",
+            "dev/table/date_created=20230101/part-0.parquet",
+            "dev/table/date_created=20230101/part-1.parquet",
+            "dev/table/_SUCCESS",
+            "dev/other_table/date_created=20230103/part-0.parquet",
+        ]:
+            s3_client.put_object(Bucket="dummy", Key=key, Body=b"")
+
+        partition_values = list_s3_partition_values(
+            s3_location="s3://dummy/dev/table/", partition_column="date_created"
+        )
+
+        assert partition_values == ["20230101", "20230102"]  # noqa: S101
+
+    @mock_s3
+    def test_list_read_delete_s3_keys(self, aws_credentials) -> None:
+        """
+        test function to list, read and delete the files under an s3 location
+
+        Parameters
+        ----------
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            only the files under the location are listed and deleted
+        assert
+            parquet file is read into pyarrow
+        """
+
+        s3_client = boto3.client("s3", region_name="ap-southeast-2")
+        s3_client.create_bucket(
+            Bucket="dummy",
+            CreateBucketConfiguration={"LocationConstraint": "ap-southeast-2"},
+        )
+        buffer = pa.BufferOutputStream()
+        pq.write_table(pa.table({"a": [1, 2]}), buffer)
+        for key in ["unload/1/", "unload/1/part-1", "unload/1/part-0", "other/part-0"]:
+            s3_client.put_object(
+                Bucket="dummy", Key=key, Body=buffer.getvalue().to_pybytes()
+            )
+
+        keys = list_s3_keys("s3://dummy/unload/1/")
+        table = read_s3_parquet(bucket="dummy", key=keys[0])
+        deleted = delete_s3_prefix("s3://dummy/unload/1/")
+
+        assert keys == ["unload/1/part-0", "unload/1/part-1"]  # noqa: S101
+        assert table.column("a").to_pylist() == [1, 2]  # noqa: S101
+        assert deleted == 2  # noqa: S101
+        assert list_s3_keys("s3://dummy/unload/1/") == []  # noqa: S101
+        assert list_s3_keys("s3://dummy/other/") == ["other/part-0"]  # noqa: S101
+
+    def test_split_table_by_partition(self) -> None:
+        """
+        test function to split a pyarrow table by partition
+
+        Returns
+        -------
+        assert
+            partitions are in order, sorted by the sort key, without partition column
+        assert
+            ValueError is raised for null partition values
+        """
+
+        table = pa.table(
+            {"date_created": [20230102, 20230101, 20230102], "a": [3, 2, 1]}
+        )
+
+        partitions = split_table_by_partition(
+            table=table, partition_column="date_created", sort_by=["a"]
+        )
+
+        assert [value for value, _ in partitions] == [  # noqa: S101
+            "20230101",
+            "20230102",
+        ]
+        assert partitions[1][1].to_pydict() == {"a": [1, 3]}  # noqa: S101
+        with pytest.raises(ValueError, match="null partition values"):
+            split_table_by_partition(
+                table=pa.table({"date_created": [None, 1]}),
+                partition_column="date_created",
+            )
+
+    @mock_s3
+    def test_download_s3_object(self, aws_credentials) -> None:
+        """
+        test function to download an s3 object with ranged GETs
+
+        Parameters
+        ----------
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            parts are assembled in order, including a shorter last part
+        assert
+            synthetic csv result file is parsed from the downloaded parts
+        """
+
+        s3_client = boto3.client("s3", region_name="ap-southeast-2")
+        s3_client.create_bucket(
+            Bucket="dummy",
+            CreateBucketConfiguration={"LocationConstraint": "ap-southeast-2"},
+        )
+        dummy_df = pd.DataFrame(
+            {"id": range(25_000), "theme": ["churn", "price"] * 12_500}
+        )
+        content = dummy_df.to_csv(index=False, quoting=1).encode()
+        s3_client.put_object(Bucket="dummy", Key="query/result.csv", Body=content)
+
+        downloaded = download_s3_object(
+            "s3://dummy/query/result.csv", part_size=64 * 1024, max_workers=4
+        )
+        table = read_athena_csv(
+            data=downloaded, column_types={"id": pa.int64(), "theme": pa.string()}
+        )
+
+        assert len(content) % (64 * 1024) != 0  # noqa: S101
+        assert bytes(downloaded) == content  # noqa: S101
+        pd.testing.assert_frame_equal(table.to_pandas(), dummy_df)
+
+    def test_get_yaml_arrow_types(self, tmp_path) -> None:
+        """
+        test function to get the pyarrow types of the columns of yaml config
+
+        Parameters
+        ----------
+        tmp_path
+            temporary directory of the yaml config
+
+        Returns
+        -------
+        assert
+            ddl types are mapped to pyarrow types
+            partition column and nested types are left out
+        """
+
+        yaml_file = tmp_path / "test.yaml"
+        yaml_file.write_text(
+            "tables:\n"
+            "  - columns:\n"
+            "      - {name: a, description: a, data_type: int}\n"
+            "      - {name: b, description: b, data_type: VARCHAR(10)}\n"
+            "      - {name: c, description: c, data_type: 'decimal(10, 2)'}\n"
+            "      - {name: d, description: d, data_type: array<int>}\n"
+            "      - {name: e, description: partition date, data_type: string}\n"
+        )
+
+        assert get_yaml_arrow_types(str(yaml_file)) == {  # noqa: S101
+            "a": pa.int32(),
+            "b": pa.string(),
+            "c": pa.decimal128(10, 2),
+        }
+
+    def test_read_athena_csv(self) -> None:
+        """
+        test function to parse an athena csv result file with the query types
+
+        Returns
+        -------
+        assert
+            columns have the types of the query, unknown types as strings
+        assert
+            unquoted empty values are null, quoted empty strings are not
+        """
+
+        description = [
+            ("a", "integer", None, None, 10, 0, "NULLABLE"),
+            ("b", "varchar", None, None, 0, 0, "NULLABLE"),
+            ("c", "timestamp", None, None, 3, 0, "NULLABLE"),
+            ("d", "decimal", None, None, 10, 2, "NULLABLE"),
+            ("e", "array", None, None, 0, 0, "NULLABLE"),
+        ]
+        data = (
+            b'"a","b","c","d","e"\n'
+            b'"1","x","2023-01-01 00:00:00.123","1.50","[1, 2]"\n'
+            b',"",,,\n'
+        )
+
+        table = read_athena_csv(
+            data=data, column_types=get_athena_arrow_types(description)
+        )
+
+        assert table.schema.types == [  # noqa: S101
+            pa.int32(),
+            pa.string(),
+            pa.timestamp("ms"),
+            pa.decimal128(10, 2),
+            pa.string(),
+        ]
+        assert table.column("a").to_pylist() == [1, None]  # noqa: S101
+        assert table.column("b").to_pylist() == ["x", ""]  # noqa: S101
+
+    def test_format_sql_unload(self) -> None:
+        """
+        test function to get sql unload
+
+        Returns
+        -------
+        assert
+            query is wrapped in an unload to parquet without its semicolon
+        """
+
+        return_sql = format_sql_unload("SELECT a FROM t;\n", "s3://dummy/unload/1/")
+
+        assert return_sql == (  # noqa: S101
+            "UNLOAD (SELECT a FROM t)\nTO 's3://dummy/unload/1/'\n"
+            "WITH (format = 'PARQUET', compression = 'SNAPPY')"
+        )
+
+    def test_format_sql_add_partitions(self, dummy_test_table) -> None:
+        """
+        test function to format batched add partitions sql
+
+        Parameters
+        ----------
+        dummy_test_table
+            dummy table name
+
+        Returns
+        -------
+        assert
+            partitions are split into batches with their locations
+        """
+
+        return_sqls = format_sql_add_partitions(
+            table_name=dummy_test_table,
+            partition_column="date_created",
+            s3_location="s3://dummy/dev/table//",
+            partition_values=["20230101", "20230102", "20230103"],
+            batch_size=2,
+        )
+
+        assert len(return_sqls) == 2  # noqa: S101
+        assert return_sqls[0] == (  # noqa: S101
+            "ALTER TABLE dev.test_table ADD IF NOT EXISTS\n"
+            "PARTITION (date_created='20230101') "
+            "LOCATION 's3://dummy/dev/table/date_created=20230101/'\n"
+            "PARTITION (date_created='20230102') "
+            "LOCATION 's3://dummy/dev/table/date_created=20230102/'"
+        )
+        assert "20230103" in return_sqls[1]  # noqa: S101
+        assert (
+            format_sql_add_partitions(  # noqa: S101
+                dummy_test_table, "date_created", "s3://dummy/dev/table/", []
+            )
+            == []
+        )
+
+    def test_split_date_key_range(self) -> None:
+        """
+        test function to split a range of date dim keys into slices
+
+        Returns
+        -------
+        assert
+            slices cover the range across month ends, the last one shorter
+        assert
+            a single day range is one slice
+        """
+
+        assert split_date_key_range(20230130, 20230204, slice_days=2) == [  # noqa: S101
+            (20230130, 20230131),
+            (20230201, 20230202),
+            (20230203, 20230204),
+        ]
+        assert split_date_key_range(20230130, 20230203, slice_days=3) == [  # noqa: S101
+            (20230130, 20230201),
+            (20230202, 20230203),
+        ]
+        assert split_date_key_range(20230130, 20230130) == [  # noqa: S101
+            (20230130, 20230130)
+        ]
+
+    def test_split_date_key_range_error(self) -> None:
+        """
+        test function to split a range of date dim keys with invalid arguments
+
+        Returns
+        -------
+        assert
+            ValueError is raised for a reversed range or non positive slice_days
+        """
+
+        with pytest.raises(ValueError, match="must not be after"):
+            split_date_key_range(20230201, 20230130)
+        with pytest.raises(ValueError, match="slice_days must be a positive integer"):
+            split_date_key_range(20230130, 20230201, slice_days=0)
+
+
+class TestPartitionProjection:
+    """test class to format partition projection of athena tables"""
+
+    def test_get_partition_projection(self) -> None:
+        """
+        test function to get partition projection in yaml config
+
+        Returns
+        -------
+        assert
+            spec is returned if declared, empty otherwise
+        """
+
+        assert get_partition_projection(TEST_YAML_FILE) == {}  # noqa: S101
+        assert (  # noqa: S101
+            get_partition_projection(TEST_PROJECTION_YAML_FILE)["type"] == "date"
+        )
+
+    def test_is_partition_projected(self) -> None:
+        """
+        test function to check if a table is created with partition projection
+
+        Returns
+        -------
+        assert
+            projected only with a projection spec and a template placeholder
+        """
+
+        sql = 'CREATE TABLE {table_name} tblproperties ("a"="b"{partition_projection})'
+
+        assert is_partition_projected(sql, TEST_PROJECTION_YAML_FILE)  # noqa: S101
+        assert not is_partition_projected(sql, TEST_YAML_FILE)  # noqa: S101
+        assert not is_partition_projected(  # noqa: S101
+            "CREATE TABLE {table_name}", TEST_PROJECTION_YAML_FILE
+        )
+
+    def test_format_partition_projection(self) -> None:
+        """
+        test function to format partition projection table properties
+
+        Returns
+        -------
+        assert
+            enum projection properties and storage location template
+            empty spec gives no properties
+        """
+
+        return_properties = format_partition_projection(
+            partition_column="country",
+            s3_bucket="s3://dummy/dev/table/",
+            partition_projection={"type": "enum", "values": ["AU", "NZ"]},
+        )
+
+        assert return_properties == (  # noqa: S101
+            ',\n    "projection.enabled"="true"'
+            ',\n    "projection.country.type"="enum"'
+            ',\n    "projection.country.values"="AU,NZ"'
+            ',\n    "storage.location.template"='
+            '"s3://dummy/dev/table/country=${country}/"'
+        )
+        assert format_partition_projection("country", "dummy", {}) == ""  # noqa: S101
+
+    def test_format_partition_projection_error(self) -> None:
+        """
+        test function for invalid partition projection specs
+
+        Returns
+        -------
+        assert
+            raises ValueError for unknown type and missing keys
+        """
+
+        with pytest.raises(ValueError, match="type can only be one of"):
+            format_partition_projection("col", "dummy", {"type": "injected"})
+        with pytest.raises(ValueError, match="requires"):
+            format_partition_projection("col", "dummy", {"type": "date"})
+
+    def test_format_sql_create_schema_projection(self) -> None:
+        """
+        test function to get sql create table schema with partition projection
+
+        Returns
+        -------
+        assert
+            date projection properties are formatted into tblproperties
+        """
+
+        dummy_sql = (
+            "LOCATION '{s3_bucket}'\n"
+            'tblproperties ("parquet.compression"="SNAPPY"{partition_projection});'
+        )
+
+        return_sql, _ = format_sql_create_schema(dummy_sql, TEST_PROJECTION_YAML_FILE)
+
+        assert (  # noqa: S101
+            '"projection.inference_date_created.range"="20200101,NOW"' in return_sql
+        )
+        assert (  # noqa: S101
+            '"projection.inference_date_created.interval.unit"="DAYS"' in return_sql
+        )
+        assert (  # noqa: S101
+            '"storage.location.template"="s3://testing-bucket/testing/'
+            'inference_date_created=${inference_date_created}/"' in return_sql
+        )
+        assert return_sql.endswith('}/");')  # noqa: S101
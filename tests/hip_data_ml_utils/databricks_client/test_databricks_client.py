@@ -1,7 +1,18 @@
+import decimal
+import re
+from unittest.mock import MagicMock
 from unittest.mock import Mock
 from unittest.mock import patch
 
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
 from databricks import sql
+from databricks.sql.exc import RequestError
+from databricks.sql.exc import ServerOperationError
+
+from hip_data_ml_utils.databricks_client.client import DatabricksSQLClient
 
 
 class TestDatabricksSQLClient:
@@ -24,3 +35,362 @@ class TestDatabricksSQLClient:
         with patch("databricks.sql.connect", return_value=Mock()) as mock_connect:
             _ = sql.connect(**dummy_client_args_dict)
             mock_connect.assert_called_with(**dummy_client_args_dict)
+
+    @patch("hip_data_ml_utils.databricks_client.client.connect")
+    def test_query_as_pandas(self, mocked_connect, databricks_credentials):
+        """
+        test function to query databricks into pandas through arrow
+        Parameters
+        ----------
+        mocked_connect
+            mocked databricks sql connect
+        databricks_credentials
+            inherits the databricks creds when connecting
+
+        Returns
+        -------
+        assert
+            arrow result is returned as is, or as pandas dataframe
+        assert
+            rows are not fetched as python objects
+        """
+
+        dummy_table = pa.table({"a": [1, None], "b": ["x", "y"]})
+        mocked_cursor = mocked_connect.return_value.cursor.return_value
+        mocked_cursor.fetchall_arrow.return_value = dummy_table
+
+        test_client = DatabricksSQLClient()
+
+        test_table = test_client.query_as_arrow(final_query="SELECT 1")
+        test_df = test_client.query_as_pandas(final_query="SELECT 1")
+        test_arrow_df = test_client.query_as_pandas(
+            final_query="SELECT 1", dtype_backend="pyarrow"
+        )
+
+        assert test_table is dummy_table  # noqa: S101
+        pd.testing.assert_frame_equal(
+            test_df, pd.DataFrame({"a": [1.0, None], "b": ["x", "y"]})
+        )
+        assert test_arrow_df["a"].dtype == pd.ArrowDtype(pa.int64())  # noqa: S101
+        mocked_cursor.fetchall.assert_not_called()
+        with pytest.raises(ValueError, match="dtype_backend can only be one of"):
+            test_client.query_as_pandas(final_query="SELECT 1", dtype_backend="polars")
+
+    @patch("hip_data_ml_utils.databricks_client.client.connect")
+    def test_iter_query(self, mocked_connect, databricks_credentials):
+        """
+        test function to query databricks in batches
+        Parameters
+        ----------
+        mocked_connect
+            mocked databricks sql connect
+        databricks_credentials
+            inherits the databricks creds when connecting
+
+        Returns
+        -------
+        assert
+            batches are yielded until an empty batch is fetched
+        assert
+            cursor is closed once the result is exhausted
+        """
+
+        dummy_tables = [
+            pa.table({"a": [1, 2]}),
+            pa.table({"a": [3]}),
+            pa.table({"a": pa.array([], pa.int64())}),
+        ]
+        mocked_cursor = mocked_connect.return_value.cursor.return_value
+        mocked_cursor.fetchmany_arrow.side_effect = dummy_tables
+
+        test_client = DatabricksSQLClient()
+
+        test = list(test_client.iter_query(final_query="SELECT a", batch_rows=2))
+
+        assert [df["a"].tolist() for df in test] == [[1, 2], [3]]  # noqa: S101
+        mocked_cursor.fetchmany_arrow.assert_called_with(2)
+        mocked_cursor.close.assert_called_once()
+
+        mocked_cursor.fetchmany_arrow.side_effect = dummy_tables
+        test_batches = test_client.iter_query(final_query="SELECT a", as_arrow=True)
+
+        assert next(test_batches) is dummy_tables[0]  # noqa: S101
+        with pytest.raises(ValueError, match="batch_rows must be a positive integer"):
+            next(test_client.iter_query(final_query="SELECT a", batch_rows=0))
+
+    @patch("hip_data_ml_utils.databricks_client.client.connect")
+    def test_connection_lifecycle(self, mocked_connect, databricks_credentials):
+        """
+        test function for the connection pool of the databricks client
+        Parameters
+        ----------
+        mocked_connect
+            mocked databricks sql connect
+        databricks_credentials
+            inherits the databricks creds when connecting
+
+        Returns
+        -------
+        assert
+            connection is created lazily and reused, cursors are closed
+        assert
+            connections are closed when leaving the context manager
+        """
+
+        with DatabricksSQLClient(pool_size=2) as test_client:
+            mocked_connect.assert_not_called()
+            test_client.query_as_arrow(final_query="SELECT 1")
+            test_client.query_as_arrow(final_query="SELECT 2")
+
+            mocked_connect.assert_called_once()
+            assert (  # noqa: S101
+                mocked_connect.return_value.cursor.return_value.close.call_count == 2
+            )
+
+        mocked_connect.return_value.close.assert_called_once()
+
+    @patch("hip_data_ml_utils.databricks_client.client.connect")
+    def test_reconnect(self, mocked_connect, databricks_credentials):
+        """
+        test function for reconnecting on a dropped connection
+        Parameters
+        ----------
+        mocked_connect
+            mocked databricks sql connect
+        databricks_credentials
+            inherits the databricks creds when connecting
+
+        Returns
+        -------
+        assert
+            query failing on a dropped connection is retried on a new connection
+        assert
+            query failing on its own is not retried
+        assert
+            cursors of the failed queries are closed
+        """
+
+        dropped_connection = MagicMock()
+        dropped_connection.cursor.return_value.execute.side_effect = RequestError(
+            "dropped"
+        )
+        new_connection = MagicMock()
+        new_connection.cursor.return_value.fetchall_arrow.return_value = pa.table(
+            {"a": [1]}
+        )
+        mocked_connect.side_effect = [dropped_connection, new_connection]
+
+        test_client = DatabricksSQLClient()
+
+        test = test_client.query_as_arrow(final_query="SELECT a")
+
+        assert test.column("a").to_pylist() == [1]  # noqa: S101
+        dropped_connection.close.assert_called_once()
+        dropped_connection.cursor.return_value.close.assert_called_once()
+
+        new_connection.cursor.return_value.execute.side_effect = ServerOperationError(
+            "syntax error"
+        )
+        with pytest.raises(ServerOperationError, match="syntax error"):
+            test_client.query_as_arrow(final_query="SELEC a")
+        assert mocked_connect.call_count == 2  # noqa: S101
+        new_connection.close.assert_not_called()
+        assert new_connection.cursor.return_value.close.call_count == 2  # noqa: S101
+
+    @patch("hip_data_ml_utils.databricks_client.client.connect")
+    def test_query_failure_closes_cursor(self, mocked_connect, databricks_credentials):
+        """
+        test function for closing the cursor of a failed query
+        Parameters
+        ----------
+        mocked_connect
+            mocked databricks sql connect
+        databricks_credentials
+            inherits the databricks creds when connecting
+
+        Returns
+        -------
+        assert
+            cursor is closed and its connection is given back to the pool
+        """
+
+        mocked_cursor = mocked_connect.return_value.cursor.return_value
+        mocked_cursor.execute.side_effect = ServerOperationError("syntax error")
+
+        test_client = DatabricksSQLClient(pool_size=1)
+
+        with pytest.raises(ServerOperationError, match="syntax error"):
+            test_client.query_as_pandas(final_query="SELEC a")
+        mocked_cursor.close.assert_called_once()
+
+        mocked_cursor.execute.side_effect = None
+        mocked_cursor.fetchall_arrow.return_value = pa.table({"a": [1]})
+        test_client.query_as_pandas(final_query="SELECT a")
+        assert mocked_connect.call_count == 1  # noqa: S101
+
+    @patch("hip_data_ml_utils.databricks_client.client.connect")
+    def test_warm_up(self, mocked_connect, databricks_credentials):
+        """
+        test function for the warm-up ping of the sql warehouse
+        Parameters
+        ----------
+        mocked_connect
+            mocked databricks sql connect
+        databricks_credentials
+            inherits the databricks creds when connecting
+
+        Returns
+        -------
+        assert
+            ping query runs when the client is created
+        """
+
+        DatabricksSQLClient(warm_up=True)
+
+        mocked_cursor = mocked_connect.return_value.cursor.return_value
+        mocked_cursor.execute.assert_called_once_with("SELECT 1")
+        mocked_cursor.fetchall.assert_called_once()
+
+    @patch("hip_data_ml_utils.databricks_client.client.connect")
+    def test_query_as_pandas_dtypes(self, mocked_connect, databricks_credentials):
+        """
+        test function to normalise the dtypes of a databricks query
+        Parameters
+        ----------
+        mocked_connect
+            mocked databricks sql connect
+        databricks_credentials
+            inherits the databricks creds when connecting
+
+        Returns
+        -------
+        assert
+            decimals are float instead of python Decimal objects
+        assert
+            numeric columns are downcast and reported
+        """
+
+        mocked_cursor = mocked_connect.return_value.cursor.return_value
+        mocked_cursor.fetchall_arrow.return_value = pa.table(
+            {
+                "price": pa.array([decimal.Decimal("9.50")], type=pa.decimal128(10, 2)),
+                "count": pa.array([3], type=pa.int64()),
+            }
+        )
+
+        test_client = DatabricksSQLClient()
+
+        test = test_client.query_as_pandas(final_query="SELECT 1", downcast=True)
+
+        assert test["price"].dtype == np.float32  # noqa: S101
+        assert test["count"].dtype == np.int8  # noqa: S101
+        assert test_client.dtype_report["columns"]["count"] == (  # noqa: S101
+            "Int64 -> int8"
+        )
+
+    @patch("hip_data_ml_utils.databricks_client.client.connect")
+    def test_query_many(self, mocked_connect, databricks_credentials):
+        """
+        test function to query many databricks queries concurrently
+        Parameters
+        ----------
+        mocked_connect
+            mocked databricks sql connect
+        databricks_credentials
+            inherits the databricks creds when connecting
+
+        Returns
+        -------
+        assert
+            dataframes are returned in the order of the queries, with timings
+        assert
+            at most pool_size connections are created
+        assert
+            error of a failing query is raised
+        """
+
+        class DummyCursor:
+            def execute(self, final_query):
+                if final_query == "failed":
+                    raise ServerOperationError("FAILED")
+                self.final_query = final_query
+
+            def fetchall_arrow(self):
+                return pa.table({"query": [self.final_query]})
+
+            def close(self):
+                pass
+
+        mocked_connect.return_value.cursor.side_effect = DummyCursor
+
+        query_timings = []
+        test_client = DatabricksSQLClient(
+            pool_size=2, on_query_stats=query_timings.append
+        )
+
+        queries = [f"query_{i}" for i in range(5)]
+        test = test_client.query_many(queries=queries, max_concurrency=3)
+
+        assert [df["query"][0] for df in test] == queries  # noqa: S101
+        assert (
+            sorted(timings["query"] for timings in query_timings)  # noqa: S101
+            == queries
+        )
+        assert all(  # noqa: S101
+            timings["rows"] == 1 and timings["query_seconds"] >= 0
+            for timings in query_timings
+        )
+        assert mocked_connect.call_count <= 2  # noqa: S101
+        with pytest.raises(ServerOperationError, match="FAILED"):
+            test_client.query_many(queries=["query_0", "failed"])
+
+    @patch("hip_data_ml_utils.databricks_client.client.connect")
+    def test_bulk_load(self, mocked_connect, databricks_credentials, tmp_path):
+        """
+        test function to bulk load a dataframe through staged parquet files
+        Parameters
+        ----------
+        mocked_connect
+            mocked databricks sql connect
+        databricks_credentials
+            inherits the databricks creds when connecting
+        tmp_path
+            local staging directory
+
+        Returns
+        -------
+        assert
+            staged parquet files are loaded with a single COPY INTO
+        assert
+            staged files are deleted once they are loaded
+        """
+
+        loaded = {}
+
+        class DummyCursor:
+            def execute(self, final_query):
+                table_name, staging_location = re.match(
+                    r"COPY INTO (\S+)\nFROM '(.+)'", final_query
+                ).groups()
+                loaded[table_name] = pd.read_parquet(staging_location)
+
+            def close(self):
+                pass
+
+        mocked_connect.return_value.cursor.side_effect = DummyCursor
+        dummy_df = pd.DataFrame({"a": range(5), "b": list("abcde")})
+
+        test_client = DatabricksSQLClient()
+
+        test = test_client.bulk_load(
+            df=dummy_df,
+            table_name="dev.test_table",
+            staging_location=str(tmp_path),
+            chunk_rows=2,
+        )
+
+        assert test == 5  # noqa: S101
+        pd.testing.assert_frame_equal(
+            loaded["dev.test_table"], dummy_df, check_dtype=False
+        )
+        assert list(tmp_path.iterdir()) == []  # noqa: S101
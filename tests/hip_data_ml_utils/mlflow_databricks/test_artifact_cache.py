@@ -0,0 +1,145 @@
+import os
+import pathlib
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from hip_data_ml_utils.mlflow_databricks.artifact_cache import ArtifactCache
+
+
+def fake_download_artifacts(artifact_uri: str, dst_path: str = None) -> str:
+    """writes the artifact uri as the content of the downloaded file"""
+    local_path = pathlib.Path(dst_path) / artifact_uri.split("/")[-1]
+    local_path.write_text(artifact_uri.split("/")[-1])
+    return str(local_path)
+
+
+class TestArtifactCache:
+    """test class for the local artifact cache"""
+
+    def test_make_key(self, tmp_path) -> None:
+        """
+        test function to create cache keys
+
+        Parameters
+        ----------
+        tmp_path
+            temporary directory of the cache
+
+        Returns
+        -------
+        assert
+            run uris are keyed as they are
+            stage uris are keyed on the resolved model version
+            other uris are not cached
+        """
+
+        mlflow_client = MagicMock()
+        mlflow_client.get_latest_versions.return_value = [MagicMock(version="3")]
+        test_cache = ArtifactCache(cache_dir=str(tmp_path), mlflow_client=mlflow_client)
+
+        assert test_cache.make_key("runs:/abc", "a.pkl") == (  # noqa: S101
+            test_cache.make_key("runs:/abc/", "a.pkl")
+        )
+        assert test_cache.make_key(  # noqa: S101
+            "models:/test_model/Production", "a.pkl"
+        ) == test_cache.make_key("models:/test_model/3", "a.pkl")
+        assert test_cache.make_key("s3://bucket/path", "a.pkl") is None  # noqa: S101
+
+    @patch("mlflow.artifacts.download_artifacts", side_effect=fake_download_artifacts)
+    def test_download(self, mock_download_artifacts, tmp_path) -> None:
+        """
+        test function to download an artifact through the cache
+
+        Parameters
+        ----------
+        mock_download_artifacts:
+            mock patch mlflow.artifacts.download_artifacts
+        tmp_path
+            temporary directory of the cache
+
+        Returns
+        -------
+        assert
+            artifact is downloaded on the first call only
+            a new cache on the same directory reads the same file
+            files with the same content are stored once
+        """
+
+        test_cache = ArtifactCache(cache_dir=str(tmp_path))
+
+        first = test_cache.download("runs:/abc", "encoder.pkl")
+        second = ArtifactCache(cache_dir=str(tmp_path)).download(
+            "runs:/abc", "encoder.pkl"
+        )
+        test_cache.download("runs:/def", "encoder.pkl")
+
+        assert first == second  # noqa: S101
+        assert first.endswith(".pkl")  # noqa: S101
+        assert pathlib.Path(first).read_text() == "encoder.pkl"  # noqa: S101
+        assert mock_download_artifacts.call_count == 2  # noqa: S101
+        assert test_cache.stats()["entries"] == 1  # noqa: S101
+        assert not list(tmp_path.glob("*.tmp"))  # noqa: S101
+
+    @patch("mlflow.artifacts.download_artifacts", side_effect=fake_download_artifacts)
+    def test_evict(self, mock_download_artifacts, tmp_path) -> None:
+        """
+        test function to evict the least recently used files
+
+        Parameters
+        ----------
+        mock_download_artifacts:
+            mock patch mlflow.artifacts.download_artifacts
+        tmp_path
+            temporary directory of the cache
+
+        Returns
+        -------
+        assert
+            least recently used file is evicted once over the size cap
+            evicted artifact is downloaded again
+        """
+
+        test_cache = ArtifactCache(cache_dir=str(tmp_path), max_size_bytes=12)
+
+        first = test_cache.download("runs:/abc", "a.yaml")
+        os.utime(first, (0, 0))
+        test_cache.download("runs:/abc", "bb.yaml")
+        test_cache.download("runs:/abc", "ccc.yaml")
+
+        assert test_cache.stats()["entries"] == 1  # noqa: S101
+        assert not pathlib.Path(first).exists()  # noqa: S101
+
+        test_cache.download("runs:/abc", "a.yaml")
+        assert mock_download_artifacts.call_count == 4  # noqa: S101
+
+    @patch("mlflow.artifacts.download_artifacts", side_effect=fake_download_artifacts)
+    def test_invalidate(self, mock_download_artifacts, tmp_path) -> None:
+        """
+        test function to invalidate cached artifacts
+
+        Parameters
+        ----------
+        mock_download_artifacts:
+            mock patch mlflow.artifacts.download_artifacts
+        tmp_path
+            temporary directory of the cache
+
+        Returns
+        -------
+        assert
+            invalidated artifact is a miss
+            invalidating everything removes every file
+        """
+
+        test_cache = ArtifactCache(cache_dir=str(tmp_path))
+        test_cache.download("runs:/abc", "a.yaml")
+
+        test_cache.invalidate(test_cache.make_key("runs:/abc", "a.yaml"))
+        test_cache.download("runs:/abc", "a.yaml")
+
+        assert mock_download_artifacts.call_count == 2  # noqa: S101
+        assert test_cache.stats()["misses"] == 2  # noqa: S101
+
+        test_cache.invalidate()
+
+        assert test_cache.stats()["entries"] == 0  # noqa: S101
@@ -1,9 +1,11 @@
+import shutil
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
 import pandas as pd
 import pytest
 
+from hip_data_ml_utils.mlflow_databricks.artifact_cache import ArtifactCache
 from hip_data_ml_utils.mlflow_databricks.mlflow_model_utils import (
     mlflow_decision_to_promote,
 )
@@ -20,8 +22,13 @@ from hip_data_ml_utils.mlflow_databricks.mlflow_model_utils import (
     mlflow_get_model_version,
 )
 from hip_data_ml_utils.mlflow_databricks.mlflow_model_utils import mlflow_load_artifact
+from hip_data_ml_utils.mlflow_databricks.mlflow_model_utils import (
+    mlflow_load_artifacts,
+)
 from hip_data_ml_utils.mlflow_databricks.mlflow_model_utils import mlflow_load_model
 from hip_data_ml_utils.mlflow_databricks.mlflow_model_utils import mlflow_promote_model
+from hip_data_ml_utils.mlflow_databricks.model_cache import ModelCache
+from hip_data_ml_utils.mlflow_databricks.registry_snapshot import RegistrySnapshot
 
 
 class TestMlflowModelUtils:
@@ -68,6 +75,35 @@ class TestMlflowModelUtils:
         )
         mock_getattr.assert_called_once()
 
+    @patch("hip_data_ml_utils.mlflow_databricks.mlflow_model_utils.getattr")
+    def test_mlflow_load_model_cache(self, mock_getattr) -> None:
+        """
+        test if mlflow_load_model() reuses the model of a cache
+
+        Parameters
+        ----------
+        mock_model_func:
+            mock patch getattr
+        """
+
+        mlflow_client = MagicMock()
+        mlflow_client.get_latest_versions.return_value = [MagicMock(version="2")]
+        model_cache = ModelCache(mlflow_client=mlflow_client)
+
+        for _ in range(2):
+            mlflow_load_model(
+                model_uri="models:/test_model/Production",
+                type_of_model="test",
+                model_func_dict={"test": "test"},
+                cache=model_cache,
+            )
+
+        mock_getattr.assert_called_once()
+        mock_getattr.return_value.load_model.assert_called_once_with(
+            model_uri="models:/test_model/2"
+        )
+        assert model_cache.stats()["hits"] == 1  # noqa: S101
+
     def test_mlflow_load_model_error(self) -> None:
         """
         test if mlflow_load_model() raises the right exception
@@ -80,9 +116,7 @@ class TestMlflowModelUtils:
                 model_func_dict={"test": "test"},
             )
 
-    @patch(
-        "hip_data_ml_utils.mlflow_databricks.mlflow_model_utils.mlflow.artifacts.download_artifacts"  # noqa: E501
-    )
+    @patch("mlflow.artifacts.download_artifacts")
     def test_mlflow_load_artifact_pkl_joblib_dict(
         self, mock_download_artifacts, mock_active_run, dummy_load_artifact
     ) -> None:
@@ -111,9 +145,7 @@ class TestMlflowModelUtils:
         )
         pd.testing.assert_frame_equal(expected_return, dummy_load_artifact)
 
-    @patch(
-        "hip_data_ml_utils.mlflow_databricks.mlflow_model_utils.mlflow.artifacts.download_artifacts"  # noqa: E501
-    )
+    @patch("mlflow.artifacts.download_artifacts")
     def test_mlflow_load_artifact_yaml(
         self, mock_download_artifacts, mock_active_run, dummy_load_artifact
     ) -> None:
@@ -141,6 +173,91 @@ class TestMlflowModelUtils:
         )
         assert isinstance(expected_return, dict)  # noqa: S101
 
+    @patch("mlflow.artifacts.download_artifacts")
+    def test_mlflow_load_artifact_cache(
+        self, mock_download_artifacts, dummy_load_artifact, tmp_path
+    ) -> None:
+        """
+        test if mlflow_load_artifact() reads a cached artifact from local disk
+
+        Parameters
+        ----------
+        mock_download_artifacts:
+            mock patch mlflow.artifacts.download_artifacts
+        dummy_load_artifact:
+            dummy load artifact dataframe
+        tmp_path:
+            temporary directory of the cache
+        """
+
+        mock_download_artifacts.side_effect = lambda artifact_uri, dst_path: (
+            shutil.copy("tests/unit_test.pkl", dst_path)
+        )
+        artifact_cache = ArtifactCache(cache_dir=str(tmp_path / "cache"))
+
+        for _ in range(2):
+            expected_return = pd.DataFrame(
+                mlflow_load_artifact(
+                    artifact_uri="runs:/test_run_id",
+                    artifact_name="unit_test.pkl",
+                    type_of_artifact="pkl",
+                    cache=artifact_cache,
+                ),
+                columns=["season"],
+            )
+            pd.testing.assert_frame_equal(expected_return, dummy_load_artifact)
+
+        mock_download_artifacts.assert_called_once()
+        assert artifact_cache.stats()["hits"] == 1  # noqa: S101
+
+    @patch("mlflow.artifacts.download_artifacts")
+    def test_mlflow_load_artifacts(
+        self, mock_download_artifacts, dummy_load_artifact
+    ) -> None:
+        """
+        test if mlflow_load_artifacts() loads every artifact of a uri
+
+        Parameters
+        ----------
+        mock_download_artifacts:
+            mock patch mlflow.artifacts.download_artifacts
+        dummy_load_artifact:
+            dummy load artifact dataframe
+        """
+
+        mock_download_artifacts.side_effect = lambda artifact_uri: {
+            "runs:/test_run_id/encoder.pkl": "tests/unit_test.pkl",
+            "runs:/test_run_id/features.yaml": (
+                "tests/hip_data_ml_utils/core/test_yaml.yaml"
+            ),
+        }[artifact_uri]
+
+        artifacts, timings = mlflow_load_artifacts(
+            artifact_uri="runs:/test_run_id",
+            artifacts=[("encoder.pkl", "pkl"), ("features.yaml", "yaml")],
+        )
+
+        pd.testing.assert_frame_equal(
+            pd.DataFrame(artifacts["encoder.pkl"], columns=["season"]),
+            dummy_load_artifact,
+        )
+        assert isinstance(artifacts["features.yaml"], dict)  # noqa: S101
+        assert set(timings["encoder.pkl"]) == {  # noqa: S101
+            "download_seconds",
+            "load_seconds",
+        }
+        assert mock_download_artifacts.call_count == 2  # noqa: S101
+
+        with pytest.raises(ValueError, match="Artifact type not supported"):
+            mlflow_load_artifacts(
+                artifact_uri="runs:/test_run_id", artifacts=[("test", "test")]
+            )
+        with pytest.raises(ValueError, match="Artifact names must be unique"):
+            mlflow_load_artifacts(
+                artifact_uri="runs:/test_run_id",
+                artifacts=[("encoder.pkl", "pkl"), ("encoder.pkl", "joblib")],
+            )
+
     def test_mlflow_load_artifact_error(self) -> None:
         """
         function test for mlflow_load_artifact to raise an error
@@ -151,7 +268,7 @@ class TestMlflowModelUtils:
                 artifact_uri="test", artifact_name="test", type_of_artifact="test"
             )
 
-    @patch("hip_data_ml_utils.mlflow_databricks.mlflow_model_utils.mlflow.get_run")
+    @patch("mlflow.get_run")
     def test_mlflow_get_model_metrics_dict(
         self, mock_mlflow_get_run, dummy_nested_double_callable_object
     ) -> None:
@@ -170,7 +287,7 @@ class TestMlflowModelUtils:
         expected_return = mlflow_get_model_metrics(run_id="test")
         assert expected_return == {"test": 1.0}  # noqa: S101
 
-    @patch("hip_data_ml_utils.mlflow_databricks.mlflow_model_utils.mlflow.get_run")
+    @patch("mlflow.get_run")
     def test_mlflow_get_model_metrics_float(
         self, mock_mlflow_get_run, dummy_nested_double_callable_object
     ) -> None:
@@ -362,6 +479,42 @@ class TestMlflowModelUtils:
             expected_return
             == "model is transitioned, and registered model description updated"
         )
+        mock_mlflow_client.search_model_versions.assert_called_once()
+
+    def test_mlflow_registry_snapshot(self, dummy_nested_callable_object) -> None:
+        """
+        test if the registry lookups reuse the versions of a registry snapshot
+
+        Parameters
+        ----------
+        dummy_nested_callable_object:
+            dummy nested callable object
+        """
+        mock_mlflow_client = MagicMock()
+        mock_mlflow_client.search_model_versions.return_value = [
+            dummy_nested_callable_object
+        ]
+        registry_snapshot = RegistrySnapshot(
+            mlflow_client=mock_mlflow_client, name="test"
+        )
+        common_args = {
+            "name": "test",
+            "mlflow_client": mock_mlflow_client,
+            "stage": "Staging",
+            "registry_snapshot": registry_snapshot,
+        }
+
+        assert mlflow_get_model_version(**common_args) == 1  # noqa: S101
+        assert (  # noqa: S101
+            mlflow_get_model_stage_description(**common_args) == "testing"
+        )
+        assert mlflow_get_both_registered_model_info_run_id(  # noqa: S101
+            run_id="test_123", **common_args
+        ) == ("test_123", dummy_nested_callable_object)
+        mock_mlflow_client.search_model_versions.assert_called_once()
+
+        with pytest.raises(ValueError, match="registry_snapshot is of 'test'"):
+            mlflow_get_model_version(**{**common_args, "name": "other"})
 
     @patch(
         "hip_data_ml_utils.mlflow_databricks.mlflow_model_utils.mlflow_promote_model"  # noqa: E501
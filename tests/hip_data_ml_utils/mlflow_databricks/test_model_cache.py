@@ -0,0 +1,165 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from hip_data_ml_utils.mlflow_databricks.model_cache import estimate_model_size
+from hip_data_ml_utils.mlflow_databricks.model_cache import ModelCache
+
+
+class TestModelCache:
+    """test class for the in-memory model cache"""
+
+    @staticmethod
+    def get_mlflow_client(version: str = "3") -> MagicMock:
+        mlflow_client = MagicMock()
+        mlflow_client.get_latest_versions.return_value = [MagicMock(version=version)]
+        mlflow_client.get_model_version_by_alias.return_value = MagicMock(version="5")
+        return mlflow_client
+
+    def test_resolve_model_uri(self) -> None:
+        """
+        test function for resolving stage and alias uris to a version
+
+        Returns
+        -------
+        assert
+            stage and alias uris are resolved to a model version
+            version and run uris are returned as they are
+        """
+
+        mlflow_client = self.get_mlflow_client()
+        test_cache = ModelCache(mlflow_client=mlflow_client)
+
+        assert (  # noqa: S101
+            test_cache.resolve_model_uri("models:/test_model/Production")
+            == "models:/test_model/3"
+        )
+        mlflow_client.get_latest_versions.assert_called_once_with(
+            "test_model", stages=["Production"]
+        )
+        assert (  # noqa: S101
+            test_cache.resolve_model_uri("models:/test_model@champion")
+            == "models:/test_model/5"
+        )
+        assert (  # noqa: S101
+            test_cache.resolve_model_uri("models:/test_model/2")
+            == "models:/test_model/2"
+        )
+        assert (  # noqa: S101
+            test_cache.resolve_model_uri("runs:/abc/model") == "runs:/abc/model"
+        )
+
+        mlflow_client.get_latest_versions.return_value = []
+        with pytest.raises(ValueError, match="There is no model version"):
+            test_cache.resolve_model_uri("models:/test_model/Staging")
+
+    def test_load(self) -> None:
+        """
+        test function for loading a model through the cache
+
+        Returns
+        -------
+        assert
+            model is loaded once per resolved version and variant
+            a new version of the stage is loaded on the next call
+            models are not measured without max_size_bytes
+            no loading lock is left behind
+        """
+
+        mlflow_client = self.get_mlflow_client()
+        size_of = MagicMock(return_value=10)
+        test_cache = ModelCache(mlflow_client=mlflow_client, size_of=size_of)
+        load_model = MagicMock(side_effect=lambda uri: {"uri": uri})
+
+        first = test_cache.load("models:/test_model/Production", load_model)
+        second = test_cache.load("models:/test_model/Production", load_model)
+        test_cache.load("models:/test_model/Production", load_model, variant="cuda")
+
+        assert first is second  # noqa: S101
+        assert first == {"uri": "models:/test_model/3"}  # noqa: S101
+        assert load_model.call_count == 2  # noqa: S101
+
+        mlflow_client.get_latest_versions.return_value = [MagicMock(version="4")]
+        promoted = test_cache.load("models:/test_model/Production", load_model)
+
+        assert promoted == {"uri": "models:/test_model/4"}  # noqa: S101
+        assert test_cache.stats()["hits"] == 1  # noqa: S101
+        assert test_cache.stats()["misses"] == 3  # noqa: S101
+        assert test_cache.stats()["load_seconds"] > 0  # noqa: S101
+        assert test_cache.stats()["size_bytes"] == 0  # noqa: S101
+        size_of.assert_not_called()
+        assert test_cache._loading_locks == {}  # noqa: S101
+
+    def test_evict(self) -> None:
+        """
+        test function for evicting the least recently used models
+
+        Returns
+        -------
+        assert
+            models over max_models or max_size_bytes are evicted
+            the most recently loaded model is kept even if over max_size_bytes
+        """
+
+        test_cache = ModelCache(
+            max_models=2, max_size_bytes=100, size_of=lambda model: 10
+        )
+        load_model = MagicMock(side_effect=lambda uri: uri)
+
+        test_cache.load("runs:/a/model", load_model)
+        test_cache.load("runs:/b/model", load_model)
+        test_cache.load("runs:/a/model", load_model)
+        test_cache.load("runs:/c/model", load_model)
+
+        assert test_cache.stats()["entries"] == 2  # noqa: S101
+        assert test_cache.stats()["size_bytes"] == 20  # noqa: S101
+
+        test_cache.load("runs:/a/model", load_model)
+        assert test_cache.stats()["hits"] == 2  # noqa: S101
+
+        test_cache.max_size_bytes = 5
+        test_cache.load("runs:/d/model", load_model)
+
+        assert test_cache.stats()["entries"] == 1  # noqa: S101
+        assert test_cache.stats()["hits"] == 2  # noqa: S101
+
+    def test_invalidate(self) -> None:
+        """
+        test function for invalidating cached models
+
+        Returns
+        -------
+        assert
+            every version of a registered model is removed
+            other models are kept until everything is invalidated
+        """
+
+        test_cache = ModelCache(mlflow_client=self.get_mlflow_client())
+        load_model = MagicMock(side_effect=lambda uri: uri)
+
+        test_cache.load("models:/test_model/Production", load_model)
+        test_cache.load("models:/test_model/1", load_model)
+        test_cache.load("runs:/abc/model", load_model)
+
+        test_cache.invalidate("models:/test_model/Production")
+        assert test_cache.stats()["entries"] == 1  # noqa: S101
+
+        test_cache.invalidate()
+        assert test_cache.stats()["entries"] == 0  # noqa: S101
+
+        with pytest.raises(ValueError, match="max_models"):
+            ModelCache(max_models=0)
+
+    def test_estimate_model_size(self) -> None:
+        """
+        test function for estimating the memory of a model
+
+        Returns
+        -------
+        assert
+            picklable models are measured from their pickle
+            unpicklable models are 0
+        """
+
+        assert estimate_model_size(list(range(1000))) > 1000  # noqa: S101
+        assert estimate_model_size(lambda x: x) == 0  # noqa: S101
@@ -0,0 +1,80 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from hip_data_ml_utils.mlflow_databricks.registry_snapshot import RegistrySnapshot
+
+
+def get_mlflow_client() -> MagicMock:
+    mlflow_client = MagicMock()
+    mlflow_client.search_model_versions.return_value = [
+        MagicMock(version="3", current_stage="Production", run_id="run_3"),
+        MagicMock(version="2", current_stage="Archived", run_id="run_2"),
+        MagicMock(version="1", current_stage="Archived", run_id="run_1"),
+    ]
+    return mlflow_client
+
+
+class TestRegistrySnapshot:
+    """test class for the registry snapshot index"""
+
+    def test_lookups(self) -> None:
+        """
+        test function for looking up versions by stage, run_id and version
+
+        Returns
+        -------
+        assert
+            versions are listed once for every lookup
+            versions are indexed by stage, run_id and version number
+        """
+
+        mlflow_client = get_mlflow_client()
+        test_snapshot = RegistrySnapshot(mlflow_client=mlflow_client, name="test")
+
+        assert [  # noqa: S101
+            model_version.version
+            for model_version in test_snapshot.get_stage_versions("Archived")
+        ] == ["2", "1"]
+        assert test_snapshot.get_stage_versions("Staging") == []  # noqa: S101
+        assert test_snapshot.get_by_run_id("run_3").version == "3"  # noqa: S101
+        assert test_snapshot.get_by_run_id("missing") is None  # noqa: S101
+        assert test_snapshot.get_by_version(1).run_id == "run_1"  # noqa: S101
+        assert len(test_snapshot.versions) == 3  # noqa: S101
+
+        mlflow_client.search_model_versions.assert_called_once_with("name='test'")
+        assert test_snapshot.fetches == 1  # noqa: S101
+
+    @patch("hip_data_ml_utils.mlflow_databricks.registry_snapshot.time.monotonic")
+    def test_ttl(self, mock_monotonic) -> None:
+        """
+        test function for listing the versions again after the ttl
+
+        Parameters
+        ----------
+        mock_monotonic:
+            mock patch time.monotonic
+
+        Returns
+        -------
+        assert
+            versions are listed again once the ttl is over or after invalidate
+        """
+
+        mlflow_client = get_mlflow_client()
+        test_snapshot = RegistrySnapshot(
+            mlflow_client=mlflow_client, name="test", ttl_seconds=60
+        )
+
+        mock_monotonic.return_value = 0
+        test_snapshot.get_by_version(3)
+        mock_monotonic.return_value = 59
+        test_snapshot.get_by_version(3)
+        assert test_snapshot.fetches == 1  # noqa: S101
+
+        mock_monotonic.return_value = 60
+        test_snapshot.get_by_version(3)
+        assert test_snapshot.fetches == 2  # noqa: S101
+
+        test_snapshot.invalidate()
+        test_snapshot.get_by_version(3)
+        assert test_snapshot.fetches == 3  # noqa: S101
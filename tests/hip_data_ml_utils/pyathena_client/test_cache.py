@@ -0,0 +1,141 @@
+import os
+import time
+
+import pandas as pd
+
+from hip_data_ml_utils.pyathena_client.cache import QueryResultCache
+
+
+class TestQueryResultCache:
+    """test class for the local query result cache"""
+
+    def test_make_key(self) -> None:
+        """
+        test function to create cache keys
+
+        Returns
+        -------
+        assert
+            whitespace and trailing semicolons do not change the key
+            whitespace inside quoted literals changes the key
+            connection identity changes the key
+        """
+
+        key = QueryResultCache.make_key("SELECT *\n  FROM dev.test;", "conn")
+
+        assert key == QueryResultCache.make_key(  # noqa: S101
+            "SELECT * FROM dev.test", "conn"
+        )
+        assert key != QueryResultCache.make_key(  # noqa: S101
+            "SELECT * FROM dev.test", "other_conn"
+        )
+        assert QueryResultCache.make_key(  # noqa: S101
+            "SELECT * FROM dev.test\nWHERE n = 'it''s  a'", "conn"
+        ) == QueryResultCache.make_key(
+            "SELECT * FROM dev.test WHERE n = 'it''s  a'", "conn"
+        )
+        assert QueryResultCache.make_key(  # noqa: S101
+            "SELECT * FROM dev.test WHERE n = 'a  b'", "conn"
+        ) != QueryResultCache.make_key("SELECT * FROM dev.test WHERE n = 'a b'", "conn")
+
+    def test_get_put(self, tmp_path) -> None:
+        """
+        test function to store and get a dataframe from the cache
+
+        Parameters
+        ----------
+        tmp_path
+            temporary directory of the cache
+
+        Returns
+        -------
+        assert
+            missing key is a miss, stored key is a hit with the same dataframe
+        """
+
+        test_cache = QueryResultCache(cache_dir=str(tmp_path))
+        dummy_df = pd.DataFrame({"a": [1, 2], "b": [0.5, 1.5]})
+
+        assert test_cache.get("key") is None  # noqa: S101
+        test_cache.put("key", dummy_df)
+        pd.testing.assert_frame_equal(test_cache.get("key"), dummy_df)
+        assert test_cache.stats()["hits"] == 1  # noqa: S101
+        assert test_cache.stats()["misses"] == 1  # noqa: S101
+        assert test_cache.stats()["entries"] == 1  # noqa: S101
+
+    def test_ttl(self, tmp_path) -> None:
+        """
+        test function for expired entries in the cache
+
+        Parameters
+        ----------
+        tmp_path
+            temporary directory of the cache
+
+        Returns
+        -------
+        assert
+            expired entry is a miss and is removed
+        """
+
+        test_cache = QueryResultCache(cache_dir=str(tmp_path))
+        test_cache.put("key", pd.DataFrame({"a": [1]}), ttl_seconds=-1)
+
+        assert test_cache.get("key") is None  # noqa: S101
+        assert test_cache.stats()["entries"] == 0  # noqa: S101
+
+    def test_lru_eviction(self, tmp_path) -> None:
+        """
+        test function for evicting the least recently used entries
+
+        Parameters
+        ----------
+        tmp_path
+            temporary directory of the cache
+
+        Returns
+        -------
+        assert
+            least recently used entry is evicted once over the size cap
+        """
+
+        dummy_df = pd.DataFrame({"a": range(100)})
+        test_cache = QueryResultCache(cache_dir=str(tmp_path))
+        test_cache.put("first", dummy_df)
+        test_cache.put("second", dummy_df)
+        entry_size = test_cache.stats()["size_bytes"] // 2
+
+        # make first the most recently used entry
+        past = time.time() - 100
+        os.utime(tmp_path / "second.parquet", (past, past))
+        os.utime(tmp_path / "first.parquet", (past, past))
+        test_cache.get("first")
+
+        test_cache.max_size_bytes = entry_size * 2
+        test_cache.put("third", dummy_df)
+
+        assert test_cache.get("second") is None  # noqa: S101
+        assert test_cache.get("first") is not None  # noqa: S101
+        assert test_cache.get("third") is not None  # noqa: S101
+
+    def test_invalidate(self, tmp_path) -> None:
+        """
+        test function to invalidate every entry of the cache
+
+        Parameters
+        ----------
+        tmp_path
+            temporary directory of the cache
+
+        Returns
+        -------
+        assert
+            cache is empty
+        """
+
+        test_cache = QueryResultCache(cache_dir=str(tmp_path))
+        test_cache.put("first", pd.DataFrame({"a": [1]}))
+        test_cache.put("second", pd.DataFrame({"a": [1]}))
+        test_cache.invalidate()
+
+        assert test_cache.stats()["entries"] == 0  # noqa: S101
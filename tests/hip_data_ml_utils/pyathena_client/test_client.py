@@ -1,11 +1,31 @@
+import collections
+import datetime
+import re
+import shutil
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import ANY
+from unittest.mock import MagicMock
 from unittest.mock import patch
 
+import boto3
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pyathena
+import pytest
+from moto import mock_s3
+from pyathena.arrow.cursor import ArrowCursor
+from pyathena.model import AthenaQueryExecution
+from pyathena.pandas.async_cursor import AsyncPandasCursor
+from pyathena.result_set import AthenaResultSet
 
+from hip_data_ml_utils.pyathena_client.cache import QueryResultCache
 from hip_data_ml_utils.pyathena_client.client import PyAthenaClient
 
 TEST_SQL_FILE = "test.sql"
+TEST_YAML_FILE = "tests/hip_data_ml_utils/core/test_yaml.yaml"
+TEST_PROJECTION_YAML_FILE = "tests/hip_data_ml_utils/core/test_yaml_projection.yaml"
 
 
 class TestPyAthenaClient:
@@ -245,3 +265,1149 @@ class TestPyAthenaClient:
         assert isinstance(test, pd.DataFrame)  # noqa: S101
         assert test[0].dtype == int  # noqa: S101
         assert test[1].dtype == float  # noqa: S101
+
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_iter_query_as_pandas(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+    ):
+        """
+        test function for querying athena in chunks
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            every chunk is a dataframe with numpy datatypes
+        assert
+            chunksize is passed to the cursor and the cursor is closed
+        """
+
+        dummy_chunks = [
+            pd.concat(
+                [
+                    pd.Series([1, 2], dtype=pd.Int64Dtype()),
+                    pd.Series([1.0, 2.0], dtype=pd.Float64Dtype()),
+                ],
+                axis=1,
+            ),
+            pd.concat(
+                [
+                    pd.Series([3, None], dtype=pd.Int64Dtype()),
+                    pd.Series([3.0, 4.0], dtype=pd.Float64Dtype()),
+                ],
+                axis=1,
+            ),
+        ]
+
+        mocked_cursor = mocked_pyathena.cursor.return_value
+        mocked_cursor.execute.return_value.as_pandas.return_value = iter(dummy_chunks)
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        test = list(
+            test_client.iter_query_as_pandas(final_query="testquery", chunksize=2)
+        )
+
+        mocked_cursor.execute.assert_called_once_with("testquery", chunksize=2)
+        mocked_cursor.close.assert_called_once()
+        assert len(test) == 2  # noqa: S101
+        assert test[0][0].dtype == int  # noqa: S101
+        assert test[1][0].dtype == float  # noqa: S101
+        assert test[1][1].dtype == float  # noqa: S101
+
+    def test_iter_query_as_pandas_error(
+        self,
+        aws_credentials,
+    ):
+        """
+        test function for invalid chunksize when querying athena in chunks
+        Parameters
+        ----------
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            raises ValueError for non positive chunksize
+        """
+
+        test_client = PyAthenaClient()
+
+        with pytest.raises(ValueError, match="chunksize must be a positive integer"):
+            next(test_client.iter_query_as_pandas(final_query="testquery", chunksize=0))
+
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_query_as_arrow(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+    ):
+        """
+        test function for querying athena into pyarrow
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            return value is a pyarrow table with the arrow cursor
+        assert
+            return value is a pandas dataframe with pyarrow dtypes if to_pandas
+        """
+
+        dummy_table = pa.table({"int_col": pa.array([1, None], type=pa.int64())})
+
+        mocked_cursor = mocked_pyathena.cursor.return_value
+        mocked_cursor.execute.return_value.as_arrow.return_value = dummy_table
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        test = test_client.query_as_arrow(final_query="testquery")
+        test_pandas = test_client.query_as_arrow(
+            final_query="testquery", to_pandas=True
+        )
+
+        mocked_pyathena.cursor.assert_called_with(
+            cursor=ArrowCursor, unload=False, s3_staging_dir=ANY
+        )
+        assert isinstance(test, pa.Table)  # noqa: S101
+        assert isinstance(test_pandas, pd.DataFrame)  # noqa: S101
+        assert test_pandas["int_col"].dtype == pd.ArrowDtype(pa.int64())  # noqa: S101
+
+    def test_query_as_arrow_error(
+        self,
+        aws_credentials,
+    ):
+        """
+        test function for invalid dtype backend when querying athena into pyarrow
+        Parameters
+        ----------
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            raises ValueError for unknown dtype backend
+        """
+
+        test_client = PyAthenaClient()
+
+        with pytest.raises(ValueError, match="dtype_backend can only be one of"):
+            test_client.query_as_arrow(
+                final_query="testquery", to_pandas=True, dtype_backend="polars"
+            )
+
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_query_as_pandas_cache(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+        tmp_path,
+    ):
+        """
+        test function for querying athena with the result cache
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+        tmp_path
+            temporary directory of the cache
+
+        Returns
+        -------
+        assert
+            repeated query is read from the cache
+        assert
+            use_cache False bypasses the cache
+        """
+
+        dummy_df = pd.DataFrame({"a": pd.Series([1, 2], dtype=pd.Int64Dtype())})
+        mocked_execute = mocked_pyathena.cursor.return_value.execute
+        mocked_execute.return_value.as_pandas.side_effect = lambda: dummy_df.copy()
+
+        test_client = PyAthenaClient(cache=QueryResultCache(cache_dir=str(tmp_path)))
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        first = test_client.query_as_pandas(final_query="SELECT a FROM t")
+        second = test_client.query_as_pandas(final_query="SELECT a\nFROM t;")
+        test_client.query_as_pandas(final_query="SELECT a FROM t", use_cache=False)
+
+        pd.testing.assert_frame_equal(first, second)
+        assert mocked_execute.call_count == 2  # noqa: S101
+        assert test_client.cache.stats()["hits"] == 1  # noqa: S101
+
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_query_many(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+    ):
+        """
+        test function for querying many athena queries concurrently
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            dataframes are returned in the order of the queries
+        assert
+            async cursor is used with the max concurrency as workers
+        """
+
+        def execute(query):
+            future = Future()
+            future.set_result(MagicMock())
+            future.result().as_pandas.return_value = pd.DataFrame({"query": [query]})
+            return f"id_{query}", future
+
+        mocked_cursor = mocked_pyathena.cursor.return_value
+        mocked_cursor.execute.side_effect = execute
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        queries = [f"query_{i}" for i in range(5)]
+        test = test_client.query_many(queries=queries, max_concurrency=2)
+
+        mocked_pyathena.cursor.assert_called_once_with(
+            cursor=AsyncPandasCursor, max_workers=2, s3_staging_dir=ANY
+        )
+        assert [df["query"][0] for df in test] == queries  # noqa: S101
+        mocked_cursor.close.assert_called_once()
+
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_query_many_error(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+    ):
+        """
+        test function for a failing query when querying many athena queries
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            error of the failing query is raised
+        assert
+            queries still running are cancelled
+        """
+
+        failed_future = Future()
+        failed_future.set_exception(pyathena.error.OperationalError("FAILED"))
+        running_future = Future()
+
+        mocked_cursor = mocked_pyathena.cursor.return_value
+        mocked_cursor.execute.side_effect = [
+            ("id_failed", failed_future),
+            ("id_running", running_future),
+        ]
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        with pytest.raises(pyathena.error.OperationalError, match="FAILED"):
+            test_client.query_many(queries=["failed", "running"], max_concurrency=2)
+
+        mocked_cursor.cancel.assert_called_once_with("id_running")
+
+    @patch("hip_data_ml_utils.pyathena_client.client.connect")
+    @patch("hip_data_ml_utils.pyathena_client.client.datetime")
+    def test_lazy_connect_and_staging_dir_rotation(
+        self,
+        mocked_datetime,
+        mocked_connect,
+        aws_credentials,
+    ):
+        """
+        test function for lazy connection and daily staging dir rotation
+        Parameters
+        ----------
+        mocked_datetime
+            mocked datetime to move to the next day
+        mocked_connect
+            mocked pyathena connect
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            no connection is created until the first query
+        assert
+            query after midnight is staged under the new date on the same connection
+        """
+
+        mocked_datetime.datetime.now.return_value = datetime.datetime(2023, 1, 1, 23)
+        test_client = PyAthenaClient()
+
+        mocked_connect.assert_not_called()
+
+        test_client.drop_table(table_name="test_table", database="whatever")
+        mocked_datetime.datetime.now.return_value = datetime.datetime(2023, 1, 2, 1)
+        test_client.drop_table(table_name="test_table", database="whatever")
+
+        mocked_connect.assert_called_once()
+        staging_dirs = [
+            call.kwargs["s3_staging_dir"]
+            for call in mocked_connect.return_value.cursor.call_args_list
+        ]
+        assert staging_dirs == [  # noqa: S101
+            "s3://au-com-dummy/athena_queries/query_2023-01-01",
+            "s3://au-com-dummy/athena_queries/query_2023-01-02",
+        ]
+
+    @patch("hip_data_ml_utils.pyathena_client.client.connect")
+    def test_pool_threads(
+        self,
+        mocked_connect,
+        aws_credentials,
+    ):
+        """
+        test function for sharing one client across threads
+        Parameters
+        ----------
+        mocked_connect
+            mocked pyathena connect
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            no more connections than the pool size are created
+        """
+
+        mocked_connect.side_effect = lambda **kwargs: MagicMock()
+        test_client = PyAthenaClient(pool_size=2)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(
+                executor.map(
+                    lambda i: test_client.drop_table(
+                        table_name=f"table_{i}", database="whatever"
+                    ),
+                    range(32),
+                )
+            )
+
+        assert 1 <= mocked_connect.call_count <= 2  # noqa: S101
+
+    def test_staging_dir_rotation_error(
+        self,
+        aws_credentials,
+    ):
+        """
+        test function for invalid staging dir rotation
+        Parameters
+        ----------
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            raises ValueError for unknown staging dir rotation
+        """
+
+        with pytest.raises(ValueError, match="staging_dir_rotation can only be one"):
+            PyAthenaClient(staging_dir_rotation="hourly")
+
+    @mock_s3
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_add_new_partitions(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+    ):
+        """
+        test function for adding only the new partitions of a table
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            only partitions in s3 that are not registered are added
+        """
+
+        s3_client = boto3.client("s3", region_name="ap-southeast-2")
+        s3_client.create_bucket(
+            Bucket="testing-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "ap-southeast-2"},
+        )
+        for date_created in ["20230101", "20230102", "20230103"]:
+            s3_client.put_object(
+                Bucket="testing-bucket",
+                Key=f"testing/inference_date_created={date_created}/part-0.parquet",
+                Body=b"",
+            )
+
+        mocked_cursor = mocked_pyathena.cursor.return_value
+        mocked_cursor.execute.return_value.fetchall.return_value = [
+            ("inference_date_created=20230101",)
+        ]
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        test = test_client.add_new_partitions(
+            yaml_schema_file_path=TEST_YAML_FILE, batch_size=1
+        )
+
+        executed_queries = [
+            call.args[0] for call in mocked_cursor.execute.call_args_list
+        ]
+        assert test == ["20230102", "20230103"]  # noqa: S101
+        assert executed_queries[0] == "SHOW PARTITIONS dev.test_table"  # noqa: S101
+        assert len(executed_queries) == 3  # noqa: S101
+        assert "inference_date_created='20230102'" in executed_queries[1]  # noqa: S101
+
+    @patch("hip_data_ml_utils.pyathena_client.client.read_sql")
+    @patch("hip_data_ml_utils.pyathena_client.client.format_sql_create_schema")
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_create_msck_repair_table_incremental(
+        self,
+        mocked_pyathena,
+        mocked_create_schema,
+        mocked_read_sql,
+        aws_credentials,
+    ):
+        """
+        test function for creating athena table with incremental repair
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        mocked_create_schema
+            mocked create schema sql function
+        mocked_read_sql
+            mocked read sql function
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            return value is 0
+        assert
+            msck repair is not run, new partitions are added instead
+        """
+
+        mocked_create_schema.return_value = ("query", "table_test_name")
+        mocked_read_sql.return_value = "query"
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        with patch.object(test_client, "add_new_partitions") as mocked_add:
+            test = test_client.create_msck_repair_table(
+                create_raw_query=TEST_SQL_FILE,
+                repair_raw_query=TEST_SQL_FILE,
+                yaml_schema_file_path="test.yaml",
+                repair_mode="incremental",
+            )
+
+        assert test == 0  # noqa: S101
+        mocked_read_sql.assert_called_once_with(file_path=TEST_SQL_FILE)
+        mocked_pyathena.cursor.return_value.execute.assert_called_once_with("query")
+        mocked_add.assert_called_once_with(yaml_schema_file_path="test.yaml")
+
+    @patch("hip_data_ml_utils.pyathena_client.client.read_sql")
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_create_msck_repair_table_projection(
+        self,
+        mocked_pyathena,
+        mocked_read_sql,
+        aws_credentials,
+    ):
+        """
+        test function for creating athena table with partition projection
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        mocked_read_sql
+            mocked read sql function
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            return value is 0
+        assert
+            only the create table query runs, the table is not repaired
+        """
+
+        mocked_read_sql.return_value = (
+            'CREATE TABLE {table_name} tblproperties ("a"="b"{partition_projection})'
+        )
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        test = test_client.create_msck_repair_table(
+            create_raw_query=TEST_SQL_FILE,
+            repair_raw_query=TEST_SQL_FILE,
+            yaml_schema_file_path=TEST_PROJECTION_YAML_FILE,
+        )
+
+        mocked_execute = mocked_pyathena.cursor.return_value.execute
+        assert test == 0  # noqa: S101
+        mocked_execute.assert_called_once()
+        assert '"projection.enabled"="true"' in (  # noqa: S101
+            mocked_execute.call_args.args[0]
+        )
+
+        # a template without the placeholder does not create a projected table
+        mocked_read_sql.return_value = "CREATE TABLE {table_name}"
+        mocked_execute.reset_mock()
+
+        test = test_client.create_msck_repair_table(
+            create_raw_query=TEST_SQL_FILE,
+            repair_raw_query=TEST_SQL_FILE,
+            yaml_schema_file_path=TEST_PROJECTION_YAML_FILE,
+        )
+
+        assert test == 0  # noqa: S101
+        assert mocked_execute.call_count == 2  # noqa: S101
+
+    @patch("hip_data_ml_utils.pyathena_client.client.read_sql")
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_deploy_schemas(
+        self,
+        mocked_pyathena,
+        mocked_read_sql,
+        aws_credentials,
+        tmp_path,
+    ):
+        """
+        test function for deploying a directory of yaml schemas
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        mocked_read_sql
+            mocked read sql function
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+        tmp_path
+            temporary directory of yaml schemas
+
+        Returns
+        -------
+        assert
+            sql templates are read once
+        assert
+            every yaml schema is reported, a broken one as failure
+        """
+
+        mocked_read_sql.side_effect = [
+            "CREATE TABLE {table_name}",
+            "REPAIR {table_name}",
+        ]
+        shutil.copy(TEST_YAML_FILE, tmp_path / "a_table.yaml")
+        (tmp_path / "b_broken.yaml").write_text("schema: dev\n")
+        (tmp_path / "readme.md").write_text("not a schema")
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        test = test_client.deploy_schemas(
+            create_raw_query=TEST_SQL_FILE,
+            repair_raw_query=TEST_SQL_FILE,
+            yaml_schema_dir=str(tmp_path),
+            max_concurrency=2,
+        )
+
+        assert mocked_read_sql.call_count == 2  # noqa: S101
+        assert [report["status"] for report in test] == [  # noqa: S101
+            "success",
+            "failure",
+        ]
+        assert test[0]["table_name"] == "dev.test_table"  # noqa: S101
+        assert "KeyError" in test[1]["error"]  # noqa: S101
+        assert all(report["seconds"] >= 0 for report in test)  # noqa: S101
+        mocked_pyathena.cursor.return_value.execute.assert_any_call(
+            "REPAIR dev.test_table"
+        )
+
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_query_stats(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+        caplog,
+    ):
+        """
+        test function for recording the stats of a query
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+        caplog
+            captured logs
+
+        Returns
+        -------
+        assert
+            stats of the query are kept and passed to the callback
+        assert
+            slow query is logged with its sql
+        """
+
+        mocked_result = mocked_pyathena.cursor.return_value.execute.return_value
+        mocked_result.as_pandas.return_value = pd.DataFrame(
+            {"a": pd.Series([1, 2, 3], dtype=pd.Int64Dtype())}
+        )
+        mocked_result.query_id = "test_id"
+        mocked_result.query_queue_time_in_millis = 1500
+        mocked_result.engine_execution_time_in_millis = 2000
+        mocked_result.total_execution_time_in_millis = 0
+        mocked_result.data_scanned_in_bytes = 1024
+        mocked_callback = MagicMock()
+
+        test_client = PyAthenaClient(
+            on_query_stats=mocked_callback, slow_query_seconds=0, stats_history=1
+        )
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        test_client.query_as_pandas(final_query="SELECT 1")
+        test_client.query_as_pandas(final_query="SELECT a FROM t")
+
+        assert len(test_client.query_stats) == 1  # noqa: S101
+        test = test_client.query_stats[0]
+        mocked_callback.assert_called_with(test)
+        assert test["query_id"] == "test_id"  # noqa: S101
+        assert test["queue_seconds"] == 1.5  # noqa: S101
+        assert test["engine_execution_seconds"] == 2.0  # noqa: S101
+        assert test["data_scanned_bytes"] == 1024  # noqa: S101
+        assert test["rows"] == 3  # noqa: S101
+        assert test["frame_bytes"] >= 24  # noqa: S101
+        assert test["fetch_seconds"] >= 0  # noqa: S101
+        assert test["total_seconds"] >= test["conversion_seconds"]  # noqa: S101
+        assert test["query"] == "SELECT a FROM t"  # noqa: S101
+        assert "Slow athena query test_id" in caplog.text  # noqa: S101
+        assert "SELECT a FROM t" in caplog.text  # noqa: S101
+
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_query_stats_closed_result_set(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+    ):
+        """
+        test function for recording the stats of a query whose result set is
+        closed with the cursor
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            stats are read before the cursor closes the result set
+        """
+
+        result_set = AthenaResultSet.__new__(AthenaResultSet)
+        result_set._rows = collections.deque()
+        result_set._query_execution = AthenaQueryExecution(
+            {
+                "QueryExecution": {
+                    "QueryExecutionId": "test_id",
+                    "Query": "SELECT 1",
+                    "Status": {"State": "SUCCEEDED"},
+                    "Statistics": {
+                        "DataScannedInBytes": 1024,
+                        "EngineExecutionTimeInMillis": 2000,
+                        "QueryQueueTimeInMillis": 1500,
+                        "TotalExecutionTimeInMillis": 0,
+                    },
+                }
+            }
+        )
+        result_set.as_pandas = MagicMock(
+            return_value=pd.DataFrame({"a": pd.Series([1], dtype=pd.Int64Dtype())})
+        )
+        mocked_cursor = mocked_pyathena.cursor.return_value
+        mocked_cursor.execute.return_value = result_set
+        mocked_cursor.close.side_effect = result_set.close
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        test_client.query_as_pandas(final_query="SELECT 1")
+        test = test_client.query_stats[-1]
+
+        assert result_set.query_id is None  # noqa: S101
+        assert test["query_id"] == "test_id"  # noqa: S101
+        assert test["queue_seconds"] == 1.5  # noqa: S101
+        assert test["engine_execution_seconds"] == 2.0  # noqa: S101
+        assert test["data_scanned_bytes"] == 1024  # noqa: S101
+        assert test["fetch_seconds"] >= 0  # noqa: S101
+
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_query_date_range(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+    ):
+        """
+        test function for querying a date range as concurrent sub-queries
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            every slice is queried once and the failed slice is retried
+        assert
+            dataframes are assembled in date order
+        """
+
+        attempts = {}
+
+        def execute(query):
+            attempts[query] = attempts.get(query, 0) + 1
+            result = MagicMock()
+            result.state = (
+                "FAILED"
+                if query.startswith("20230103") and attempts[query] == 1
+                else "SUCCEEDED"
+            )
+            result.as_pandas.return_value = pd.DataFrame({"query": [query]})
+            future = Future()
+            future.set_result(result)
+            return f"id_{query}", future
+
+        mocked_pyathena.cursor.return_value.execute.side_effect = execute
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        test = test_client.query_date_range(
+            query_template="{start_date_key}-{end_date_key}",
+            start_date_key=20230101,
+            end_date_key=20230105,
+            slice_days=2,
+            max_concurrency=2,
+        )
+
+        assert attempts == {  # noqa: S101
+            "20230101-20230102": 1,
+            "20230103-20230104": 2,
+            "20230105-20230105": 1,
+        }
+        assert test["query"].tolist() == [  # noqa: S101
+            "20230101-20230102",
+            "20230103-20230104",
+            "20230105-20230105",
+        ]
+
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_query_date_range_error(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+    ):
+        """
+        test function for a slice failing every retry of a date range query
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            error of the slice is raised after the retries
+        """
+
+        def execute(query):
+            result = MagicMock()
+            result.state = "FAILED"
+            result.state_change_reason = "FAILED"
+            future = Future()
+            future.set_result(result)
+            return f"id_{query}", future
+
+        mocked_cursor = mocked_pyathena.cursor.return_value
+        mocked_cursor.execute.side_effect = execute
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        with pytest.raises(pyathena.error.OperationalError, match="FAILED"):
+            test_client.query_date_range(
+                query_template="{start_date_key}",
+                start_date_key=20230101,
+                end_date_key=20230101,
+                max_retries=1,
+            )
+
+        assert mocked_cursor.execute.call_count == 2  # noqa: S101
+
+    @mock_s3
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_query_unload(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+    ):
+        """
+        test function for unloading a query to parquet files
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            parquet files are read back in order as a table or record batches
+        assert
+            scratch prefix is deleted once the files are read
+        assert
+            scratch prefix of an iterator that is never started is deleted
+            once the iterator is garbage collected
+        """
+
+        s3_client = boto3.client("s3", region_name="ap-southeast-2")
+        s3_client.create_bucket(
+            Bucket="au-com-dummy",
+            CreateBucketConfiguration={"LocationConstraint": "ap-southeast-2"},
+        )
+
+        def execute(query):
+            bucket, prefix = re.search(r"TO 's3://([^/]+)/(.+)'", query).groups()
+            for part in range(3):
+                buffer = pa.BufferOutputStream()
+                pq.write_table(pa.table({"a": [part, part]}), buffer)
+                s3_client.put_object(
+                    Bucket=bucket,
+                    Key=f"{prefix}part-{part}",
+                    Body=buffer.getvalue().to_pybytes(),
+                )
+            return MagicMock()
+
+        mocked_cursor = mocked_pyathena.cursor.return_value
+        mocked_cursor.execute.side_effect = execute
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        test_table = test_client.query_unload(final_query="SELECT a FROM t")
+        test_batches = test_client.query_unload(
+            final_query="SELECT a FROM t", as_iterator=True, max_workers=1
+        )
+        test_batches = list(test_batches)
+
+        assert mocked_cursor.execute.call_args.args[0].startswith(  # noqa: S101
+            "UNLOAD (SELECT a FROM t)\nTO 's3://au-com-dummy/athena_queries/unload/"
+        )
+        assert test_table.column("a").to_pylist() == [0, 0, 1, 1, 2, 2]  # noqa: S101
+        assert [  # noqa: S101
+            value for batch in test_batches for value in batch.column(0).to_pylist()
+        ] == [0, 0, 1, 1, 2, 2]
+        assert len(test_client.query_stats) == 2  # noqa: S101
+        assert test_client.query_stats[-1]["rows"] == 6  # noqa: S101
+        assert "Contents" not in s3_client.list_objects_v2(  # noqa: S101
+            Bucket="au-com-dummy"
+        )
+
+        test_batches = test_client.query_unload(
+            final_query="SELECT a FROM t", as_iterator=True
+        )
+        assert "Contents" in s3_client.list_objects_v2(  # noqa: S101
+            Bucket="au-com-dummy"
+        )
+        del test_batches
+        assert "Contents" not in s3_client.list_objects_v2(  # noqa: S101
+            Bucket="au-com-dummy"
+        )
+
+    @mock_s3
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_write_partitioned_parquet(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+        tmp_path,
+    ):
+        """
+        test function for writing a dataframe as partitioned parquet files
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+        tmp_path
+            temporary directory of the create table sql
+
+        Returns
+        -------
+        assert
+            one parquet file is written per partition, sorted by the sort key,
+            with the data types of the yaml schema
+        assert
+            written partitions are added to the table, unless it is created
+            with partition projection
+        """
+
+        s3_client = boto3.client("s3", region_name="ap-southeast-2")
+        s3_client.create_bucket(
+            Bucket="testing-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "ap-southeast-2"},
+        )
+        dummy_df = pd.DataFrame(
+            {
+                "account_id": [3, 1, 2],
+                "inference_date_created": ["20230102", "20230101", "20230102"],
+            }
+        )
+
+        mocked_cursor = mocked_pyathena.cursor.return_value
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        test = test_client.write_partitioned_parquet(
+            df=dummy_df, yaml_schema_file_path=TEST_YAML_FILE, sort_by=["account_id"]
+        )
+        written_df = pd.read_parquet(
+            pa.BufferReader(
+                s3_client.get_object(
+                    Bucket="testing-bucket",
+                    Key=s3_client.list_objects_v2(
+                        Bucket="testing-bucket",
+                        Prefix="testing/inference_date_created=20230102/",
+                    )["Contents"][0]["Key"],
+                )["Body"].read()
+            )
+        )
+        assert mocked_cursor.execute.call_count == 1  # noqa: S101
+        assert (  # noqa: S101
+            "PARTITION (inference_date_created='20230102')"
+            in mocked_cursor.execute.call_args.args[0]
+        )
+
+        projection_sql_file = tmp_path / "create_projection.sql"
+        projection_sql_file.write_text(
+            'CREATE TABLE {table_name} tblproperties ("a"="b"{partition_projection})'
+        )
+        test_client.write_partitioned_parquet(
+            df=dummy_df,
+            yaml_schema_file_path=TEST_PROJECTION_YAML_FILE,
+            create_raw_query=str(projection_sql_file),
+        )
+        keys = s3_client.list_objects_v2(Bucket="testing-bucket")["Contents"]
+
+        assert test == ["20230101", "20230102"]  # noqa: S101
+        assert len(keys) == 4  # noqa: S101
+        assert written_df["account_id"].tolist() == [2, 3]  # noqa: S101
+        assert written_df["account_id"].dtype == "int32"  # noqa: S101
+        assert mocked_cursor.execute.call_count == 1  # noqa: S101
+
+        # a template without the placeholder does not create a projected table
+        sql_file = tmp_path / "create.sql"
+        sql_file.write_text("CREATE TABLE {table_name}")
+        test_client.write_partitioned_parquet(
+            df=dummy_df,
+            yaml_schema_file_path=TEST_PROJECTION_YAML_FILE,
+            create_raw_query=str(sql_file),
+        )
+
+        assert mocked_cursor.execute.call_count == 2  # noqa: S101
+
+    @mock_s3
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_query_as_pandas_parallel(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+    ):
+        """
+        test function for querying athena with the parallel fetch engine
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            large csv result file is parsed with the types of the query
+        assert
+            ValueError is raised for an unknown fetch engine
+        """
+
+        s3_client = boto3.client("s3", region_name="ap-southeast-2")
+        s3_client.create_bucket(
+            Bucket="au-com-dummy",
+            CreateBucketConfiguration={"LocationConstraint": "ap-southeast-2"},
+        )
+        dummy_df = pd.DataFrame(
+            {
+                "id": range(25_000),
+                "score": [i / 7 for i in range(25_000)],
+                "theme": ["churn", "price"] * 12_500,
+            }
+        )
+        s3_client.put_object(
+            Bucket="au-com-dummy",
+            Key="athena_queries/query_id.csv",
+            Body=dummy_df.to_csv(index=False, quoting=1).encode(),
+        )
+
+        mocked_result = mocked_pyathena.cursor.return_value.execute.return_value
+        mocked_result.output_location = "s3://au-com-dummy/athena_queries/query_id.csv"
+        mocked_result.description = [
+            ("id", "bigint", None, None, 19, 0, "NULLABLE"),
+            ("score", "double", None, None, 17, 0, "NULLABLE"),
+            ("theme", "varchar", None, None, 2147483647, 0, "NULLABLE"),
+        ]
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        test = test_client.query_as_pandas(
+            final_query="SELECT * FROM t", fetch_engine="parallel"
+        )
+
+        mocked_pyathena.cursor.assert_called_once_with(
+            cursor=pyathena.cursor.Cursor, s3_staging_dir=ANY
+        )
+        pd.testing.assert_frame_equal(test, dummy_df)
+        with pytest.raises(ValueError, match="fetch_engine can only be one of"):
+            test_client.query_as_pandas(final_query="SELECT 1", fetch_engine="spark")
+
+    @mock_s3
+    @patch("hip_data_ml_utils.pyathena_client.client.PyAthenaClient")
+    def test_query_as_pandas_parallel_dtypes(
+        self,
+        mocked_pyathena,
+        aws_credentials,
+    ):
+        """
+        test function for the types of the parallel fetch engine
+        Parameters
+        ----------
+        mocked_pyathena
+            mocked pyathena client
+        aws_credentials
+            inherits the aws creds when invoking aws functions
+
+        Returns
+        -------
+        assert
+            parallel engine returns the types of the pandas cursor, and downcasts
+        """
+
+        s3_client = boto3.client("s3", region_name="ap-southeast-2")
+        s3_client.create_bucket(
+            Bucket="au-com-dummy",
+            CreateBucketConfiguration={"LocationConstraint": "ap-southeast-2"},
+        )
+        s3_client.put_object(
+            Bucket="au-com-dummy",
+            Key="athena_queries/query_id.csv",
+            Body=(
+                b'"a","b","c","d"\n'
+                b'"1","1","2023-01-01","2023-01-01 00:00:00.123"\n'
+                b'"2",,,\n'
+            ),
+        )
+
+        mocked_result = mocked_pyathena.cursor.return_value.execute.return_value
+        mocked_result.output_location = "s3://au-com-dummy/athena_queries/query_id.csv"
+        mocked_result.description = [
+            ("a", "integer", None, None, 10, 0, "NULLABLE"),
+            ("b", "integer", None, None, 10, 0, "NULLABLE"),
+            ("c", "date", None, None, 0, 0, "NULLABLE"),
+            ("d", "timestamp", None, None, 3, 0, "NULLABLE"),
+        ]
+
+        test_client = PyAthenaClient()
+        # patch engine with mocked pyathena
+        test_client.engine = mocked_pyathena
+
+        test = test_client.query_as_pandas(
+            final_query="SELECT * FROM t", fetch_engine="parallel"
+        )
+        test_downcast = test_client.query_as_pandas(
+            final_query="SELECT * FROM t", fetch_engine="parallel", downcast=True
+        )
+
+        assert test.dtypes.tolist() == [  # noqa: S101
+            "int64",
+            "float64",
+            "datetime64[ns]",
+            "datetime64[ns]",
+        ]
+        assert test_downcast["a"].dtype == "int8"  # noqa: S101
+        assert test_downcast["b"].dtype == "float32"  # noqa: S101
+        assert test["d"][0] == pd.Timestamp("2023-01-01 00:00:00.123")  # noqa: S101
@@ -0,0 +1,167 @@
+import json
+import subprocess  # noqa: S404
+import sys
+from typing import Dict
+
+import pytest
+
+HEAVY_MODULES = (
+    "torch",
+    "mlflow",
+    "pyathena",
+    "databricks.sql",
+    "pandas",
+    "pyarrow",
+    "boto3",
+)
+
+# submodule, heavy modules it may import, max import seconds, max peak rss in MB
+# budgets are a few times the measured footprint, so only a regression fails
+# they are only checked by make benchmark-imports, as timings vary between runners
+IMPORT_BUDGETS = (
+    ("hip_data_ml_utils.core.config", (), 1.0, 60),
+    ("hip_data_ml_utils.core.databricks_utils", (), 1.0, 60),
+    ("hip_data_ml_utils.core.dtype_utils", ("pandas", "pyarrow"), 4.0, 250),
+    ("hip_data_ml_utils.core.file_cache", (), 1.0, 60),
+    ("hip_data_ml_utils.core.pool", (), 1.0, 60),
+    ("hip_data_ml_utils.core.pyathena_utils", (), 1.0, 60),
+    ("hip_data_ml_utils.pyathena_client.cache", (), 1.0, 60),
+    (
+        "hip_data_ml_utils.pyathena_client.client",
+        ("pyathena", "pandas", "pyarrow", "boto3"),
+        4.0,
+        250,
+    ),
+    (
+        "hip_data_ml_utils.databricks_client.client",
+        ("databricks.sql", "pandas", "pyarrow"),
+        4.0,
+        250,
+    ),
+    ("hip_data_ml_utils.mlflow_databricks.mlflow_model_utils", (), 1.0, 60),
+    ("hip_data_ml_utils.mlflow_databricks.mlflow_tracker", (), 1.0, 60),
+    ("hip_data_ml_utils.mlflow_databricks.model_cache", (), 1.0, 60),
+    ("hip_data_ml_utils.mlflow_databricks.artifact_cache", (), 1.0, 60),
+    ("hip_data_ml_utils.mlflow_databricks.registry_snapshot", (), 1.0, 60),
+    ("hip_data_ml_utils.mlflow_databricks.mlflow_serve", (), 1.5, 80),
+    ("hip_data_ml_utils.mlflow_databricks.mlflow_prediction_requests", (), 1.5, 80),
+)
+
+MEASURE_IMPORT = """
+import importlib, json, pathlib, resource, sys, time
+
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+import_seconds = time.perf_counter() - start
+
+# ru_maxrss is kept across exec on linux, so it would include the pytest process
+status = pathlib.Path("/proc/self/status")
+if status.exists():
+    rss_kb = int(status.read_text().split("VmHWM:")[1].split()[0])
+else:
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "rss_mb": rss_kb / 1024,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+def measure_import(module_name: str) -> Dict:
+    """
+    function that imports a module in a fresh interpreter
+
+    Parameters
+    ----------
+    module_name: str
+        module to import
+
+    Returns
+    -------
+    Dict
+        import_seconds, rss_mb and loaded modules of the interpreter
+    """
+    output = subprocess.run(  # noqa: S603
+        [sys.executable, "-W", "ignore", "-c", MEASURE_IMPORT, module_name],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+
+    return json.loads(output.splitlines()[-1])
+
+
+class TestImportFootprint:
+    """benchmark class for the import time and memory of each submodule"""
+
+    @pytest.mark.parametrize(
+        "module_name, allowed_heavy_modules",
+        [budget[:2] for budget in IMPORT_BUDGETS],
+    )
+    def test_import_footprint(
+        self, module_name: str, allowed_heavy_modules: tuple
+    ) -> None:
+        """
+        test function for importing a submodule in a fresh interpreter
+
+        Returns
+        -------
+        assert
+            heavy dependencies are not imported unless the submodule needs them
+        """
+
+        footprint = measure_import(module_name)
+
+        loaded_heavy_modules = {
+            heavy_module
+            for heavy_module in HEAVY_MODULES
+            if heavy_module in footprint["modules"]
+        }
+
+        assert loaded_heavy_modules <= set(allowed_heavy_modules)  # noqa: S101
+
+    @pytest.mark.benchmark
+    @pytest.mark.parametrize(
+        "module_name, max_seconds, max_rss_mb",
+        [(budget[0], *budget[2:]) for budget in IMPORT_BUDGETS],
+    )
+    def test_import_budget(
+        self, module_name: str, max_seconds: float, max_rss_mb: int
+    ) -> None:
+        """
+        test function for the import time and memory of a submodule
+
+        Returns
+        -------
+        assert
+            import time and peak rss are within budget
+        """
+
+        footprint = measure_import(module_name)
+        print(  # noqa: T201
+            f"{module_name}: {footprint['import_seconds']:.2f}s "
+            f"{footprint['rss_mb']:.0f}MB"
+        )
+
+        assert footprint["import_seconds"] < max_seconds  # noqa: S101
+        assert footprint["rss_mb"] < max_rss_mb  # noqa: S101
+
+    def test_settings_built_on_first_use(self) -> None:
+        """
+        test function for building the settings on first access
+
+        Returns
+        -------
+        assert
+            settings are not built on import
+            settings are built once and shared
+        """
+
+        from hip_data_ml_utils.core import config
+
+        config.get_settings.cache_clear()
+
+        assert config.get_settings.cache_info().currsize == 0  # noqa: S101
+        assert config.settings is config.get_settings()  # noqa: S101
+        assert config.get_settings.cache_info().currsize == 1  # noqa: S101
@@ -5,4 +5,4 @@ COMMENT '{table_description}'
 PARTITIONED BY ({partitioned_column} STRING COMMENT '{partitioned_column_comment}')
 STORED AS PARQUET
 LOCATION '{s3_bucket}'
-tblproperties ("parquet.compression"="SNAPPY");
+tblproperties ("parquet.compression"="SNAPPY"{partition_projection});